@@ -36,8 +36,6 @@ if sys.argv[1] == '--socket':
 else:
 	address = ('/tmp/powerline-ipc-%d' if use_filesystem else '\0powerline-ipc-%d') % os.getuid()
 
-sock = socket.socket(family=socket.AF_UNIX)
-
 
 def eintr_retry_call(func, *args, **kwargs):
 	while True:
@@ -49,6 +47,145 @@ def eintr_retry_call(func, *args, **kwargs):
 			raise
 
 
+PERSISTENT_MAGIC = b'PL1\0'
+
+
+def read_field(stream):
+	field = []
+	while True:
+		c = stream.read(1)
+		if not c:
+			return None
+		if c == b'\0':
+			return b''.join(field)
+		field.append(c)
+
+
+def read_record(stream):
+	'''Read one request from coprocess standard input
+
+	Request consists of NUL-terminated fields: number of arguments 
+	(hexadecimal), arguments, current directory and ``KEY=VALUE`` environment 
+	variables, followed by an empty field.
+
+	:return: ``(args, cwd, environ)`` triple or ``None`` on EOF.
+	'''
+	numargs = read_field(stream)
+	if numargs is None:
+		return None
+	args = []
+	for i in range(int(numargs, 16)):
+		arg = read_field(stream)
+		if arg is None:
+			return None
+		args.append(arg)
+	cwd = read_field(stream)
+	if cwd is None:
+		return None
+	environ = {}
+	while True:
+		item = read_field(stream)
+		if item is None:
+			return None
+		if not item:
+			break
+		environ[item.partition(b'=')[0]] = item
+	return args, cwd, environ
+
+
+def gen_frame(args, cwd, environ, sent_environ):
+	'''Create persistent protocol frame with environment delta
+	'''
+	fields = [('%x' % len(args)).encode('ascii')] + args + [cwd]
+	fields.extend((item for key, item in environ.items() if sent_environ.get(key) != item))
+	fields.extend((key for key in sent_environ if key not in environ))
+	body = b''.join((field + b'\0' for field in fields)) + b'\0'
+	return PERSISTENT_MAGIC + ('%x' % len(body)).encode('ascii') + b'\0' + body
+
+
+def recv_answer(sock):
+	data = b''
+	while True:
+		header_end = data.find(b'\0')
+		if header_end != -1:
+			end = header_end + 1 + int(data[:header_end], 16)
+			if len(data) >= end:
+				return data[header_end + 1:end]
+		r = eintr_retry_call(sock.recv, 4096)
+		if not r:
+			return None
+		data += r
+
+
+def run_renderer(args, cwd, environ):
+	from subprocess import Popen, PIPE
+	try:
+		return Popen(
+			['powerline-render'] + args,
+			cwd=cwd or None,
+			env=dict((item.partition(b'=')[::2] for item in environ.values())),
+			stdout=PIPE,
+		).communicate()[0]
+	except Exception:
+		return b''
+
+
+def coprocess(address):
+	'''Serve requests from standard input over one daemon connection
+
+	Answers are written to standard output, each one is followed by NUL byte. 
+	Full environment is only sent when connection is established, for 
+	subsequent requests only changed variables are sent. If daemon closes the 
+	connection it is reestablished, if daemon is not running 
+	``powerline-render`` is used.
+	'''
+	stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+	stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+	sock = None
+	sent_environ = {}
+	while True:
+		record = read_record(stdin)
+		if record is None:
+			break
+		args, cwd, environ = record
+		answer = None
+		for attempt in range(2):
+			if sock is None:
+				sock = socket.socket(family=socket.AF_UNIX)
+				try:
+					eintr_retry_call(sock.connect, address)
+				except Exception:
+					sock.close()
+					sock = None
+					break
+				sent_environ = {}
+			try:
+				eintr_retry_call(sock.sendall, gen_frame(args, cwd, environ, sent_environ))
+				answer = recv_answer(sock)
+			except Exception:
+				answer = None
+			if answer is None:
+				sock.close()
+				sock = None
+			else:
+				sent_environ = environ
+				break
+		if answer is None:
+			answer = run_renderer(args, cwd, environ)
+		stdout.write(answer + b'\0')
+		stdout.flush()
+	if sock is not None:
+		sock.close()
+	return 0
+
+
+if sys.argv[1:2] == ['--coprocess']:
+	raise SystemExit(coprocess(address))
+
+
+sock = socket.socket(family=socket.AF_UNIX)
+
+
 try:
 	eintr_retry_call(sock.connect, address)
 except Exception:
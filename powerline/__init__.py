@@ -4,16 +4,19 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 import os
 import sys
 import logging
+import hashlib
 
 from threading import Lock, Event
 
 from powerline.colorscheme import Colorscheme
-from powerline.lib.config import ConfigLoader
+from powerline.lib.config import ConfigLoader, ConfigSnapshot
 from powerline.lib.unicode import unicode, safe_unicode, FailedUnicode
 from powerline.config import DEFAULT_SYSTEM_CONFIG_DIR
-from powerline.lib.dict import mergedicts
+from powerline.lib.dict import mergedicts, mergedicts_copy
 from powerline.lib.encoding import get_preferred_output_encoding
 from powerline.lib.path import join
+from powerline.lib.debug import StartupProfile, NOT_PROFILED_PHASE
+from powerline.lib.imports import import_module_attr
 
 
 class NotInterceptedError(BaseException):
@@ -153,6 +156,17 @@ def get_config_paths():
 	return config_paths
 
 
+def get_cache_dir():
+	'''Get directory where powerline stores its cache
+
+	Uses $XDG_CACHE_HOME according to the XDG specification.
+
+	:return: path to the directory, it may not exist yet.
+	'''
+	cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return join(cache_home, 'powerline')
+
+
 def generate_config_finder(get_config_paths=get_config_paths):
 	'''Generate find_config_files function
 
@@ -186,7 +200,10 @@ def load_config(cfg_path, find_config_files, config_loader, loader_callback=None
 		Function that will be called by config_loader when change to 
 		configuration file is detected.
 
-	:return: Configuration file contents.
+	:return:
+		Configuration file contents. Parts of it may be shared with other 
+		callers, use :py:func:`powerline.lib.dict.mergedicts_copy` to modify 
+		it.
 	'''
 	found_files = find_config_files(cfg_path, config_loader, loader_callback)
 	ret = None
@@ -196,7 +213,7 @@ def load_config(cfg_path, find_config_files, config_loader, loader_callback=None
 		if ret is None:
 			ret = config_loader.load(path)
 		else:
-			mergedicts(ret, config_loader.load(path))
+			ret = mergedicts_copy(ret, config_loader.load(path))
 	return ret
 
 
@@ -336,6 +353,8 @@ def finish_common_config(encoding, common_config):
 	common_config.setdefault('additional_escapes', None)
 	common_config.setdefault('reload_config', True)
 	common_config.setdefault('interval', None)
+	common_config.setdefault('render_cache_size', 0)
+	common_config.setdefault('window_cache_size', 0)
 	common_config.setdefault('log_file', [None])
 
 	if not isinstance(common_config['log_file'], list):
@@ -367,10 +386,15 @@ else:
 
 
 def gen_module_attr_getter(pl, import_paths, imported_modules):
+	cache = {}
+
 	def get_module_attr(module, attr, prefix='powerline'):
 		'''Import module and get its attribute.
 
-		Replaces ``from {module} import {attr}``.
+		Replaces ``from {module} import {attr}``. Modules are searched in 
+		``import_paths`` first, :py:data:`sys.path` is not modified. Successful 
+		lookups are cached until module is removed from :py:data:`sys.modules` 
+		(e.g. by :py:meth:`Powerline.reload`).
 
 		:param str module:
 			Module name, will be passed as first argument to ``__import__``.
@@ -383,18 +407,24 @@ def gen_module_attr_getter(pl, import_paths, imported_modules):
 			between successfull import of attribute equal to ``None`` and 
 			unsuccessfull import.
 		'''
-		oldpath = sys.path
-		sys.path = import_paths + sys.path
 		module = str(module)
 		attr = str(attr)
+		key = (module, attr)
+		try:
+			module_obj, value = cache[key]
+		except KeyError:
+			pass
+		else:
+			if sys.modules.get(module) is module_obj:
+				return value
 		try:
 			imported_modules.add(module)
-			return getattr(__import__(module, fromlist=(attr,)), attr)
+			value = import_module_attr(module, attr, import_paths)
 		except Exception as e:
 			pl.exception('Failed to import attr {0} from module {1}: {2}', attr, module, str(e), prefix=prefix)
 			return None
-		finally:
-			sys.path = oldpath
+		cache[key] = (sys.modules.get(module), value)
+		return value
 
 	return get_module_attr
 
@@ -455,6 +485,14 @@ class Powerline(object):
 		Use this Event as shutdown_event instead of creating new event.
 	:param ConfigLoader config_loader:
 		Instance of the class that manages (re)loading of the configuration.
+	:param bool config_snapshot:
+		Keep loaded configuration in a :py:class:`ConfigSnapshot` under 
+		:py:func:`get_cache_dir` so that next runs do not need to parse and 
+		merge configuration files again. Only used together with ``run_once``.
+	:param bool profile_startup:
+		Record time spent in different phases of renderer creation and in 
+		imports of modules in :py:attr:`startup_profile` 
+		(:py:class:`powerline.lib.debug.StartupProfile` instance).
 	'''
 
 	def __init__(self, *args, **kwargs):
@@ -468,7 +506,9 @@ class Powerline(object):
 	         logger=None,
 	         use_daemon_threads=True,
 	         shutdown_event=None,
-	         config_loader=None):
+	         config_loader=None,
+	         config_snapshot=False,
+	         profile_startup=False):
 		'''Do actual initialization.
 
 		__init__ function only stores the arguments and runs this function. This 
@@ -494,7 +534,15 @@ class Powerline(object):
 		else:
 			self.renderer_module = renderer_module
 
-		self.find_config_files = generate_config_finder(self.get_config_paths)
+		self.config_paths = self.get_config_paths()
+		self.find_config_files = generate_config_finder(lambda: self.config_paths)
+
+		self.startup_profile = StartupProfile() if profile_startup else None
+
+		self.config_snapshot = None
+		if config_snapshot and run_once:
+			self.config_snapshot = ConfigSnapshot(self.get_config_snapshot_path())
+			self.config_snapshot.load()
 
 		self.cr_kwargs_lock = Lock()
 		self.cr_kwargs = {}
@@ -515,6 +563,7 @@ class Powerline(object):
 
 		self.prev_common_config = None
 		self.prev_ext_config = None
+		self.vcs_cache_config = None
 		self.pl = None
 		self.setup_args = ()
 		self.setup_kwargs = {}
@@ -547,6 +596,26 @@ class Powerline(object):
 			stream=self.default_log_stream,
 		)
 
+	def set_vcs_cache_limits(self, vcs_cache):
+		'''Apply :ref:`vcs_cache <config-common-vcs_cache>` option
+
+		VCS caches are shared by all powerline instances in the process. VCS 
+		module is not imported unless the option was set.
+
+		:param dict vcs_cache:
+			Option value or ``None`` if it is absent.
+		'''
+		if vcs_cache == self.vcs_cache_config:
+			return
+		self.vcs_cache_config = vcs_cache
+		from powerline.lib import vcs
+		vcs_cache = vcs_cache or {}
+		vcs.set_cache_limits(
+			file_status_size=vcs_cache.get('file_status_size', vcs.FILE_STATUS_CACHE_SIZE),
+			branch_name_size=vcs_cache.get('branch_name_size', vcs.BRANCH_NAME_CACHE_SIZE),
+			ttl=vcs_cache.get('ttl', vcs.CACHE_TTL),
+		)
+
 	def create_renderer(self, load_main=False, load_colors=False, load_colorscheme=False, load_theme=False):
 		'''(Re)create renderer object. Can be used after Powerline object was 
 		successfully initialized. If any of the below parameters except 
@@ -570,8 +639,9 @@ class Powerline(object):
 		ext_config_differs = False
 		if load_main:
 			self._purge_configs('main')
-			config = self.load_main_config()
-			self.common_config = finish_common_config(self.get_encoding(), config['common'])
+			with self.profile_phase('config'):
+				config = self.load_main_config()
+				self.common_config = finish_common_config(self.get_encoding(), config['common'])
 			if self.common_config != self.prev_common_config:
 				common_config_differs = True
 
@@ -592,6 +662,9 @@ class Powerline(object):
 							self.pl, self.common_config['paths'], self.imported_modules)
 					else:
 						self.logger, self.pl, self.get_module_attr = self.create_logger()
+					if self.startup_profile is not None:
+						self.get_module_attr = self.startup_profile.wrap_module_attr_getter(
+							self.get_module_attr)
 					self.config_loader.pl = self.pl
 
 				if not self.run_once:
@@ -604,6 +677,8 @@ class Powerline(object):
 					ambiwidth=self.common_config['ambiwidth'],
 					tmux_escape=self.common_config['additional_escapes'] == 'tmux',
 					screen_escape=self.common_config['additional_escapes'] == 'screen',
+					render_cache_size=self.common_config['render_cache_size'],
+					window_cache_size=self.common_config['window_cache_size'],
 					theme_kwargs={
 						'ext': self.ext,
 						'common_config': self.common_config,
@@ -613,6 +688,8 @@ class Powerline(object):
 					},
 				))
 
+				self.set_vcs_cache_limits(self.common_config.get('vcs_cache'))
+
 				if not self.run_once and self.common_config['reload_config']:
 					interval = self.common_config['interval']
 					self.config_loader.set_interval(interval)
@@ -661,18 +738,20 @@ class Powerline(object):
 
 		if load_colors:
 			self._purge_configs('colors')
-			self.colors_config = self.load_colors_config()
+			with self.profile_phase('colors'):
+				self.colors_config = self.load_colors_config()
 
 		if load_colorscheme or load_colors:
 			self._purge_configs('colorscheme')
-			if load_colorscheme:
-				self.colorscheme_config = self.load_colorscheme_config(self.ext_config['colorscheme'])
-			self.renderer_options['theme_kwargs']['colorscheme'] = (
-				Colorscheme(self.colorscheme_config, self.colors_config))
+			with self.profile_phase('colorscheme'):
+				if load_colorscheme:
+					self.colorscheme_config = self.load_colorscheme_config(self.ext_config['colorscheme'])
+				self.renderer_options['theme_kwargs']['colorscheme'] = self.create_colorscheme()
 
 		if load_theme:
 			self._purge_configs('theme')
-			self.renderer_options['theme_config'] = self.load_theme_config(self.ext_config.get('theme', 'default'))
+			with self.profile_phase('theme'):
+				self.renderer_options['theme_config'] = self.load_theme_config(self.ext_config.get('theme', 'default'))
 
 		if create_renderer:
 			Renderer = self.get_module_attr(self.renderer_module, 'renderer')
@@ -686,7 +765,8 @@ class Powerline(object):
 			# should be locked to prevent state when configuration was updated, 
 			# but .render still uses old renderer.
 			try:
-				renderer = Renderer(**self.renderer_options)
+				with self.profile_phase('renderer'):
+					renderer = Renderer(**self.renderer_options)
 			except Exception as e:
 				self.exception('Failed to construct renderer object: {0}', str(e))
 				if not hasattr(self, 'renderer'):
@@ -694,6 +774,9 @@ class Powerline(object):
 			else:
 				self.renderer = renderer
 
+		if self.config_snapshot is not None:
+			self.config_snapshot.save()
+
 	default_log_stream = sys.stdout
 	'''Default stream for default log handler
 
@@ -723,6 +806,41 @@ class Powerline(object):
 		'''
 		return get_config_paths()
 
+	def profile_phase(self, name):
+		'''Get context manager measuring startup phase duration
+
+		Does nothing unless powerline was created with ``profile_startup``.
+		'''
+		if self.startup_profile is None:
+			return NOT_PROFILED_PHASE
+		return self.startup_profile.phase(name)
+
+	def get_config_snapshot_path(self):
+		'''Get path to the configuration snapshot file
+
+		Snapshot file is specific to the configuration search paths, 
+		:py:class:`Powerline` subclass and Python version.
+		'''
+		key = repr((
+			self.__class__.__module__,
+			self.__class__.__name__,
+			sys.version_info[:2],
+			tuple(self.config_paths),
+		)).encode('utf-8')
+		return join(get_cache_dir(), 'config-' + hashlib.sha1(key).hexdigest() + '.pickle')
+
+	def get_compiled(self, key, compute):
+		'''Get value built from configuration, using snapshot if enabled
+
+		:param tuple key:
+			Value identifier, unique within the snapshot.
+		:param function compute:
+			Function without arguments that computes the value.
+		'''
+		if self.config_snapshot is None:
+			return compute()
+		return self.config_snapshot.get(key, compute)
+
 	def load_config(self, cfg_path, cfg_type):
 		'''Load configuration and setup watches
 
@@ -735,6 +853,10 @@ class Powerline(object):
 
 		:return: dictionary with loaded configuration.
 		'''
+		if self.config_snapshot is not None:
+			self.config_snapshot.add_sources((
+				join(path, cfg_path + '.json') for path in self.config_paths
+			))
 		return load_config(
 			cfg_path,
 			self.find_config_files,
@@ -752,7 +874,7 @@ class Powerline(object):
 
 		:return: dictionary with :ref:`top-level configuration <config-main>`.
 		'''
-		return self.load_config('config', 'main')
+		return self.get_compiled(('main',), lambda: self.load_config('config', 'main'))
 
 	def _load_hierarhical_config(self, cfg_type, levels, ignore_levels):
 		'''Load and merge multiple configuration files
@@ -784,7 +906,7 @@ class Powerline(object):
 			else:
 				if i not in ignore_levels:
 					loaded += 1
-				mergedicts(config, lvl_config)
+				config = mergedicts_copy(config, lvl_config)
 		if not loaded:
 			for exception in exceptions:
 				if type(exception) is tuple:
@@ -808,7 +930,8 @@ class Powerline(object):
 			os.path.join('colorschemes', self.ext, '__main__'),
 			os.path.join('colorschemes', self.ext, name),
 		)
-		return self._load_hierarhical_config('colorscheme', levels, (1,))
+		return self.get_compiled(('colorscheme', levels), lambda: (
+			self._load_hierarhical_config('colorscheme', levels, (1,))))
 
 	def load_theme_config(self, name):
 		'''Get theme configuration.
@@ -821,14 +944,33 @@ class Powerline(object):
 		levels = self.theme_levels + (
 			os.path.join('themes', self.ext, name),
 		)
-		return self._load_hierarhical_config('theme', levels, (0, 1,))
+		return self.get_compiled(('theme', levels), lambda: (
+			self._load_hierarhical_config('theme', levels, (0, 1,))))
 
 	def load_colors_config(self):
 		'''Get colorscheme.
 
 		:return: dictionary with :ref:`colors configuration <config-colors>`.
 		'''
-		return self.load_config('colors', 'colors')
+		return self.get_compiled(('colors',), lambda: self.load_config('colors', 'colors'))
+
+	def create_colorscheme(self):
+		'''Create colorscheme object from loaded colorscheme and colors
+
+		:return: :py:class:`powerline.colorscheme.Colorscheme` instance.
+		'''
+		def compute():
+			if self.config_snapshot is not None:
+				# Snapshot holds pickled object: it must be invalidated when 
+				# class changes
+				self.config_snapshot.add_sources((
+					os.path.splitext(sys.modules[Colorscheme.__module__].__file__)[0] + '.py',
+				))
+			return Colorscheme(self.colorscheme_config, self.colors_config)
+		return self.get_compiled(
+			('Colorscheme', self.ext, self.ext_config['colorscheme']),
+			compute
+		)
 
 	@staticmethod
 	def get_local_themes(local_themes):
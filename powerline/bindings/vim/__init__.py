@@ -271,9 +271,57 @@ def _vim_to_python(value):
 	return _vim_to_python_types.get(type(value), _id)(value)
 
 
+if hasattr(vim, 'bindeval'):
+	def get_buffer_options(bufnr):
+		return vim.bindeval('getbufvar({0}, "&")'.format(bufnr))
+else:
+	def get_buffer_options(bufnr):
+		return vim.eval('getbufvar({0}, "&")'.format(bufnr))
+
+get_buffer_options.__doc__ = (
+	'''Get all buffer-local options of the given buffer in one call
+
+	:return:
+		Dictionary-like object mapping option names to option values.
+	'''
+)
+
+
+class BufferOptions(object):
+	'''Snapshot of buffer-local options
+
+	Options are fetched using :py:func:`get_buffer_options` on first access and 
+	are not updated afterwards: objects of this class are meant to be created 
+	for each render (see ``buffer_options`` key in segment info) so that 
+	multiple segments requesting options of one buffer cost only one call 
+	into Vim.
+	'''
+	__slots__ = ('bufnr', 'options')
+
+	def __init__(self, bufnr):
+		self.bufnr = bufnr
+		self.options = None
+
+	def __getitem__(self, option):
+		if self.options is None:
+			self.options = get_buffer_options(self.bufnr)
+		return self.options[option]
+
+
+def _get_snapshot_option(info, option):
+	buffer_options = info['buffer_options']
+	if buffer_options.bufnr != info['bufnr']:
+		# Segment info was copied for another buffer, snapshot is stale
+		raise KeyError(option)
+	return _vim_to_python(buffer_options[str(option)])
+
+
 if hasattr(vim, 'options'):
 	def vim_getbufoption(info, option):
-		return _vim_to_python(info['buffer'].options[str(option)])
+		try:
+			return _get_snapshot_option(info, option)
+		except KeyError:
+			return _vim_to_python(info['buffer'].options[str(option)])
 
 	def vim_getoption(option):
 		return vim.options[str(option)]
@@ -282,7 +330,10 @@ if hasattr(vim, 'options'):
 		vim.options[str(option)] = value
 else:
 	def vim_getbufoption(info, option):
-		return getbufvar(info['bufnr'], '&' + option)
+		try:
+			return _get_snapshot_option(info, option)
+		except KeyError:
+			return getbufvar(info['bufnr'], '&' + option)
 
 	def vim_getoption(option):
 		return vim.eval('&g:' + option)
@@ -389,6 +440,30 @@ else:
 		)
 
 
+if hasattr(vim, 'eval') and vim_func_exists('getbufinfo'):
+	def list_modified_buffers():
+		return [
+			int(bufnr)
+			for bufnr in vim.eval('map(getbufinfo({"bufmodified": 1}), "v:val.bufnr")')
+		]
+else:
+	def list_modified_buffers():
+		return [
+			buffer.number
+			for buffer in vim.buffers
+			if int(vim_getbufoption({'buffer': buffer, 'bufnr': buffer.number}, 'modified'))
+		]
+
+list_modified_buffers.__doc__ = (
+	'''List numbers of all modified buffers
+
+	Uses one ``getbufinfo()`` call if it is available.
+
+	:return: List of integers.
+	'''
+)
+
+
 class VimEnviron(object):
 	@staticmethod
 	def __getitem__(key):
@@ -466,6 +541,87 @@ def on_bwipe():
 		cachedict.pop(bufnr, None)
 
 
+BUFFER_LISTENER_EXPR = (
+	'listener_add({{buf, lnum, lend, added, changes -> '
+	'add(getbufvar(buf, "powerline_changes"), [lnum, lend, added])}}, {0})'
+)
+BUFFER_CHANGES_EXPR = (
+	'[listener_flush({0}), copy(getbufvar({0}, "powerline_changes")), '
+	'filter(getbufvar({0}, "powerline_changes"), 0)][1]'
+)
+
+
+class BufferChangeTracker(object):
+	'''Pass changes of one buffer to registered indexes
+
+	In Vim versions which support |listener_add()| changed line ranges are 
+	recorded by a listener and passed to ``apply_change(start, end, added)`` 
+	method of each index (arguments are the same as listener callback 
+	receives). When changes are unknown (no listener support, or 
+	``b:changedtick`` was incremented without changing text) ``reset()`` 
+	method of each index is called instead.
+
+	Use :py:func:`get_buffer_change_tracker` to obtain tracker.
+	'''
+	has_listeners = None
+
+	def __init__(self, bufnr):
+		if BufferChangeTracker.has_listeners is None:
+			BufferChangeTracker.has_listeners = bool(int(vim.eval('exists("*listener_add")')))
+		self.bufnr = bufnr
+		self.changedtick = None
+		self.indexes = []
+		if self.has_listeners:
+			vim.command('call setbufvar({0}, "powerline_changes", [])'.format(bufnr))
+			vim.eval(BUFFER_LISTENER_EXPR.format(bufnr))
+
+	def add_index(self, index):
+		'''Start passing changes to the given index'''
+		self.indexes.append(index)
+
+	def update(self, changedtick):
+		'''Pass changes made since the last call to indexes
+
+		Tracker is shared by all segments working with the buffer, so only the 
+		first caller sees the change: indexes that need to know whether buffer 
+		was changed must record ``b:changedtick`` they last saw themselves.
+
+		:param int changedtick:
+			Current value of ``b:changedtick``.
+		'''
+		if changedtick == self.changedtick:
+			return
+		changes = None
+		if self.has_listeners:
+			changes = vim.eval(BUFFER_CHANGES_EXPR.format(self.bufnr))
+		for index in self.indexes:
+			if changes and self.changedtick is not None:
+				for start, end, added in changes:
+					index.apply_change(int(start), int(end), int(added))
+			else:
+				index.reset()
+		self.changedtick = changedtick
+
+
+buffer_change_trackers = None
+
+
+def get_buffer_change_tracker(bufnr):
+	'''Get :py:class:`BufferChangeTracker` for the given buffer
+
+	Trackers are created on first request and removed when buffer is wiped 
+	out.
+	'''
+	global buffer_change_trackers
+	if buffer_change_trackers is None:
+		buffer_change_trackers = register_buffer_cache({})
+	try:
+		return buffer_change_trackers[bufnr]
+	except KeyError:
+		tracker = buffer_change_trackers[bufnr] = BufferChangeTracker(bufnr)
+		return tracker
+
+
 environ = VimEnviron()
 
 
@@ -37,6 +37,8 @@ class Colorscheme(object):
 		'''Initialize a colorscheme.'''
 		self.colors = {}
 		self.gradients = {}
+		self.group_props_cache = {}
+		self.highlighting_cache = {}
 
 		self.groups = colorscheme_config['groups']
 		self.translations = colorscheme_config.get('mode_translations', {})
@@ -95,7 +97,19 @@ class Colorscheme(object):
 			else:
 				return group
 
-	def get_highlighting(self, groups, mode, gradient_level=None):
+	def get_first_group_props(self, groups, mode):
+		'''Get properties of the first group from the list found in colorscheme
+
+		Results are cached: colorscheme object is recreated when configuration 
+		is reloaded.
+
+		:return: Group properties dictionary. Must not be modified.
+		'''
+		key = (tuple(groups), mode)
+		try:
+			return self.group_props_cache[key]
+		except KeyError:
+			pass
 		trans = self.translations.get(mode, {})
 		for group in groups:
 			group_props = self.get_group_props(mode, trans, group)
@@ -103,17 +117,38 @@ class Colorscheme(object):
 				break
 		else:
 			raise KeyError('Highlighting groups not found in colorscheme: ' + ', '.join(groups))
+		self.group_props_cache[key] = group_props
+		return group_props
+
+	def get_highlighting(self, groups, mode, gradient_level=None):
+		'''Get highlighting for the first group from the list found in colorscheme
+
+		:return:
+			Dictionary with ``fg``, ``bg`` and ``attrs`` keys. May be shared 
+			between callers, thus must not be modified.
+		'''
+		if gradient_level is None:
+			key = (tuple(groups), mode)
+			try:
+				return self.highlighting_cache[key]
+			except KeyError:
+				pass
+
+		group_props = self.get_first_group_props(groups, mode)
 
 		if gradient_level is None:
 			pick_color = self.colors.__getitem__
 		else:
 			pick_color = lambda gradient: self.get_gradient(gradient, gradient_level)
 
-		return {
+		ret = {
 			'fg': pick_color(group_props['fg']),
 			'bg': pick_color(group_props['bg']),
 			'attrs': get_attrs_flag(group_props.get('attrs', [])),
 		}
+		if gradient_level is None:
+			self.highlighting_cache[key] = ret
+		return ret
 
 
 #       0         1         2         3         4         5         6         7         8         9
@@ -16,6 +16,22 @@ def get_argparser(ArgumentParser=argparse.ArgumentParser):
 		     'Does not silence exceptions in any case.'
 	)
 	parser.add_argument('--socket', '-s', help='Specify socket which will be used for connecting to daemon.')
+	parser.add_argument(
+		'--workers', '-w', metavar='N', type=int, default=0,
+		help='Render prompts in a pool of N threads so that one slow client '
+		     'or segment does not delay other clients. '
+		     'Requests using the same configuration are still rendered '
+		     'one at a time. '
+		     'Default is 0: render everything in the main thread.'
+	)
+	parser.add_argument(
+		'--event-loop', '-e', choices=('select', 'selectors'),
+		help='Event loop used to serve clients. `selectors\' uses the best '
+		     'polling mechanism available (e.g. epoll) and never waits for '
+		     'one client while others are ready, `select\' is the old '
+		     'implementation which reads each request synchronously. '
+		     'Default is `selectors\' if Python has this module.'
+	)
 	exclusive_group = parser.add_mutually_exclusive_group()
 	exclusive_group.add_argument('--kill', '-k', action='store_true', help='Kill an already running instance.')
 	replace_group = exclusive_group.add_argument_group()
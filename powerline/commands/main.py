@@ -24,6 +24,11 @@ else:
 		return s
 
 
+ARGS_ENVIRON_KEYS = ('POWERLINE_CONFIG_OVERRIDES', 'POWERLINE_THEME_OVERRIDES', 'POWERLINE_CONFIG_PATHS')
+'''Environment variables that affect :py:func:`finish_args` result
+'''
+
+
 def finish_args(parser, environ, args, is_daemon=False):
 	'''Do some final transformations
 
@@ -155,6 +160,12 @@ def get_argparser(ArgumentParser=argparse.ArgumentParser):
 		     'configuration files will only be seeked in the provided path. '
 		     'May be provided multiple times to search in a list of directories.'
 	)
+	parser.add_argument(
+		'--profile-startup', action='store_true',
+		help='Write time spent in configuration loading, renderer creation, '
+		     'rendering and in imports of segment modules to stderr. '
+		     'Only used by `powerline-render\'.'
+	)
 	parser.add_argument(
 		'--socket', metavar='ADDRESS', type=str,
 		help='Socket address to use in daemon clients. Is always UNIX domain '
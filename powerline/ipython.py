@@ -2,7 +2,7 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 from powerline import Powerline
-from powerline.lib.dict import mergedicts
+from powerline.lib.dict import mergedicts_copy
 from powerline.lib.unicode import string
 
 
@@ -52,13 +52,13 @@ class IPythonPowerline(Powerline):
 	def load_main_config(self):
 		r = super(IPythonPowerline, self).load_main_config()
 		if self.config_overrides:
-			mergedicts(r, self.config_overrides)
+			r = mergedicts_copy(r, self.config_overrides, remove=True)
 		return r
 
 	def load_theme_config(self, name):
 		r = super(IPythonPowerline, self).load_theme_config(name)
 		if name in self.theme_overrides:
-			mergedicts(r, self.theme_overrides[name])
+			r = mergedicts_copy(r, self.theme_overrides[name], remove=True)
 		return r
 
 	def do_setup(self, wrefs):
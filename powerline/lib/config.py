@@ -1,15 +1,41 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
+import os
+import sys
 import json
 import codecs
 
-from copy import deepcopy
+try:
+	import cPickle as pickle
+except ImportError:
+	import pickle
+
 from threading import Event, Lock
 from collections import defaultdict
 
 from powerline.lib.threaded import MultiRunnedThread
-from powerline.lib.watcher import create_file_watcher
+from powerline.lib.dict import freeze
+from powerline.lib.unicode import unicode
+from powerline.lib.monotonic import monotonic
+
+
+EVENTS_INTERVAL = 'events'
+'''Value of the :ref:`interval <config-common-interval>` option that selects 
+event-driven reloading
+'''
+
+EVENTS_DEBOUNCE = 0.2
+'''Time (in seconds) without new events after which configuration is reloaded
+'''
+
+EVENTS_MAX_DELAY = 2
+'''Maximum time (in seconds) reload may be postponed while events keep coming
+'''
+
+EVENTS_FALLBACK_INTERVAL = 10
+'''Polling interval used in events mode when inotify is not available
+'''
 
 
 def open_file(path):
@@ -75,9 +101,13 @@ class ConfigLoader(MultiRunnedThread):
 		self.missing = defaultdict(set)
 		self.loaded = {}
 
+		self.waiter = None
+		self.paths_changed = True
+
 	def set_watcher(self, watcher_type, force=False):
 		if watcher_type == self.watcher_type:
 			return
+		from powerline.lib.watcher import create_file_watcher
 		watcher = create_file_watcher(self.pl, watcher_type)
 		with self.lock:
 			if self.watcher_type == 'deferred':
@@ -90,6 +120,19 @@ class ConfigLoader(MultiRunnedThread):
 
 	def set_interval(self, interval):
 		self.interval = interval
+		self.wakeup()
+
+	def wakeup(self, paths_changed=False):
+		'''Interrupt waiting for events in the loader thread
+
+		:param bool paths_changed:
+			If true set of watched paths will be recomputed.
+		'''
+		if paths_changed:
+			self.paths_changed = True
+		waiter = self.waiter
+		if waiter is not None:
+			waiter.wakeup()
 
 	def register(self, function, path):
 		'''Register function that will be run when file changes.
@@ -102,6 +145,7 @@ class ConfigLoader(MultiRunnedThread):
 		with self.lock:
 			self.watched[path].add(function)
 			self.watcher.watch(path)
+		self.wakeup(paths_changed=True)
 
 	def register_missing(self, condition_function, function, key):
 		'''Register any function that will be called with given key each 
@@ -124,6 +168,7 @@ class ConfigLoader(MultiRunnedThread):
 		'''
 		with self.lock:
 			self.missing[key].add((condition_function, function))
+		self.wakeup(paths_changed=True)
 
 	def unregister_functions(self, removed_functions):
 		'''Unregister files handled by these functions.
@@ -137,6 +182,7 @@ class ConfigLoader(MultiRunnedThread):
 				if not functions:
 					self.watched.pop(path)
 					self.loaded.pop(path, None)
+		self.wakeup(paths_changed=True)
 
 	def unregister_missing(self, removed_functions):
 		'''Unregister files handled by these functions.
@@ -151,14 +197,22 @@ class ConfigLoader(MultiRunnedThread):
 				functions -= removed_functions
 				if not functions:
 					self.missing.pop(key)
+		self.wakeup(paths_changed=True)
 
 	def load(self, path):
+		'''Load configuration file
+
+		:return:
+			Configuration with dictionaries and lists replaced with 
+			:py:class:`powerline.lib.dict.FrozenDict` and 
+			:py:class:`powerline.lib.dict.FrozenList`. Returned objects are 
+			shared between all callers and must not be modified.
+		'''
 		try:
 			# No locks: GIL does what we need
-			return deepcopy(self.loaded[path])
+			return self.loaded[path]
 		except KeyError:
-			r = self._load(path)
-			self.loaded[path] = deepcopy(r)
+			r = self.loaded[path] = freeze(self._load(path))
 			return r
 
 	def update(self):
@@ -194,7 +248,8 @@ class ConfigLoader(MultiRunnedThread):
 					self.missing.pop(key)
 		for path in toload:
 			try:
-				self.loaded[path] = deepcopy(self._load(path))
+				# Share unchanged parts with the previous version
+				self.loaded[path] = freeze(self._load(path), self.loaded.get(path))
 			except Exception as e:
 				self.exception('Error while loading {0}: {1}', path, str(e))
 				try:
@@ -206,13 +261,197 @@ class ConfigLoader(MultiRunnedThread):
 				except KeyError:
 					pass
 
+	def get_watched_paths(self):
+		'''Get paths which changes should trigger :py:meth:`update` call
+
+		:return:
+			Set of registered file paths and keys of missing files which are 
+			paths.
+		'''
+		with self.lock:
+			paths = set(self.watched)
+			paths.update((key for key in self.missing if isinstance(key, (str, unicode))))
+		return paths
+
+	def create_waiter(self):
+		'''Create object used to wait for configuration changes
+
+		:return:
+			:py:class:`powerline.lib.watcher.inotify.INotifyPathWaiter` 
+			instance or ``None`` if inotify is not available.
+		'''
+		if not sys.platform.startswith('linux'):
+			return None
+		from powerline.lib.inotify import INotifyError
+		from powerline.lib.watcher.inotify import INotifyPathWaiter
+		try:
+			return INotifyPathWaiter()
+		except INotifyError:
+			return None
+
 	def run(self):
+		waiter_failed = False
 		while self.interval is not None and not self.shutdown_event.is_set():
+			interval = self.interval
+			if interval == EVENTS_INTERVAL:
+				if not waiter_failed:
+					waiter = self.create_waiter()
+					if waiter is not None:
+						self.waiter = waiter
+						try:
+							self.run_events(waiter)
+						finally:
+							self.waiter = None
+							waiter.close()
+						continue
+					waiter_failed = True
+					if self.pl:
+						self.pl.info('Failed to create inotify waiter, polling each {0} seconds', EVENTS_FALLBACK_INTERVAL, prefix='config_loader')
+				interval = EVENTS_FALLBACK_INTERVAL
 			self.update()
-			self.shutdown_event.wait(self.interval)
+			self.shutdown_event.wait(interval)
+
+	def run_events(self, waiter):
+		'''Reload configuration when watched files change
+
+		Blocks on the inotify watches for the parent directories of both 
+		existing and missing configuration files: there is no filesystem 
+		activity while nothing changes. Reload is postponed until there were 
+		no events for :py:data:`EVENTS_DEBOUNCE` seconds, but no longer then 
+		for :py:data:`EVENTS_MAX_DELAY` seconds.
+		'''
+		changed = True
+		while self.interval == EVENTS_INTERVAL and not self.shutdown_event.is_set():
+			if self.paths_changed or changed:
+				self.paths_changed = False
+				waiter.set_paths(self.get_watched_paths())
+			if changed:
+				self.update()
+			# Timeout is only used to notice shutdown_event set without 
+			# .wakeup() call, it does not touch the filesystem.
+			changed = waiter.wait(60)
+			if changed:
+				deadline = monotonic() + EVENTS_MAX_DELAY
+				while not self.shutdown_event.is_set():
+					timeout = min(EVENTS_DEBOUNCE, deadline - monotonic())
+					if timeout <= 0 or not waiter.wait(timeout):
+						break
 
 	def exception(self, msg, *args, **kwargs):
 		if self.pl:
 			self.pl.exception(msg, prefix='config_loader', *args, **kwargs)
 		else:
 			raise
+
+
+def get_source_state(path):
+	'''Get value identifying contents of the configuration source
+
+	:return:
+		``(mtime, size, inode)`` tuple or ``None`` if file does not exist.
+	'''
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_mtime, st.st_size, st.st_ino)
+
+
+class ConfigSnapshot(object):
+	'''Compiled configuration kept between powerline runs
+
+	Stores already loaded and merged configuration (and other objects built 
+	from it) in a pickle file, along with the states of all files (including 
+	missing ones) they were built from. Snapshot is only used if none of these 
+	files changed since it was written.
+
+	:param str path:
+		Path to the snapshot file.
+	'''
+	version = 1
+
+	def __init__(self, path):
+		self.path = path
+		self.sources = {}
+		self.values = {}
+		self.dirty = False
+
+	def load(self):
+		'''Load snapshot file if it is up to date
+
+		Missing, unreadable or outdated snapshot is silently ignored.
+		'''
+		try:
+			with open(self.path, 'rb') as f:
+				data = pickle.load(f)
+			if data['version'] != self.version:
+				return
+			for path, state in data['sources'].items():
+				if get_source_state(path) != state:
+					return
+		except Exception:
+			return
+		self.sources = data['sources']
+		self.values = data['values']
+
+	def add_sources(self, paths):
+		'''Record state of the files values are going to be built from
+
+		Must be called before the files are read.
+		'''
+		for path in paths:
+			if path not in self.sources:
+				self.sources[path] = get_source_state(path)
+
+	def get(self, key, compute):
+		'''Get value from snapshot, computing and recording it if missing
+
+		:param tuple key:
+			Value identifier.
+		:param function compute:
+			Function without arguments computing the value. It must record 
+			files it reads with :py:meth:`add_sources`. Value must be 
+			picklable.
+
+		:return:
+			Value from the snapshot or the one returned by ``compute``.
+		'''
+		try:
+			return pickle.loads(self.values[key])
+		except KeyError:
+			pass
+		value = compute()
+		self.values[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+		self.dirty = True
+		return value
+
+	def save(self):
+		'''Write snapshot if new values were added to it
+
+		Errors are ignored: snapshot is only an optimization.
+		'''
+		if not self.dirty:
+			return
+		self.dirty = False
+		tmp_path = self.path + '.' + str(os.getpid())
+		try:
+			directory = os.path.dirname(self.path)
+			if not os.path.isdir(directory):
+				os.makedirs(directory)
+			with open(tmp_path, 'wb') as f:
+				pickle.dump({
+					'version': self.version,
+					'sources': self.sources,
+					'values': self.values,
+				}, f, pickle.HIGHEST_PROTOCOL)
+			try:
+				os.rename(tmp_path, self.path)
+			except OSError:
+				# Windows does not replace existing files on rename
+				os.remove(self.path)
+				os.rename(tmp_path, self.path)
+		except (IOError, OSError):
+			try:
+				os.remove(tmp_path)
+			except OSError:
+				pass
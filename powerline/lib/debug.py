@@ -7,6 +7,8 @@ import sys
 from types import FrameType
 from itertools import chain
 
+from powerline.lib.monotonic import monotonic
+
 
 # From http://code.activestate.com/recipes/523004-find-cyclical-references/
 def print_cycles(objects, outstream=sys.stdout, show_progress=False):
@@ -95,3 +97,74 @@ def print_cycles(objects, outstream=sys.stdout, show_progress=False):
 		except AttributeError:
 			continue
 		recurse(obj, obj, {}, ())
+
+
+class StartupProfile(object):
+	'''Collect time spent in powerline startup phases and module imports
+
+	Phases are measured with :py:meth:`phase`, imports of modules requested 
+	by configuration (segments, renderer, log handlers) with the function 
+	returned by :py:meth:`wrap_module_attr_getter`.
+	'''
+	def __init__(self):
+		self.phases = []
+		self.imports = []
+
+	def phase(self, name):
+		'''Get context manager measuring duration of the given phase'''
+		return _ProfiledPhase(self.phases, name)
+
+	def wrap_module_attr_getter(self, get_module_attr):
+		'''Make function returned by gen_module_attr_getter record imports
+
+		Only first imports of modules are recorded. Import time includes time 
+		spent importing dependencies which were not imported yet.
+		'''
+		def profiled_get_module_attr(module, attr, prefix='powerline'):
+			if str(module) in sys.modules:
+				return get_module_attr(module, attr, prefix=prefix)
+			start = monotonic()
+			try:
+				return get_module_attr(module, attr, prefix=prefix)
+			finally:
+				self.imports.append((module, monotonic() - start))
+		return profiled_get_module_attr
+
+	def write(self, outstream=sys.stderr):
+		'''Write collected timings, in milliseconds'''
+		outstream.write('Phases:\n')
+		for name, duration in self.phases:
+			outstream.write('  {0:>9.3f} ms  {1}\n'.format(duration * 1000, name))
+		outstream.write('Imports:\n')
+		for module, duration in sorted(self.imports, key=lambda item: -item[1]):
+			outstream.write('  {0:>9.3f} ms  {1}\n'.format(duration * 1000, module))
+
+
+class _ProfiledPhase(object):
+	__slots__ = ('phases', 'name', 'start')
+
+	def __init__(self, phases, name):
+		self.phases = phases
+		self.name = name
+
+	def __enter__(self):
+		self.start = monotonic()
+
+	def __exit__(self, *args):
+		self.phases.append((self.name, monotonic() - self.start))
+
+
+class _NotProfiledPhase(object):
+	__slots__ = ()
+
+	def __enter__(self):
+		pass
+
+	def __exit__(self, *args):
+		pass
+
+
+NOT_PROFILED_PHASE = _NotProfiledPhase()
+'''Context manager doing nothing, used in place of :py:meth:`StartupProfile.phase` 
+when profiling is disabled
+'''
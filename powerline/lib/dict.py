@@ -1,6 +1,8 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
+from copy import deepcopy
+
 
 REMOVE_THIS_KEY = object()
 
@@ -64,22 +66,138 @@ def _setmerged(d1, d2):
 		d1.setmerged(d2)
 
 
-def mergedicts_copy(d1, d2):
+def _without_special_values(d):
+	'''Get dictionary without REMOVE_THIS_KEY values
+
+	Dictionary is copied only if it contains such values.
+	'''
+	ret = d
+	for k, v in d.items():
+		if v is REMOVE_THIS_KEY:
+			if ret is d:
+				ret = d.copy()
+			ret.pop(k)
+		elif isinstance(v, dict):
+			new_v = _without_special_values(v)
+			if new_v is not v:
+				if ret is d:
+					ret = d.copy()
+				ret[k] = new_v
+	return ret
+
+
+def mergedicts_copy(d1, d2, remove=False):
 	'''Recursively merge two dictionaries.
 
-	Dictionaries are not modified. Copying happens only if necessary. Assumes 
-	that first dictionary supports .copy() method.
+	Dictionaries are not modified. Copying happens only if necessary: 
+	subdictionaries not affected by merging are shared with the arguments. 
+	Assumes that first dictionary supports .copy() method.
+
+	:param bool remove:
+		If true then keys with REMOVE_THIS_KEY value in the second dictionary 
+		are removed from the result, like :py:func:`mergedicts` does.
 	'''
 	ret = d1.copy()
 	_setmerged(ret, d2)
 	for k in d2:
 		if k in d1 and isinstance(d1[k], dict) and isinstance(d2[k], dict):
-			ret[k] = mergedicts_copy(d1[k], d2[k])
+			ret[k] = mergedicts_copy(d1[k], d2[k], remove)
+		elif remove and d2[k] is REMOVE_THIS_KEY:
+			ret.pop(k, None)
+		elif remove and isinstance(d2[k], dict):
+			ret[k] = _without_special_values(d2[k])
 		else:
 			ret[k] = d2[k]
 	return ret
 
 
+def _frozen(self, *args, **kwargs):
+	raise TypeError('Configuration objects are shared and must not be modified')
+
+
+class FrozenDict(dict):
+	'''Dictionary which cannot be modified
+
+	Used for loaded configuration which is shared between all its users. 
+	:py:meth:`copy` (as well as :py:func:`copy.copy` and 
+	:py:func:`copy.deepcopy`) returns regular (mutable) dictionary: use it or 
+	:py:func:`mergedicts_copy` to obtain modified configuration.
+	'''
+	__setitem__ = __delitem__ = _frozen
+	clear = pop = popitem = setdefault = update = _frozen
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		return deepcopy(dict(self), memo)
+
+	def __reduce__(self):
+		return (self.__class__, (dict(self),))
+
+
+class FrozenList(list):
+	'''List which cannot be modified
+
+	Like :py:class:`FrozenDict`, but for lists.
+	'''
+	__setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+	__setslice__ = __delslice__ = _frozen
+	append = extend = insert = pop = remove = reverse = sort = _frozen
+
+	def copy(self):
+		return list(self)
+
+	__copy__ = copy
+
+	def __deepcopy__(self, memo):
+		return deepcopy(list(self), memo)
+
+	def __reduce__(self):
+		return (self.__class__, (list(self),))
+
+
+def freeze(value, old=None):
+	'''Convert loaded configuration to immutable objects
+
+	Only plain dictionaries and lists are converted, their subclasses (e.g. 
+	marked values used by powerline-lint) are left as-is.
+
+	:param value:
+		Configuration value.
+	:param old:
+		Previously frozen configuration value. Parts of the new value equal to 
+		the corresponding parts of the old one are replaced with the old 
+		objects so that unchanged subtrees are shared between configuration 
+		versions.
+
+	:return: Frozen value.
+	'''
+	if type(value) is dict:
+		old_dict = old if isinstance(old, FrozenDict) else {}
+		items = [(k, freeze(v, old_dict.get(k))) for k, v in value.items()]
+		if old_dict is old and len(old_dict) == len(items) and all((
+			k in old_dict and old_dict[k] is v
+			for k, v in items
+		)):
+			return old
+		return FrozenDict(items)
+	elif type(value) is list:
+		old_list = old if isinstance(old, FrozenList) else ()
+		items = [
+			freeze(v, old_list[i] if i < len(old_list) else None)
+			for i, v in enumerate(value)
+		]
+		if old_list is old and len(old_list) == len(items) and all((
+			old_v is v for old_v, v in zip(old_list, items)
+		)):
+			return old
+		return FrozenList(items)
+	elif value == old and type(value) is type(old):
+		return old
+	return value
+
+
 def updated(d, *args, **kwargs):
     '''Copy dictionary and update it with provided arguments
     '''
@@ -0,0 +1,121 @@
+# vim:fileencoding=utf-8:noet
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import sys
+
+from threading import Lock, local
+
+try:
+	from importlib.machinery import PathFinder
+except ImportError:
+	PathFinder = None
+	import imp
+
+
+_state = local()
+_install_lock = Lock()
+
+
+class _ImpLoader(object):
+	'''PEP 302 loader for Python versions without :py:mod:`importlib.machinery`
+	'''
+	def __init__(self, found):
+		self.found = found
+
+	def load_module(self, fullname):
+		if fullname in sys.modules:
+			return sys.modules[fullname]
+		fp = self.found[0]
+		try:
+			return imp.load_module(fullname, *self.found)
+		finally:
+			if fp:
+				fp.close()
+
+
+class ImportPathsFinder(object):
+	'''Meta path finder that searches top-level modules in additional paths
+
+	Paths are set per thread by :py:func:`import_module_attr` for the duration
+	of the import, so unlike prepending them to :py:data:`sys.path` this is
+	safe to use from multiple threads. Paths take precedence over
+	:py:data:`sys.path`, this also holds for imports done by modules imported
+	from them.
+	'''
+	@staticmethod
+	def get_import_paths(path):
+		if path is not None:
+			# Submodules are found using parent package ``__path__``
+			return None
+		return getattr(_state, 'import_paths', None) or None
+
+	def find_spec(self, fullname, path=None, target=None):
+		import_paths = self.get_import_paths(path)
+		if import_paths is None:
+			return None
+		return PathFinder.find_spec(fullname, import_paths)
+
+	def find_module(self, fullname, path=None):
+		import_paths = self.get_import_paths(path)
+		if import_paths is None:
+			return None
+		try:
+			found = imp.find_module(fullname, import_paths)
+		except ImportError:
+			return None
+		return _ImpLoader(found)
+
+	def invalidate_caches(self):
+		pass
+
+
+finder = ImportPathsFinder()
+
+
+def install_finder():
+	'''Add :py:data:`finder` to :py:data:`sys.meta_path` if it is not there
+
+	Finder is inserted before the finder that handles :py:data:`sys.path`, so
+	builtin modules cannot be shadowed, just like with ``sys.path``
+	modifications.
+	'''
+	if finder in sys.meta_path:
+		return
+	with _install_lock:
+		if finder in sys.meta_path:
+			return
+		meta_path = list(sys.meta_path)
+		try:
+			index = meta_path.index(PathFinder)
+		except ValueError:
+			index = len(meta_path)
+		meta_path.insert(index, finder)
+		sys.meta_path[:] = meta_path
+
+
+def import_module_attr(module, attr, import_paths=None):
+	'''Import module and get its attribute
+
+	Replaces ``from {module} import {attr}`` with ``import_paths`` prepended to
+	:py:data:`sys.path`, but does not modify :py:data:`sys.path`.
+
+	:param str module:
+		Module name.
+	:param str attr:
+		Module attribute name.
+	:param list import_paths:
+		Additional paths where top-level modules are searched for.
+
+	:return: Attribute value.
+
+	:raise ImportError: if module was not found.
+	:raise AttributeError: if module has no such attribute.
+	'''
+	if import_paths:
+		install_finder()
+	old_import_paths = getattr(_state, 'import_paths', None)
+	_state.import_paths = import_paths
+	try:
+		return getattr(__import__(module, fromlist=(attr,)), attr)
+	finally:
+		_state.import_paths = old_import_paths
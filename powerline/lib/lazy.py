@@ -0,0 +1,79 @@
+# vim:fileencoding=utf-8:noet
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import sys
+
+from threading import Lock
+
+
+class LazyModule(object):
+	'''Proxy for the module that is imported on first attribute access
+
+	Used for optional and heavy dependencies so that importing segment
+	modules does not import them: they are imported only when segment that
+	needs them first runs. If module is not available accessing any of its
+	attributes raises :py:exc:`ImportError`, use :py:func:`available` to check
+	this beforehand.
+
+	:param str name:
+		Full name of the module.
+	'''
+	def __init__(self, name):
+		self.__dict__.update(
+			_lazy_name=str(name),
+			_lazy_module=None,
+			_lazy_error=None,
+			_lazy_lock=Lock(),
+		)
+
+	def _lazy_load(self):
+		module = self._lazy_module
+		if module is not None:
+			return module
+		with self._lazy_lock:
+			if self._lazy_module is None:
+				if self._lazy_error is not None:
+					raise ImportError(self._lazy_error)
+				try:
+					__import__(self._lazy_name)
+				except ImportError as e:
+					self.__dict__['_lazy_error'] = str(e)
+					raise
+				self.__dict__['_lazy_module'] = sys.modules[self._lazy_name]
+			return self._lazy_module
+
+	def __getattr__(self, attr):
+		return getattr(self._lazy_load(), attr)
+
+	def __setattr__(self, attr, value):
+		setattr(self._lazy_load(), attr, value)
+
+	def __repr__(self):
+		return '<lazy module {0!r}>'.format(self._lazy_name)
+
+
+def lazy_import(name):
+	'''Create lazily imported module
+
+	:param str name:
+		Full name of the module.
+
+	:return: :py:class:`LazyModule` instance.
+	'''
+	return LazyModule(name)
+
+
+def available(module):
+	'''Check whether module can be used, importing it if needed
+
+	:param module:
+		:py:class:`LazyModule` instance or regular module object.
+
+	:return: ``True`` if module was (or can be) imported, ``False`` otherwise.
+	'''
+	if isinstance(module, LazyModule):
+		try:
+			module._lazy_load()
+		except ImportError:
+			return False
+	return module is not None
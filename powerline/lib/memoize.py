@@ -2,6 +2,7 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 from functools import wraps
+from collections import OrderedDict
 
 from powerline.lib.monotonic import monotonic
 
@@ -40,3 +41,143 @@ class memoize(object):
 				}
 			return cached['result']
 		return decorated_function
+
+
+class LRUCache(object):
+	'''Dictionary-like cache holding at most ``maxsize`` items
+
+	When cache is full least recently used item is discarded. Supports only 
+	the subset of dictionary interface needed by powerline: item lookup (which 
+	raises ``KeyError`` for missing keys), item assignment, ``len()``, 
+	``.pop()`` and ``.clear()``.
+
+	:param int maxsize:
+		Maximum number of items kept in cache.
+	'''
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.data = OrderedDict()
+
+	def __getitem__(self, key):
+		value = self.data.pop(key)
+		self.data[key] = value
+		return value
+
+	def __setitem__(self, key, value):
+		self.data.pop(key, None)
+		self.data[key] = value
+		while len(self.data) > self.maxsize:
+			self.data.popitem(last=False)
+
+	def __contains__(self, key):
+		return key in self.data
+
+	def __len__(self):
+		return len(self.data)
+
+	def pop(self, key, *args):
+		return self.data.pop(key, *args)
+
+	def clear(self):
+		self.data.clear()
+
+
+class ExpiringLRUCache(LRUCache):
+	'''LRU cache which additionally drops items not accessed for ``ttl`` seconds
+
+	Expired items are purged lazily: when they are looked up and when new 
+	items are added. Cache usage is counted in :py:attr:`hits`, 
+	:py:attr:`misses`, :py:attr:`evictions` (items discarded because cache is 
+	full) and :py:attr:`expirations` attributes, see :py:meth:`stats`.
+
+	:param int maxsize:
+		Maximum number of items kept in cache.
+	:param float ttl:
+		Time in seconds after the last access when item expires. ``None`` 
+		disables expiration.
+	'''
+	def __init__(self, maxsize, ttl=None):
+		super(ExpiringLRUCache, self).__init__(maxsize)
+		self.ttl = ttl
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+
+	def expired(self, atime, now):
+		# Treat time going backwards (not applicable for monotonic clock) as 
+		# expiration as well
+		return self.ttl is not None and not (atime <= now < atime + self.ttl)
+
+	def evict(self, key, value):
+		'''Called for each item discarded because of size or time limits
+
+		Items removed with :py:meth:`pop` or :py:meth:`clear` are not passed 
+		here. Does nothing by default.
+		'''
+		pass
+
+	def __getitem__(self, key):
+		try:
+			atime, value = self.data.pop(key)
+		except KeyError:
+			self.misses += 1
+			raise
+		now = monotonic()
+		if self.expired(atime, now):
+			self.misses += 1
+			self.expirations += 1
+			self.evict(key, value)
+			raise KeyError(key)
+		self.hits += 1
+		self.data[key] = (now, value)
+		return value
+
+	def __setitem__(self, key, value):
+		now = monotonic()
+		self.data.pop(key, None)
+		while self.data:
+			oldest = next(iter(self.data))
+			atime, old_value = self.data[oldest]
+			if not self.expired(atime, now):
+				break
+			del self.data[oldest]
+			self.expirations += 1
+			self.evict(oldest, old_value)
+		self.data[key] = (now, value)
+		while len(self.data) > self.maxsize:
+			old_key, (atime, old_value) = self.data.popitem(last=False)
+			self.evictions += 1
+			self.evict(old_key, old_value)
+
+	def __contains__(self, key):
+		try:
+			atime = self.data[key][0]
+		except KeyError:
+			return False
+		return not self.expired(atime, monotonic())
+
+	def pop(self, key, *args):
+		try:
+			return self.data.pop(key)[1]
+		except KeyError:
+			if args:
+				return args[0]
+			raise
+
+	def stats(self):
+		'''Get cache usage statistics
+
+		:return:
+			Dictionary with current ``size``, ``maxsize``, ``ttl`` and 
+			``hits``, ``misses``, ``evictions`` and ``expirations`` counters.
+		'''
+		return {
+			'size': len(self.data),
+			'maxsize': self.maxsize,
+			'ttl': self.ttl,
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'expirations': self.expirations,
+		}
@@ -0,0 +1,151 @@
+# vim:fileencoding=utf-8:noet
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+
+from threading import Lock
+
+from powerline.lib.monotonic import monotonic
+
+
+def parse_net_dev(data):
+	'''Parse :file:`/proc/net/dev`
+
+	:return: Dictionary mapping interface names to ``(rx_bytes, tx_bytes)``
+	         pairs.
+	'''
+	ret = {}
+	for line in data.splitlines()[2:]:
+		interface, sep, counters = line.partition(b':')
+		if not sep:
+			continue
+		counters = counters.split()
+		ret[interface.strip().decode('utf-8')] = (int(counters[0]), int(counters[8]))
+	return ret
+
+
+def parse_net_route(data):
+	'''Parse :file:`/proc/net/route`
+
+	:return: Name of the interface used by the default route or ``None``.
+	'''
+	for line in data.splitlines()[1:]:
+		parts = line.split()
+		if len(parts) > 1 and not parts[1].replace(b'0', b''):
+			return parts[0].decode('utf-8')
+	return None
+
+
+def parse_stat(data):
+	'''Parse CPU lines of :file:`/proc/stat`
+
+	:return:
+		``(total, cores)`` pair: ``total`` is a tuple with the aggregate times
+		CPUs spent in each state (user, nice, system, idle, iowait, …) in
+		``USER_HZ`` units, ``cores`` is a list with the same tuples for each
+		core.
+	'''
+	total = None
+	cores = []
+	for line in data.splitlines():
+		if not line.startswith(b'cpu'):
+			# CPU lines go first
+			break
+		fields = line.split()
+		times = tuple((int(field) for field in fields[1:]))
+		if fields[0] == b'cpu':
+			total = times
+		else:
+			cores.append(times)
+	return total, cores
+
+
+def parse_loadavg(data):
+	'''Parse :file:`/proc/loadavg`
+
+	:return: Tuple with 1, 5 and 15 minute load averages.
+	'''
+	return tuple((float(avg) for avg in data.split()[:3]))
+
+
+def parse_uptime(data):
+	'''Parse :file:`/proc/uptime`
+
+	:return: System uptime in seconds.
+	'''
+	return float(data.split()[0])
+
+
+def cpu_percent(old_times, new_times):
+	'''Compute CPU utilisation from two samples of times from /proc/stat
+
+	:param tuple old_times:
+		Times from the first sample, as returned by :py:func:`parse_stat`.
+	:param tuple new_times:
+		Times from the second sample.
+
+	:return:
+		Percentage of time CPU was busy between samples or ``None`` if no
+		time elapsed.
+	'''
+	# guest and guest_nice times are already included into user and nice
+	deltas = [new - old for old, new in zip(old_times[:8], new_times[:8])]
+	total = sum(deltas)
+	if total <= 0:
+		return None
+	idle = sum(deltas[3:5])
+	return (total - idle) * 100.0 / total
+
+
+class ProcReader(object):
+	'''Read system counters from /proc, sharing results between segments
+
+	Each file is read and parsed at most once per :py:attr:`tick`: segments
+	updated at the same time (e.g. by the same scheduler run) get the same
+	sample with the same timestamp, so their measure intervals agree.
+
+	:param str root:
+		Directory where proc filesystem is mounted.
+	:param float tick:
+		Time during which samples are reused, in seconds.
+	'''
+	parsers = {
+		'net/dev': parse_net_dev,
+		'net/route': parse_net_route,
+		'stat': parse_stat,
+		'loadavg': parse_loadavg,
+		'uptime': parse_uptime,
+	}
+
+	def __init__(self, root='/proc', tick=0.1):
+		self.root = root
+		self.tick = tick
+		self.samples = {}
+		self.lock = Lock()
+
+	def exists(self, name):
+		'''Check whether file in /proc is available'''
+		return os.path.exists(os.path.join(self.root, name))
+
+	def sample(self, name):
+		'''Get parsed contents of the given file
+
+		:param str name:
+			File name relative to :file:`/proc`, one of the keys of
+			:py:attr:`parsers`.
+
+		:return:
+			``(time, data)`` pair where ``time`` is the :py:func:`monotonic`
+			time of the read and ``data`` is the value returned by the parser.
+		'''
+		with self.lock:
+			now = monotonic()
+			sample = self.samples.get(name)
+			if sample is None or not (sample[0] <= now < sample[0] + self.tick):
+				with open(os.path.join(self.root, name), 'rb') as f:
+					data = f.read()
+				sample = self.samples[name] = (now, self.parsers[name](data))
+			return sample
+
+
+proc_reader = ProcReader()
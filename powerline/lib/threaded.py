@@ -1,8 +1,10 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-from threading import Thread, Lock, Event
+from threading import Thread, Lock, Event, Condition
 from types import MethodType
+from heapq import heappush, heappop, heapify
+from itertools import count
 
 from powerline.lib.monotonic import monotonic
 from powerline.segments import Segment
@@ -29,11 +31,172 @@ class MultiRunnedThread(object):
 		return None
 
 
+class ScheduledJob(object):
+	'''Periodic job run by :py:class:`Scheduler`
+
+	Provides the subset of :py:class:`threading.Thread` interface used for 
+	threaded segments: :py:meth:`is_alive` and :py:meth:`join`.
+	'''
+	def __init__(self, scheduler, key, func, interval, min_sleep_time):
+		self.scheduler = scheduler
+		self.key = key
+		self.func = func
+		self.interval = interval
+		self.min_sleep_time = min_sleep_time
+		self.shutdown_events = []
+		self.finished = Event()
+
+	def is_cancelled(self):
+		return all((event.is_set() for event in self.shutdown_events))
+
+	def is_alive(self):
+		return not self.finished.is_set()
+
+	def join(self, timeout=None):
+		self.scheduler.wakeup()
+		self.finished.wait(timeout)
+
+
+class Scheduler(object):
+	'''Run periodic jobs using a small pool of worker threads
+
+	Jobs are kept in a heap ordered by the time of the next run. Each job is 
+	identified by a key: scheduling a job with a key that is already known 
+	adds one more subscriber to the existing job instead of creating a new 
+	one. Job is removed once shutdown events of all its subscribers are set.
+
+	Workers are started on demand, one per job, until there are 
+	:py:attr:`max_workers` of them. Workers exit when there are no jobs left.
+
+	:param bool daemon:
+		Determines whether worker threads are daemon threads.
+	'''
+	max_workers = 4
+
+	def __init__(self, daemon=True):
+		self.daemon = daemon
+		self.condition = Condition()
+		self.jobs = {}
+		self.heap = []
+		self.workers = 0
+		self.seq = count()
+
+	def schedule(self, key, func, interval, shutdown_event, delay=0, min_sleep_time=0.1):
+		'''Schedule calling function each ``interval`` seconds
+
+		:param key:
+			Job identifier. If job with this key already exists its interval is 
+			updated and ``shutdown_event`` is added to its subscribers.
+		:param func:
+			Function without arguments. Must not raise exceptions.
+		:param float interval:
+			Time between the start of one call and the start of the next one.
+		:param Event shutdown_event:
+			Job is stopped when this event and shutdown events of all other 
+			subscribers are set.
+		:param float delay:
+			Time before the first run of the newly created job.
+		:param float min_sleep_time:
+			Minimal time between the end of one call and the start of the next 
+			one.
+
+		:return: :py:class:`ScheduledJob` instance.
+		'''
+		with self.condition:
+			job = self.jobs.get(key)
+			if job is None:
+				job = ScheduledJob(self, key, func, interval, min_sleep_time)
+				self.jobs[key] = job
+				heappush(self.heap, (monotonic() + delay, next(self.seq), job))
+				if self.workers < min(len(self.jobs), self.max_workers):
+					self.workers += 1
+					thread = Thread(target=self.work)
+					thread.daemon = self.daemon
+					thread.start()
+			else:
+				job.interval = interval
+			if shutdown_event not in job.shutdown_events:
+				job.shutdown_events.append(shutdown_event)
+			self.condition.notify()
+			return job
+
+	def wakeup(self):
+		'''Make workers remove jobs whose shutdown events were set'''
+		with self.condition:
+			self.condition.notify_all()
+
+	def finish(self, job):
+		del self.jobs[job.key]
+		job.finished.set()
+
+	def remove_cancelled(self):
+		heap = [entry for entry in self.heap if not entry[2].is_cancelled()]
+		if len(heap) != len(self.heap):
+			for entry in self.heap:
+				if entry[2].is_cancelled():
+					self.finish(entry[2])
+			heapify(heap)
+			self.heap = heap
+
+	def get_job(self):
+		with self.condition:
+			while True:
+				self.remove_cancelled()
+				if not self.jobs:
+					self.workers -= 1
+					return None
+				if self.heap:
+					delay = self.heap[0][0] - monotonic()
+					if delay <= 0:
+						return heappop(self.heap)[2]
+				else:
+					# All jobs are being run by other workers.
+					delay = None
+				self.condition.wait(delay)
+
+	def work(self):
+		while True:
+			job = self.get_job()
+			if job is None:
+				return
+			start_time = monotonic()
+			job.func()
+			with self.condition:
+				if job.is_cancelled():
+					self.finish(job)
+				else:
+					heappush(self.heap, (
+						max(start_time + job.interval, monotonic() + job.min_sleep_time),
+						next(self.seq),
+						job,
+					))
+					self.condition.notify()
+
+
+schedulers = {}
+schedulers_lock = Lock()
+
+
+def get_scheduler(daemon):
+	'''Get scheduler shared by all threaded segments
+
+	:param bool daemon:
+		Determines whether scheduler uses daemon threads.
+	'''
+	with schedulers_lock:
+		try:
+			return schedulers[daemon]
+		except KeyError:
+			scheduler = schedulers[daemon] = Scheduler(daemon)
+			return scheduler
+
+
 class ThreadedSegment(Segment, MultiRunnedThread):
 	min_sleep_time = 0.1
 	update_first = True
 	interval = 1
 	daemon = False
+	powerline_dependencies = ()
 
 	argmethods = ('render', 'set_state')
 
@@ -44,6 +207,7 @@ class ThreadedSegment(Segment, MultiRunnedThread):
 		self.crashed_value = None
 		self.update_value = None
 		self.updated = False
+		self.version = 0
 
 	def __call__(self, pl, update_first=True, **kwargs):
 		if self.run_once:
@@ -67,6 +231,8 @@ class ThreadedSegment(Segment, MultiRunnedThread):
 		return self.render(update_value, update_first=update_first, pl=pl, **kwargs)
 
 	def set_update_value(self):
+		old_update_value = self.update_value
+		old_crashed = self.crashed
 		try:
 			self.update_value = self.update(self.update_value)
 		except Exception as e:
@@ -78,31 +244,41 @@ class ThreadedSegment(Segment, MultiRunnedThread):
 		else:
 			self.crashed = False
 			self.updated = True
+		if self.crashed != old_crashed or self.update_value != old_update_value:
+			self.version += 1
+
+	def get_version(self):
+		'''Get number that is incremented each time update value changes
+
+		Is used as a part of segment fingerprint by the render cache. Returns 
+		``None`` when segment is updated synchronously from ``__call__``.
+		'''
+		if self.run_once or not self.is_alive():
+			return None
+		return self.version
 
 	def get_update_value(self, update=False):
 		if update:
 			self.set_update_value()
 		return self.update_value
 
-	def run(self):
-		if self.do_update_first:
-			start_time = monotonic()
-			while True:
-				self.shutdown_event.wait(max(self.interval - (monotonic() - start_time), self.min_sleep_time))
-				if self.shutdown_event.is_set():
-					break
-				start_time = monotonic()
-				self.set_update_value()
-		else:
-			while not self.shutdown_event.is_set():
-				start_time = monotonic()
-				self.set_update_value()
-				self.shutdown_event.wait(max(self.interval - (monotonic() - start_time), self.min_sleep_time))
+	def start(self):
+		self.shutdown_event.clear()
+		self.thread = get_scheduler(self.daemon).schedule(
+			key=self,
+			func=self.set_update_value,
+			interval=self.interval,
+			shutdown_event=self.shutdown_event,
+			delay=self.interval if self.do_update_first else 0,
+			min_sleep_time=self.min_sleep_time,
+		)
 
 	def shutdown(self):
 		self.shutdown_event.set()
+		if self.thread:
+			self.thread.scheduler.wakeup()
 		if self.daemon and self.is_alive():
-			# Give the worker thread a chance to shutdown, but don’t block for 
+			# Give the running update a chance to finish, but don’t block for 
 			# too long
 			self.join(0.01)
 
@@ -127,8 +303,10 @@ class ThreadedSegment(Segment, MultiRunnedThread):
 
 		self.set_state(**kwargs)
 
-		if not self.is_alive():
-			self.start()
+		# Segment objects are shared by all Powerline instances in the process: 
+		# if update job is already running this only subscribes new shutdown 
+		# event to it.
+		self.start()
 
 	def critical(self, *args, **kwargs):
 		self.pl.critical(prefix=self.__class__.__name__, *args, **kwargs)
@@ -1,12 +1,14 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
+import re
 import sys
 import codecs
 
 from unicodedata import east_asian_width, combining
 
 from powerline.lib.encoding import get_preferred_output_encoding
+from powerline.lib.memoize import LRUCache
 
 
 try:
@@ -281,3 +283,99 @@ strwidth_ucs_2.__doc__ = _strwidth_documentation.format(
 	represented using two symbols forming a surrogate pair, which is the only 
 	option in UCS-2 Python builds. It still works correctly in UCS-4 Python 
 	builds, but is slower then its UCS-4 counterpart.''')
+
+
+WIDTH_CLASSES = ('N', 'Na', 'A', 'H', 'W', 'F')
+'''East asian width property values in order used by width pages
+
+Index ``len(WIDTH_CLASSES)`` is used for combining characters.
+'''
+
+_width_class_indexes = dict(((cls, i) for i, cls in enumerate(WIDTH_CLASSES)))
+_combining_index = len(WIDTH_CLASSES)
+_width_pages = {}
+
+
+def get_width_page(page):
+	'''Get width classes of 256 characters starting from ``page * 256``
+
+	Pages are computed using :py:mod:`unicodedata` on first request and kept 
+	for the lifetime of the process.
+
+	:return:
+		``bytearray`` with indexes in :py:data:`WIDTH_CLASSES` tuple (or index 
+		equal to its length for combining characters).
+	'''
+	try:
+		return _width_pages[page]
+	except KeyError:
+		pass
+	start = page << 8
+	ret = bytearray(256)
+	for i in range(256):
+		symbol = unichr(start + i)
+		if combining(symbol):
+			ret[i] = _combining_index
+		else:
+			ret[i] = _width_class_indexes[east_asian_width(symbol)]
+	_width_pages[page] = ret
+	return ret
+
+
+if hasattr(unicode, 'isascii'):
+	is_ascii = unicode.isascii
+else:
+	_non_ascii_re = re.compile('[^\x00-\x7F]')
+
+	def is_ascii(string):
+		return not _non_ascii_re.search(string)
+
+
+def gen_strwidth(width_data, cache_size=1024):
+	'''Create function computing string width in display cells
+
+	Returned function gives the same results as :py:func:`strwidth_ucs_4` (or 
+	:py:func:`strwidth_ucs_2` in UCS-2 Python builds), but is faster: width of 
+	ASCII strings is their length, widths of other characters are taken from 
+	lazily computed tables (see :py:func:`get_width_page`) and widths of 
+	recently seen non-ASCII strings are cached.
+
+	:param dict width_data:
+		Dictionary which maps east_asian_width property values to strings 
+		lengths. See :py:func:`strwidth_ucs_4` documentation.
+	:param int cache_size:
+		Number of non-ASCII strings whose widths are remembered.
+
+	:return: Function which accepts one unicode string.
+	'''
+	ascii_fast_path = width_data['N'] == 1 and width_data['Na'] == 1
+	cache = LRUCache(cache_size)
+
+	if sys.maxunicode < 0x10FFFF:
+		compute_width = lambda string: strwidth_ucs_2(width_data, string)
+	else:
+		widths = [width_data[cls] for cls in WIDTH_CLASSES] + [0]
+		pages = _width_pages
+
+		def compute_width(string):
+			ret = 0
+			for symbol in string:
+				code = ord(symbol)
+				try:
+					page = pages[code >> 8]
+				except KeyError:
+					page = get_width_page(code >> 8)
+				ret += widths[page[code & 0xFF]]
+			return ret
+
+	def strwidth(string):
+		if ascii_fast_path and is_ascii(string):
+			return len(string)
+		try:
+			return cache[string]
+		except KeyError:
+			pass
+		ret = cache[string] = compute_width(string)
+		return ret
+
+	return strwidth
@@ -1,17 +1,25 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-try:
-	from urllib.error import HTTPError  # NOQA
-	from urllib.request import urlopen  # NOQA
-	from urllib.parse import urlencode as urllib_urlencode  # NOQA
-except ImportError:
-	from urllib2 import urlopen, HTTPError  # NOQA
-	from urllib import urlencode as urllib_urlencode  # NOQA
+import sys
+
+from powerline.lib.lazy import lazy_import
+
+if sys.version_info < (3,):
+	urllib_parse = lazy_import('urllib')
+	urllib_request = urllib_error = lazy_import('urllib2')
+else:
+	urllib_parse = lazy_import('urllib.parse')
+	urllib_request = lazy_import('urllib.request')
+	urllib_error = lazy_import('urllib.error')
+
+
+def urllib_urlencode(query):
+	return urllib_parse.urlencode(query)
 
 
 def urllib_read(url):
 	try:
-		return urlopen(url, timeout=10).read().decode('utf-8')
-	except HTTPError:
+		return urllib_request.urlopen(url, timeout=10).read().decode('utf-8')
+	except urllib_error.HTTPError:
 		return
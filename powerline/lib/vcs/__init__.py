@@ -4,12 +4,13 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 import os
 import errno
 
-from threading import Lock
+from threading import Lock, Condition, Thread
 from collections import defaultdict
 
-from powerline.lib.watcher import create_tree_watcher
+from powerline.lib.monotonic import monotonic
 from powerline.lib.unicode import out_u
 from powerline.lib.path import join
+from powerline.lib.memoize import ExpiringLRUCache
 
 
 def generate_directories(path):
@@ -45,7 +46,17 @@ def branch_watcher(create_watcher):
 	return _branch_watcher
 
 
-branch_name_cache = {}
+CACHE_TTL = 3600
+'''Time in seconds after which unused cached file statuses and branch names expire'''
+
+FILE_STATUS_CACHE_SIZE = 1024
+'''Default maximum number of cached file statuses'''
+
+BRANCH_NAME_CACHE_SIZE = 64
+'''Default maximum number of cached branch names'''
+
+
+branch_name_cache = ExpiringLRUCache(BRANCH_NAME_CACHE_SIZE, CACHE_TTL)
 branch_lock = Lock()
 file_status_lock = Lock()
 
@@ -76,21 +87,42 @@ def get_branch_name(directory, config_file, get_func, create_watcher):
 				if getattr(e, 'errno', None) != errno.ENOENT:
 					raise
 				# Config file does not exist (happens for mercurial)
-				if config_file not in branch_name_cache:
-					branch_name_cache[config_file] = out_u(get_func(directory, config_file))
-		if changed:
-			# Config file has changed or was not tracked
-			branch_name_cache[config_file] = out_u(get_func(directory, config_file))
-		return branch_name_cache[config_file]
+		if not changed:
+			try:
+				return branch_name_cache[config_file]
+			except KeyError:
+				# Not cached yet or evicted
+				pass
+		# Config file has changed or was not tracked
+		branch_name_cache[config_file] = ans = out_u(get_func(directory, config_file))
+		return ans
 
 
-class FileStatusCache(dict):
-	def __init__(self):
-		self.dirstate_map = defaultdict(set)
-		self.ignore_map = defaultdict(set)
+def _discard_key(mapping, key, value):
+	keys = mapping.get(key)
+	if keys is not None:
+		keys.discard(value)
+		if not keys:
+			del mapping[key]
+
+
+class FileStatusCache(ExpiringLRUCache):
+	'''Cache of file statuses
+
+	Along with statuses maps dirstate and ignore files to the cached paths 
+	whose status depends on them (:py:attr:`dirstate_map` and 
+	:py:attr:`ignore_map`). Entries of these maps are removed together with 
+	the cached status, be it due to invalidation, eviction or expiration.
+	'''
+	def __init__(self, maxsize=FILE_STATUS_CACHE_SIZE, ttl=CACHE_TTL):
+		super(FileStatusCache, self).__init__(maxsize, ttl)
+		self.dirstate_map = {}
+		self.ignore_map = {}
+		self.keypath_dirstate_map = {}
 		self.keypath_ignore_map = {}
 
 	def update_maps(self, keypath, directory, dirstate_file, ignore_file_name, extra_ignore_files):
+		self.forget(keypath)
 		parent = keypath
 		ignore_files = set()
 		while parent != directory:
@@ -103,33 +135,118 @@ class FileStatusCache(dict):
 			ignore_files.add(f)
 		self.keypath_ignore_map[keypath] = ignore_files
 		for ignf in ignore_files:
-			self.ignore_map[ignf].add(keypath)
-		self.dirstate_map[dirstate_file].add(keypath)
+			self.ignore_map.setdefault(ignf, set()).add(keypath)
+		self.keypath_dirstate_map[keypath] = dirstate_file
+		self.dirstate_map.setdefault(dirstate_file, set()).add(keypath)
+
+	def forget(self, keypath):
+		'''Remove keypath from dirstate and ignore files maps'''
+		for ignf in self.keypath_ignore_map.pop(keypath, ()):
+			_discard_key(self.ignore_map, ignf, keypath)
+		dirstate_file = self.keypath_dirstate_map.pop(keypath, None)
+		if dirstate_file is not None:
+			_discard_key(self.dirstate_map, dirstate_file, keypath)
+
+	def add(self, keypath, status, directory, dirstate_file, ignore_file_name, extra_ignore_files):
+		'''Cache status of the given file, recording files it depends on'''
+		self.update_maps(keypath, directory, dirstate_file, ignore_file_name, extra_ignore_files)
+		self[keypath] = status
+
+	def evict(self, keypath, status):
+		self.forget(keypath)
+		# Keypath is not going to be queried again soon, stop watching it
+		if (
+			_file_watcher is not None
+			and keypath not in self.dirstate_map
+			and keypath not in self.ignore_map
+		):
+			try:
+				_file_watcher.unwatch(keypath)
+			except OSError:
+				pass
+
+	def pop(self, keypath, *args):
+		self.forget(keypath)
+		return super(FileStatusCache, self).pop(keypath, *args)
+
+	def clear(self):
+		super(FileStatusCache, self).clear()
+		self.dirstate_map.clear()
+		self.ignore_map.clear()
+		self.keypath_dirstate_map.clear()
+		self.keypath_ignore_map.clear()
 
 	def invalidate(self, dirstate_file=None, ignore_file=None):
-		for keypath in self.dirstate_map[dirstate_file]:
+		for keypath in tuple(self.dirstate_map.get(dirstate_file, ())):
 			self.pop(keypath, None)
-		for keypath in self.ignore_map[ignore_file]:
+		for keypath in tuple(self.ignore_map.get(ignore_file, ())):
 			self.pop(keypath, None)
 
 	def ignore_files(self, keypath):
-		for ignf in self.keypath_ignore_map[keypath]:
+		for ignf in tuple(self.keypath_ignore_map.get(keypath, ())):
 			yield ignf
 
 
 file_status_cache = FileStatusCache()
 
 
+def set_cache_limits(file_status_size=None, branch_name_size=None, ttl=False):
+	'''Change limits of file status and branch name caches
+
+	Limits are applied when new items are added to caches. Normally called by 
+	:py:meth:`powerline.Powerline.set_vcs_cache_limits` according to 
+	:ref:`vcs_cache <config-common-vcs_cache>` option.
+
+	:param int file_status_size:
+		Maximum number of cached file statuses. Unchanged if ``None``.
+	:param int branch_name_size:
+		Maximum number of cached branch names. Unchanged if ``None``.
+	:param float ttl:
+		Time in seconds after the last access when items expire, ``None`` 
+		disables expiration. Unchanged if ``False``.
+	'''
+	with file_status_lock:
+		if file_status_size is not None:
+			file_status_cache.maxsize = file_status_size
+		if ttl is not False:
+			file_status_cache.ttl = ttl
+	with branch_lock:
+		if branch_name_size is not None:
+			branch_name_cache.maxsize = branch_name_size
+		if ttl is not False:
+			branch_name_cache.ttl = ttl
+
+
+def cache_stats():
+	'''Get usage statistics of file status and branch name caches
+
+	:return:
+		Dictionary with ``file_status`` and ``branch_name`` keys, see 
+		:py:meth:`powerline.lib.memoize.ExpiringLRUCache.stats`.
+	'''
+	with file_status_lock:
+		file_status_stats = file_status_cache.stats()
+	with branch_lock:
+		branch_name_stats = branch_name_cache.stats()
+	return {
+		'file_status': file_status_stats,
+		'branch_name': branch_name_stats,
+	}
+
+
 def get_file_status(directory, dirstate_file, file_path, ignore_file_name, get_func, create_watcher, extra_ignore_files=()):
 	global file_status_cache
 	keypath = file_path if os.path.isabs(file_path) else join(directory, file_path)
-	file_status_cache.update_maps(keypath, directory, dirstate_file, ignore_file_name, extra_ignore_files)
+
+	def compute():
+		ans = get_func(directory, file_path)
+		file_status_cache.add(keypath, ans, directory, dirstate_file, ignore_file_name, extra_ignore_files)
+		return ans
 
 	with file_status_lock:
 		# Optimize case of keypath not being cached
 		if keypath not in file_status_cache:
-			file_status_cache[keypath] = ans = get_func(directory, file_path)
-			return ans
+			return compute()
 
 		# Check if any relevant files have changed
 		file_changed = file_watcher(create_watcher)
@@ -155,9 +272,10 @@ def get_file_status(directory, dirstate_file, file_path, ignore_file_name, get_f
 				if getattr(e, 'errno', None) != errno.ENOENT:
 					raise
 				# Do not call get_func again for a non-existant file
-				if keypath not in file_status_cache:
-					file_status_cache[keypath] = get_func(directory, file_path)
-				return file_status_cache[keypath]
+				try:
+					return file_status_cache[keypath]
+				except KeyError:
+					return compute()
 
 			if changed:
 				file_status_cache.pop(keypath, None)
@@ -178,29 +296,116 @@ def get_file_status(directory, dirstate_file, file_path, ignore_file_name, get_f
 		try:
 			return file_status_cache[keypath]
 		except KeyError:
-			file_status_cache[keypath] = ans = get_func(directory, file_path)
-			return ans
+			return compute()
 
 
 class TreeStatusCache(dict):
+	'''Cache of repository statuses, updated in background
+
+	Status of the repository seen for the first time is computed 
+	synchronously. When tree watcher reports changes in the repository status 
+	is recomputed in a background thread once there were no new changes for 
+	:py:attr:`debounce` seconds (but no later than :py:attr:`max_delay` 
+	seconds after the first change), until then the last known value is 
+	returned and repository is marked as stale (see :py:meth:`is_stale`).
+	'''
+	debounce = 0.2
+	'''Time without changes after which status is recomputed, in seconds'''
+
+	max_delay = 2
+	'''Maximal time between change and status recomputation, in seconds'''
+
 	def __init__(self, pl):
+		from powerline.lib.watcher import create_tree_watcher
 		self.tw = create_tree_watcher(pl)
 		self.pl = pl
+		self.condition = Condition()
+		self.pending = {}
+		self.stale = set()
+		self.generations = defaultdict(int)
+		self.thread = None
 
-	def cache_and_get(self, key, status):
-		ans = self.get(key, self)
-		if ans is self:
-			ans = self[key] = status()
-		return ans
-
-	def __call__(self, repo):
-		key = repo.directory
+	def tree_changed(self, key, ignore_event):
 		try:
-			if self.tw(key, ignore_event=getattr(repo, 'ignore_event', None)):
-				self.pop(key, None)
+			return self.tw(key, ignore_event=ignore_event)
 		except OSError as e:
 			self.pl.warn('Failed to check {0} for changes, with error: {1}', key, str(e))
-		return self.cache_and_get(key, repo.status)
+			return False
+
+	def is_stale(self, repo):
+		'''Check whether status returned for the repository is outdated'''
+		return repo.directory in self.stale
+
+	def schedule(self, key, repo):
+		now = monotonic()
+		self.stale.add(key)
+		self.generations[key] += 1
+		try:
+			first_change_time = self.pending[key][0]
+		except KeyError:
+			first_change_time = now
+		self.pending[key] = (first_change_time, now + self.debounce, repo)
+		if self.thread is None:
+			self.thread = Thread(target=self.run)
+			self.thread.daemon = True
+			self.thread.start()
+		self.condition.notify()
+
+	def get_job(self):
+		with self.condition:
+			while True:
+				if not self.pending:
+					self.thread = None
+					return None
+				key = min(self.pending, key=lambda key: self.pending[key][1])
+				first_change_time, deadline, repo = self.pending[key]
+				now = monotonic()
+				if deadline > now:
+					self.condition.wait(deadline - now)
+					continue
+				if (
+					now < first_change_time + self.max_delay
+					and self.tree_changed(key, getattr(repo, 'ignore_event', None))
+				):
+					# Changes did not stop yet
+					self.generations[key] += 1
+					self.pending[key] = (first_change_time, now + self.debounce, repo)
+					continue
+				del self.pending[key]
+				return key, repo, self.generations[key]
+
+	def run(self):
+		while True:
+			job = self.get_job()
+			if job is None:
+				return
+			key, repo, generation = job
+			try:
+				status = repo.status()
+			except Exception as e:
+				self.pl.exception('Failed to compute tree status: {0}', str(e))
+				continue
+			with self.condition:
+				self[key] = status
+				if self.generations[key] == generation:
+					self.stale.discard(key)
+
+	def __call__(self, repo):
+		key = repo.directory
+		with self.condition:
+			changed = self.tree_changed(key, getattr(repo, 'ignore_event', None))
+			try:
+				ans = self[key]
+			except KeyError:
+				pass
+			else:
+				if changed:
+					self.schedule(key, repo)
+				return ans
+		ans = repo.status()
+		with self.condition:
+			self.setdefault(key, ans)
+		return ans
 
 
 _tree_status_cache = None
@@ -162,6 +162,8 @@ try:
 				r = wt_column + index_column + untracked_column
 				return r if r != '   ' else None
 except ImportError:
+	from powerline.lib.vcs.git_index import file_status, UnknownStatus
+
 	class Repository(GitRepository):
 		def __init__(self, *args, **kwargs):
 			if not which('git'):
@@ -183,6 +185,10 @@ except ImportError:
 
 		def do_status(self, directory, path):
 			if path:
+				try:
+					return file_status(directory, git_directory(directory), path)
+				except UnknownStatus:
+					pass
 				try:
 					return next(self._gitcmd(directory, 'status', '--porcelain', '--ignored', '--', path))[:2]
 				except StopIteration:
@@ -0,0 +1,439 @@
+# vim:fileencoding=utf-8:noet
+'''Git index reader
+
+Allows determining status of tracked files without running git: stat data of
+the working tree file is compared with the stat data cached in the index, like
+git itself does. When the answer cannot be determined this way (untracked and
+racily clean files, merge conflicts, unsupported index extensions, …)
+:py:exc:`UnknownStatus` is raised and caller is expected to fall back to
+running git.
+'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import re
+import mmap
+import stat
+import zlib
+import errno
+import struct
+
+from threading import Lock
+from hashlib import sha1
+from binascii import unhexlify
+from glob import glob
+
+from powerline.lib.memoize import LRUCache
+from powerline.lib.encoding import get_preferred_file_name_encoding
+
+
+class UnknownStatus(Exception):
+	pass
+
+
+HEADER = struct.Struct(str('>4sII'))
+ENTRY = struct.Struct(str('>10I20sH'))
+UINT16 = struct.Struct(str('>H'))
+UINT32 = struct.Struct(str('>I'))
+
+FLAG_ASSUME_VALID = 0x8000
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE = 0x3000
+EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+EXTENDED_FLAG_INTENT_TO_ADD = 0x2000
+
+S_IFGITLINK = 0o160000
+
+MAX_HASHED_FILE_SIZE = 4 * 1024 * 1024
+
+
+def read_varint(data, offset):
+	'''Read variable-length integer used in index version 4'''
+	c = ord(data[offset:offset + 1])
+	offset += 1
+	value = c & 0x7F
+	while c & 0x80:
+		c = ord(data[offset:offset + 1])
+		offset += 1
+		value = ((value + 1) << 7) | (c & 0x7F)
+	return value, offset
+
+
+def parse_index(data):
+	'''Parse contents of git index file
+
+	:param data:
+		Index contents: bytes or :py:class:`mmap.mmap` object.
+
+	:return:
+		``(entries, tree)`` pair: ``entries`` is a dictionary mapping paths
+		(bytes) to tuples with ``(ctime_s, ctime_ns, mtime_s, mtime_ns, dev,
+		ino, mode, uid, gid, size, sha, flags, extended_flags)`` and ``tree``
+		is the object id of the tree recorded in the cache tree extension for
+		the whole index or ``None`` if it is not recorded or invalidated.
+
+	:raise UnknownStatus:
+		If index format is not supported.
+	'''
+	signature, version, count = HEADER.unpack_from(data, 0)
+	if signature != b'DIRC' or version not in (2, 3, 4):
+		raise UnknownStatus('Unsupported index format')
+	entries = {}
+	unpack_entry = ENTRY.unpack_from
+	find = data.find
+	offset = HEADER.size
+	path = b''
+	for i in range(count):
+		start = offset
+		fields = unpack_entry(data, offset)
+		offset += ENTRY.size
+		extended_flags = 0
+		if fields[-1] & FLAG_EXTENDED:
+			extended_flags = UINT16.unpack_from(data, offset)[0]
+			offset += UINT16.size
+		if version == 4:
+			strip, offset = read_varint(data, offset)
+			end = find(b'\0', offset)
+			path = path[:len(path) - strip] + data[offset:end]
+			offset = end + 1
+		else:
+			end = find(b'\0', offset)
+			path = data[offset:end]
+			offset = start + ((end - start + 8) & ~7)
+		entries[path] = fields + (extended_flags,)
+
+	tree = None
+	end = len(data) - 20
+	while offset + 8 <= end:
+		signature = data[offset:offset + 4]
+		size = UINT32.unpack_from(data, offset + 4)[0]
+		offset += 8
+		if signature == b'TREE':
+			# First entry describes the root tree: empty path, entry count,
+			# number of subtrees and object id if entry count is not negative
+			line_end = find(b'\n', offset)
+			entry_count = data[offset + 1:line_end].split(b' ')[0]
+			if data[offset:offset + 1] == b'\0' and not entry_count.startswith(b'-'):
+				tree = data[line_end + 1:line_end + 21]
+		elif not b'A' <= signature[:1] <= b'Z':
+			# Extensions which must be understood: split index, sparse
+			# directories, …
+			raise UnknownStatus('Unsupported index extension')
+		offset += size
+	return entries, tree
+
+
+def stat_time(st, name):
+	ns = getattr(st, name + '_ns', None)
+	if ns is None:
+		t = getattr(st, name)
+		s = int(t)
+		return s, int(round((t - s) * 1000000000))
+	return ns // 1000000000, ns % 1000000000
+
+
+class GitIndex(object):
+	'''Parsed git index
+
+	:param str path:
+		Path to the index file.
+	'''
+	def __init__(self, path):
+		with open(path, 'rb') as f:
+			st = os.fstat(f.fileno())
+			if not st.st_size:
+				raise UnknownStatus('Empty index')
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			self.entries, self.tree = parse_index(data)
+		except (struct.error, ValueError):
+			raise UnknownStatus('Invalid index')
+		finally:
+			data.close()
+		self.key = (st.st_size, st.st_ino, st.st_mtime)
+		self.timestamp = stat_time(st, 'st_mtime')
+
+	def is_racy(self, entry):
+		'''Check whether file could be modified after index was written
+
+		Modifications made during the same second (or nanosecond) index was
+		written do not change stat data.
+		'''
+		if entry[3]:
+			return self.timestamp <= (entry[2], entry[3])
+		return self.timestamp[0] <= entry[2]
+
+
+index_cache = LRUCache(16)
+index_lock = Lock()
+
+
+def get_index(path):
+	'''Get parsed index, reparsing it only if index file has changed'''
+	st = os.stat(path)
+	key = (st.st_size, st.st_ino, st.st_mtime)
+	with index_lock:
+		try:
+			index = index_cache[path]
+		except KeyError:
+			pass
+		else:
+			if index.key == key:
+				return index
+		index = index_cache[path] = GitIndex(path)
+		return index
+
+
+def get_common_dir(git_dir):
+	'''Get directory with objects and refs shared by all working trees'''
+	try:
+		with open(os.path.join(git_dir, 'commondir'), 'rb') as f:
+			common_dir = f.read().strip()
+	except EnvironmentError:
+		return git_dir
+	if not isinstance(git_dir, bytes):
+		common_dir = common_dir.decode(get_preferred_file_name_encoding())
+	return os.path.join(git_dir, common_dir)
+
+
+_object_format_pat = re.compile(br'^\s*objectformat\s*=', re.MULTILINE | re.IGNORECASE)
+_repository_formats = {}
+
+
+def uses_sha1(common_dir):
+	'''Check that repository uses SHA-1 object ids, reader supports only them'''
+	try:
+		return _repository_formats[common_dir]
+	except KeyError:
+		pass
+	try:
+		with open(os.path.join(common_dir, 'config'), 'rb') as f:
+			config = f.read()
+	except EnvironmentError:
+		config = b''
+	ret = _repository_formats[common_dir] = not _object_format_pat.search(config)
+	return ret
+
+
+def resolve_head(git_dir, common_dir):
+	'''Get object id of the commit HEAD points to
+
+	:return: Hexadecimal object id (bytes) or ``None``.
+	'''
+	with open(os.path.join(git_dir, 'HEAD'), 'rb') as f:
+		head = f.read().strip()
+	if not head.startswith(b'ref: '):
+		return head
+	ref = head[5:]
+	try:
+		with open(os.path.join(common_dir, ref.decode('utf-8')), 'rb') as f:
+			return f.read().strip()
+	except EnvironmentError:
+		pass
+	try:
+		with open(os.path.join(common_dir, 'packed-refs'), 'rb') as f:
+			for line in f:
+				line = line.rstrip()
+				if line.endswith(b' ' + ref):
+					return line.split(b' ', 1)[0]
+	except EnvironmentError:
+		pass
+	return None
+
+
+def find_pack_offset(idx, binary_oid):
+	'''Find offset of the object in pack using version 2 pack index'''
+	if idx[:8] != b'\377tOc\0\0\0\2':
+		return None
+	first_byte = ord(binary_oid[:1])
+	fanout_start = 8
+	lo = UINT32.unpack_from(idx, fanout_start + (first_byte - 1) * 4)[0] if first_byte else 0
+	hi = UINT32.unpack_from(idx, fanout_start + first_byte * 4)[0]
+	count = UINT32.unpack_from(idx, fanout_start + 255 * 4)[0]
+	oids_start = fanout_start + 256 * 4
+	while lo < hi:
+		mid = (lo + hi) // 2
+		mid_oid = idx[oids_start + mid * 20:oids_start + mid * 20 + 20]
+		if mid_oid < binary_oid:
+			lo = mid + 1
+		elif mid_oid > binary_oid:
+			hi = mid
+		else:
+			break
+	else:
+		return None
+	offsets_start = oids_start + count * 24
+	offset = UINT32.unpack_from(idx, offsets_start + mid * 4)[0]
+	if offset & 0x80000000:
+		large_offsets_start = offsets_start + count * 4
+		offset = struct.unpack_from(str('>Q'), idx, large_offsets_start + (offset & 0x7FFFFFFF) * 8)[0]
+	return offset
+
+
+def read_packed_commit_start(common_dir, oid):
+	'''Read the beginning of a commit object stored in a pack
+
+	Only non-deltified objects are supported.
+	'''
+	binary_oid = unhexlify(oid)
+	for idx_path in glob(os.path.join(common_dir, 'objects', 'pack', '*.idx')):
+		with open(idx_path, 'rb') as f:
+			idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			offset = find_pack_offset(idx, binary_oid)
+		finally:
+			idx.close()
+		if offset is None:
+			continue
+		with open(idx_path[:-4] + '.pack', 'rb') as f:
+			f.seek(offset)
+			data = f.read(4096)
+		c = ord(data[:1])
+		if (c >> 4) & 7 != 1:
+			# Not a commit, most likely deltified object
+			return None
+		i = 1
+		while c & 0x80:
+			c = ord(data[i:i + 1])
+			i += 1
+		return zlib.decompressobj().decompress(data[i:])
+	return None
+
+
+def read_commit_start(common_dir, oid):
+	'''Read the beginning of a commit object
+
+	:return: Object contents without header (bytes) or ``None``.
+	'''
+	path = os.path.join(common_dir, 'objects', oid[:2].decode('ascii'), oid[2:].decode('ascii'))
+	try:
+		with open(path, 'rb') as f:
+			data = zlib.decompressobj().decompress(f.read(), 4096)
+	except EnvironmentError:
+		return read_packed_commit_start(common_dir, oid)
+	if not data.startswith(b'commit '):
+		return None
+	return data[data.find(b'\0') + 1:]
+
+
+commit_trees = LRUCache(64)
+
+
+def get_head_tree(git_dir, common_dir):
+	'''Get object id (binary) of the tree HEAD commit points to or None'''
+	oid = resolve_head(git_dir, common_dir)
+	if not oid or len(oid) != 40:
+		return None
+	try:
+		return commit_trees[oid]
+	except KeyError:
+		pass
+	try:
+		data = read_commit_start(common_dir, oid)
+	except (EnvironmentError, zlib.error, struct.error, ValueError, TypeError):
+		data = None
+	if not data or not data.startswith(b'tree '):
+		return None
+	tree = commit_trees[oid] = unhexlify(data[5:45])
+	return tree
+
+
+def hash_file(path, st):
+	'''Compute object id git would assign to the file contents'''
+	if stat.S_ISLNK(st.st_mode):
+		data = os.readlink(path)
+		if not isinstance(data, bytes):
+			data = data.encode(get_preferred_file_name_encoding())
+	else:
+		with open(path, 'rb') as f:
+			data = f.read()
+	return sha1(('blob {0}\0'.format(len(data))).encode('ascii') + data).digest()
+
+
+def stat_matches(entry, st):
+	'''Check whether stat data cached in the index matches file stat data'''
+	mtime = stat_time(st, 'st_mtime')
+	ctime = stat_time(st, 'st_ctime')
+	return (
+		entry[2] == mtime[0] and (not entry[3] or entry[3] == mtime[1])
+		and entry[0] == ctime[0] and (not entry[1] or entry[1] == ctime[1])
+		and (not entry[5] or entry[5] == st.st_ino & 0xFFFFFFFF)
+		and entry[7] == st.st_uid and entry[8] == st.st_gid
+		and entry[9] == st.st_size & 0xFFFFFFFF
+	)
+
+
+def file_status(directory, git_dir, path):
+	'''Determine status of the tracked file using index
+
+	:param str directory:
+		Repository working tree.
+	:param str git_dir:
+		Git directory of the working tree.
+	:param str path:
+		File path, absolute or relative to ``directory``.
+
+	:return:
+		Same value as :py:meth:`powerline.lib.vcs.git.Repository.status`: the
+		first two columns of ``git status --porcelain`` output or ``None`` if
+		file is not modified.
+
+	:raise UnknownStatus:
+		If status cannot be determined without running git.
+	'''
+	common_dir = get_common_dir(git_dir)
+	if not uses_sha1(common_dir):
+		raise UnknownStatus('Unsupported object format')
+	try:
+		index = get_index(os.path.join(git_dir, 'index'))
+	except EnvironmentError:
+		raise UnknownStatus('Failed to read index')
+
+	abspath = os.path.join(directory, path)
+	relpath = os.path.relpath(abspath, directory)
+	if not isinstance(relpath, bytes):
+		relpath = relpath.encode(get_preferred_file_name_encoding())
+	if os.sep != '/':
+		relpath = relpath.replace(os.sep.encode('ascii'), b'/')
+	entry = index.entries.get(relpath)
+	if (
+		entry is None
+		or entry[11] & FLAG_STAGE
+		or entry[12] & (EXTENDED_FLAG_SKIP_WORKTREE | EXTENDED_FLAG_INTENT_TO_ADD)
+		or stat.S_IFMT(entry[6]) == S_IFGITLINK
+	):
+		# Untracked, ignored, conflicting or otherwise special file
+		raise UnknownStatus('File requires git')
+
+	if entry[11] & FLAG_ASSUME_VALID:
+		wt_status = ' '
+	else:
+		try:
+			st = os.lstat(abspath)
+		except OSError as e:
+			if getattr(e, 'errno', None) not in (errno.ENOENT, errno.ENOTDIR):
+				raise
+			wt_status = 'D'
+		else:
+			if stat.S_IFMT(st.st_mode) != stat.S_IFMT(entry[6]) or (
+				stat.S_ISREG(st.st_mode) and (entry[6] ^ st.st_mode) & 0o100
+			):
+				# Type or executable bit change, depends on core.fileMode and
+				# core.symlinks
+				raise UnknownStatus('Mode changed')
+			if entry[9] and entry[9] != st.st_size & 0xFFFFFFFF:
+				wt_status = 'M'
+			elif stat_matches(entry, st) and not index.is_racy(entry):
+				wt_status = ' '
+			elif st.st_size <= MAX_HASHED_FILE_SIZE and hash_file(abspath, st) == entry[10]:
+				wt_status = ' '
+			else:
+				# Contents may still be equal after applying filters
+				raise UnknownStatus('File is possibly modified')
+
+	if index.tree is None or index.tree != get_head_tree(git_dir, common_dir):
+		raise UnknownStatus('Index differs from HEAD')
+
+	status = ' ' + wt_status
+	return status if status != '  ' else None
@@ -4,6 +4,7 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 import errno
 import os
 import ctypes
+import select
 
 from threading import RLock
 
@@ -266,3 +267,112 @@ class INotifyTreeWatcher(INotify):
 		ret = self.modified
 		self.modified = False
 		return ret
+
+
+class INotifyPathWaiter(INotify):
+	'''Wait until any of the given files changes, is created or removed
+
+	Parent directories of the files are watched, for files in missing 
+	directories the nearest existing ancestor is watched, so there is no 
+	filesystem activity while nothing changes.
+	'''
+	DIR_EVENTS = (
+		INotify.MODIFY | INotify.ATTRIB | INotify.CLOSE_WRITE
+		| INotify.MOVED_FROM | INotify.MOVED_TO | INotify.CREATE | INotify.DELETE
+		| INotify.DELETE_SELF | INotify.MOVE_SELF
+	)
+
+	def __init__(self):
+		super(INotifyPathWaiter, self).__init__()
+		self.watches = {}
+		self.names = {}
+		self.changed = False
+		self.lock = RLock()
+		self._wakeup_read, self._wakeup_write = os.pipe()
+
+	def set_paths(self, paths):
+		'''Replace set of the watched files
+
+		:param iterable paths:
+			Paths to the files, existing or not.
+		'''
+		dirs = {}
+		for path in paths:
+			directory, name = os.path.split(realpath(path))
+			while directory and not os.path.isdir(directory):
+				directory, name = os.path.split(directory)
+			if not directory:
+				continue
+			bname = name if isinstance(name, bytes) else name.encode(self.fenc)
+			dirs.setdefault(directory, set()).add(bname)
+		with self.lock:
+			for directory in tuple(self.watches):
+				if directory not in dirs:
+					wd = self.watches.pop(directory)
+					self.names.pop(wd, None)
+					self._rm_watch(self._inotify_fd, wd)
+			for directory, names in dirs.items():
+				wd = self.watches.get(directory)
+				if wd is None:
+					bdir = directory if isinstance(directory, bytes) else directory.encode(self.fenc)
+					wd = self._add_watch(self._inotify_fd, ctypes.c_char_p(bdir), self.DIR_EVENTS | self.ONLYDIR)
+					if wd == -1:
+						eno = ctypes.get_errno()
+						if eno in (errno.ENOENT, errno.ENOTDIR):
+							# Directory was removed in the meantime
+							self.changed = True
+							continue
+						self.handle_error()
+					self.watches[directory] = wd
+				self.names[wd] = names
+
+	def process_event(self, wd, mask, cookie, name):
+		if wd == -1 and (mask & self.Q_OVERFLOW):
+			self.changed = True
+			return
+		names = self.names.get(wd)
+		if names is None:
+			return
+		if mask & (self.IGNORED | self.DELETE_SELF | self.MOVE_SELF):
+			# Watched directory itself is gone
+			for directory, dir_wd in tuple(self.watches.items()):
+				if dir_wd == wd:
+					self.watches.pop(directory)
+			self.names.pop(wd, None)
+			self.changed = True
+		elif name in names:
+			self.changed = True
+
+	def wait(self, timeout=None):
+		'''Wait for changes
+
+		:param float timeout:
+			Maximum time to wait in seconds, ``None`` means waiting until 
+			change or :py:meth:`wakeup` call.
+
+		:return: True if any of the watched files changed.
+		'''
+		try:
+			ready = select.select((self._inotify_fd, self._wakeup_read), (), (), timeout)[0]
+		except (select.error, OSError, IOError) as e:
+			if (e.args[0] if e.args else None) != errno.EINTR:
+				raise
+			ready = ()
+		if self._wakeup_read in ready:
+			os.read(self._wakeup_read, 4096)
+		with self.lock:
+			if self._inotify_fd in ready:
+				self.read()
+			ret = self.changed
+			self.changed = False
+			return ret
+
+	def wakeup(self):
+		'''Interrupt :py:meth:`wait` call running in other thread'''
+		os.write(self._wakeup_write, b'\0')
+
+	def close(self):
+		with self.lock:
+			os.close(self._wakeup_read)
+			os.close(self._wakeup_write)
+			super(INotifyPathWaiter, self).close()
@@ -98,8 +98,15 @@ main_spec = (Spec(
 		).optional(),
 		log_level=log_level_spec().optional(),
 		log_format=log_format_spec().optional(),
-		interval=Spec().either(Spec().cmp('gt', 0.0), Spec().type(type(None))).optional(),
+		interval=Spec().either(Spec().cmp('gt', 0.0), Spec().cmp('eq', 'events'), Spec().type(type(None))).optional(),
 		reload_config=Spec().type(bool).optional(),
+		render_cache_size=Spec().unsigned().optional(),
+		window_cache_size=Spec().unsigned().optional(),
+		vcs_cache=Spec(
+			file_status_size=Spec().unsigned().optional(),
+			branch_name_size=Spec().unsigned().optional(),
+			ttl=Spec().either(Spec().cmp('gt', 0.0), Spec().type(type(None))).optional(),
+		).optional(),
 		watcher=Spec().type(unicode).oneof(set(('auto', 'inotify', 'stat'))).optional(),
 	).context_message('Error while loading common configuration (key {key})'),
 	ext=Spec(
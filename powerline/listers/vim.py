@@ -2,7 +2,7 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 from powerline.theme import requires_segment_info
-from powerline.bindings.vim import (current_tabpage, list_tabpages)
+from powerline.bindings.vim import (current_tabpage, list_tabpages, BufferOptions)
 
 try:
 	import vim
@@ -22,6 +22,7 @@ def tabpage_updated_segment_info(segment_info, tabpage):
 		window_id=int(window.vars.get('powerline_window_id', -1)),
 		buffer=buffer,
 		bufnr=buffer.number,
+		buffer_options=BufferOptions(buffer.number),
 	)
 	return segment_info
 
@@ -66,6 +67,7 @@ def buffer_updated_segment_info(segment_info, buffer):
 		window_id=None,
 		buffer=buffer,
 		bufnr=buffer.number,
+		buffer_options=BufferOptions(buffer.number),
 	)
 	return segment_info
 
@@ -7,7 +7,7 @@ import os
 
 from powerline import Powerline
 from powerline.lib.overrides import parse_override_var
-from powerline.lib.dict import mergeargs, mergedicts
+from powerline.lib.dict import mergeargs, mergedicts_copy
 
 
 class PDBPowerline(Powerline):
@@ -28,7 +28,7 @@ class PDBPowerline(Powerline):
 		r = super(PDBPowerline, self).load_main_config()
 		config_overrides = os.environ.get('POWERLINE_CONFIG_OVERRIDES')
 		if config_overrides:
-			mergedicts(r, mergeargs(parse_override_var(config_overrides)))
+			r = mergedicts_copy(r, mergeargs(parse_override_var(config_overrides)), remove=True)
 		return r
 
 	def load_theme_config(self, name):
@@ -37,7 +37,7 @@ class PDBPowerline(Powerline):
 		if theme_overrides:
 			theme_overrides_dict = mergeargs(parse_override_var(theme_overrides))
 			if name in theme_overrides_dict:
-				mergedicts(r, theme_overrides_dict[name])
+				r = mergedicts_copy(r, theme_overrides_dict[name], remove=True)
 		return r
 
 	def get_config_paths(self):
@@ -9,7 +9,8 @@ import operator
 from itertools import chain
 
 from powerline.theme import Theme
-from powerline.lib.unicode import unichr, strwidth_ucs_2, strwidth_ucs_4
+from powerline.lib.unicode import unichr, gen_strwidth
+from powerline.lib.memoize import LRUCache
 
 
 NBSP = ' '
@@ -153,6 +154,29 @@ class Renderer(object):
 	See documentation of ``unicode.translate`` for details.
 	'''
 
+	render_cache_size = 0
+	'''Maximum number of rendered lines kept in the render cache
+
+	Zero disables the cache. Is normally set from :ref:`render_cache_size 
+	<config-common-render_cache_size>` option.
+	'''
+
+	render_cache_attrs = ()
+	'''Names of attributes that affect :py:meth:`do_render` output
+
+	Values of these attributes are added to the render cache key. Should list 
+	attributes which are set by subclasses while rendering.
+	'''
+
+	cache_hlstyle = False
+	'''Whether :py:meth:`hlstyle` results may be cached
+
+	Must only be true for renderers where :py:meth:`hlstyle` has no side 
+	effects and its result depends only on its arguments, on attributes which 
+	do not change after renderer was created and on attributes listed in 
+	:py:attr:`render_cache_attrs`.
+	'''
+
 	def __init__(self,
 	             theme_config,
 	             local_themes,
@@ -178,22 +202,25 @@ class Renderer(object):
 			'W': 2,          # Wide
 			'F': 2,          # Fullwidth
 		}
+		self.compute_strwidth = gen_strwidth(self.width_data)
+		self.render_cache = LRUCache(self.render_cache_size) if self.render_cache_size else None
+		self.divider_widths = {}
+		self.hlstyle_cache = {}
+		self.escaped_dividers = {}
 
-	strwidth = lambda self, s: (
-		(strwidth_ucs_2 if sys.maxunicode < 0x10FFFF else strwidth_ucs_4)(
-			self.width_data, s)
-	)
-	'''Function that returns string width.
+	def strwidth(self, string):
+		'''Function that returns string width.
 
-	Is used to calculate the place given string occupies when handling 
-	``width`` argument to ``.render()`` method. Must take east asian width 
-	into account.
+		Is used to calculate the place given string occupies when handling 
+		``width`` argument to ``.render()`` method. Must take east asian width 
+		into account.
 
-	:param unicode string:
-		String whose width will be calculated.
+		:param unicode string:
+			String whose width will be calculated.
 
-	:return: unsigned integer.
-	'''
+		:return: unsigned integer.
+		'''
+		return self.compute_strwidth(string)
 
 	def get_theme(self, matcher_info):
 		'''Get Theme object.
@@ -300,7 +327,11 @@ class Renderer(object):
 		)
 
 	def compute_divider_widths(self, theme):
-		return {
+		try:
+			return self.divider_widths[theme]
+		except KeyError:
+			pass
+		ret = self.divider_widths[theme] = {
 			'left': {
 				'hard': self.strwidth(theme.get_divider('left', 'hard')),
 				'soft': self.strwidth(theme.get_divider('left', 'soft')),
@@ -310,6 +341,20 @@ class Renderer(object):
 				'soft': self.strwidth(theme.get_divider('right', 'soft')),
 			},
 		}
+		return ret
+
+	def get_escaped_divider(self, theme, side, divider_type):
+		'''Get divider with special characters escaped
+
+		Result is computed once for each theme.
+		'''
+		key = (theme, side, divider_type)
+		try:
+			return self.escaped_dividers[key]
+		except KeyError:
+			pass
+		ret = self.escaped_dividers[key] = self.escape(theme.get_divider(side, divider_type))
+		return ret
 
 	hl_join = staticmethod(''.join)
 	'''Join a list of rendered segments into a resulting string
@@ -324,8 +369,50 @@ class Renderer(object):
 	:return: Results of joining these segments.
 	'''
 
+	def get_render_cache_key(self, mode, width, side, line, output_raw, output_width, segment_info, theme):
+		'''Compute the key used to look up rendered line in the render cache
+
+		Arguments are the same as for :py:meth:`do_render`.
+
+		:return: Hashable value or ``None`` if result must not be cached.
+		'''
+		fingerprint = theme.get_fingerprint(side, line, segment_info, mode)
+		if fingerprint is None:
+			return None
+		key = (
+			theme, mode, width, side, line, output_raw, output_width,
+			tuple((getattr(self, attr, None) for attr in self.render_cache_attrs)),
+			fingerprint,
+		)
+		try:
+			hash(key)
+		except TypeError:
+			return None
+		return key
+
 	def do_render(self, mode, width, side, line, output_raw, output_width, segment_info, theme):
 		'''Like Renderer.render(), but accept theme in place of matcher_info
+
+		If :py:attr:`render_cache_size` is not zero and all segments declared 
+		what they depend on result is taken from the render cache.
+		'''
+		if self.render_cache is None:
+			return self.do_render_uncached(mode, width, side, line, output_raw, output_width, segment_info, theme)
+		key = self.get_render_cache_key(mode, width, side, line, output_raw, output_width, segment_info, theme)
+		if key is None:
+			return self.do_render_uncached(mode, width, side, line, output_raw, output_width, segment_info, theme)
+		try:
+			return self.render_cache[key]
+		except KeyError:
+			pass
+		ret = self.do_render_uncached(mode, width, side, line, output_raw, output_width, segment_info, theme)
+		self.render_cache[key] = ret
+		return ret
+
+	def do_render_uncached(self, mode, width, side, line, output_raw, output_width, segment_info, theme):
+		'''Compute segments and render them, bypassing the render cache
+
+		Arguments are the same as for :py:meth:`do_render`.
 		'''
 		segments = list(theme.get_segments(side, line, segment_info, mode))
 
@@ -353,26 +440,7 @@ class Renderer(object):
 				if segment['truncate'] is not None:
 					segment['contents'] = segment['truncate'](self.pl, current_width - width, segment)
 
-			segments_priority = iter(segments_priority)
-			if current_width > width and len(segments) > 100:
-				# When there are too many segments use faster, but less correct 
-				# algorythm for width computation
-				diff = current_width - width
-				for segment in segments_priority:
-					segments.remove(segment)
-					diff -= segment['_len']
-					if diff <= 0:
-						break
-				current_width = self._render_length(theme, segments, divider_widths)
-			if current_width > width:
-				# When there are not too much use more precise, but much slower 
-				# width computation. It also finishes computations in case 
-				# previous variant did not free enough space.
-				for segment in segments_priority:
-					segments.remove(segment)
-					current_width = self._render_length(theme, segments, divider_widths)
-					if current_width <= width:
-						break
+			segments, current_width = self._remove_segments(theme, segments, segments_priority, width, divider_widths)
 		del segments_priority
 
 		# Distribute the remaining space on spacer segments
@@ -413,62 +481,140 @@ class Renderer(object):
 				else:
 					segment['_contents_len'] = self.strwidth(segment['contents'])
 
+	@staticmethod
+	def _get_neighbours(theme, segments):
+		'''Find segments which determine dividers and padding of each segment
+
+		:return:
+			Tuple ``(compare_segments, first_segment, last_segment)``. 
+			``compare_segments`` is a list which contains the segment each 
+			segment from ``segments`` list is compared with to determine divider 
+			type: next non-literal segment for left segments and previous one 
+			for right segments (``theme.EMPTY_SEGMENT`` if there is no such 
+			segment). ``first_segment`` and ``last_segment`` are first and last 
+			non-literal segments or ``None``.
+		'''
+		compare_segments = [None] * len(segments)
+		next_segment = theme.EMPTY_SEGMENT
+		first_segment = None
+		for index in range(len(segments) - 1, -1, -1):
+			segment = segments[index]
+			if segment['side'] == 'left':
+				compare_segments[index] = next_segment
+			if not segment['literal_contents'][1]:
+				next_segment = segment
+				first_segment = segment
+		prev_segment = theme.EMPTY_SEGMENT
+		last_segment = None
+		for index, segment in enumerate(segments):
+			if segment['side'] != 'left':
+				compare_segments[index] = prev_segment
+			if not segment['literal_contents'][1]:
+				prev_segment = segment
+				last_segment = segment
+		return compare_segments, first_segment, last_segment
+
+	@staticmethod
+	def _segment_length(theme, segment, compare_segment, is_outer, divider_widths, divider_spaces):
+		'''Compute the width segment occupies, including dividers and padding
+
+		:param dict compare_segment:
+			Segment which determines divider type.
+		:param bool is_outer:
+			True if outer padding should be added to this segment.
+		'''
+		segment_len = segment['_contents_len']
+		if not segment['literal_contents'][1]:
+			side = segment['side']
+			divider_type = 'soft' if compare_segment['highlight']['bg'] == segment['highlight']['bg'] else 'hard'
+			segment_len += int(is_outer) * theme.outer_padding
+			if segment['draw_' + divider_type + '_divider']:
+				segment_len += divider_widths[side][divider_type] + divider_spaces
+		return segment_len
+
 	def _render_length(self, theme, segments, divider_widths):
 		'''Update segments lengths and return them
 		'''
-		segments_len = len(segments)
 		ret = 0
 		divider_spaces = theme.get_spaces()
-		prev_segment = theme.EMPTY_SEGMENT
-		try:
-			first_segment = next(iter((
-				segment
-				for segment in segments
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			first_segment = None
-		try:
-			last_segment = next(iter((
-				segment
-				for segment in reversed(segments)
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			last_segment = None
-		for index, segment in enumerate(segments):
-			side = segment['side']
-			segment_len = segment['_contents_len']
-			if not segment['literal_contents'][1]:
-				if side == 'left':
-					if segment is not last_segment:
-						compare_segment = next(iter((
-							segment
-							for segment in segments[index + 1:]
-							if not segment['literal_contents'][1]
-						)))
-					else:
-						compare_segment = theme.EMPTY_SEGMENT
-				else:
-					compare_segment = prev_segment
+		compare_segments, first_segment, last_segment = self._get_neighbours(theme, segments)
+		for segment, compare_segment in zip(segments, compare_segments):
+			segment['_len'] = self._segment_length(
+				theme, segment, compare_segment,
+				segment is (first_segment if segment['side'] == 'left' else last_segment),
+				divider_widths, divider_spaces)
+			ret += segment['_len']
+		return ret
 
-				divider_type = 'soft' if compare_segment['highlight']['bg'] == segment['highlight']['bg'] else 'hard'
+	def _remove_segments(self, theme, segments, segments_priority, width, divider_widths):
+		'''Remove segments in the given order until line fits into width
 
-				outer_padding = int(bool(
-					segment is first_segment
-					if side == 'left' else
-					segment is last_segment
-				)) * theme.outer_padding
+		Expects segment lengths to be already computed by 
+		:py:meth:`_render_length`. Lengths are then updated incrementally: 
+		removing a segment may only change dividers and padding of the closest 
+		non-literal segments to its left and to its right.
 
-				draw_divider = segment['draw_' + divider_type + '_divider']
-				segment_len += outer_padding
-				if draw_divider:
-					segment_len += divider_widths[side][divider_type] + divider_spaces
-				prev_segment = segment
+		:param list segments_priority:
+			Segments from ``segments`` list in order they should be removed.
 
-			segment['_len'] = segment_len
-			ret += segment_len
-		return ret
+		:return: Tuple ``(remaining_segments, width)``.
+		'''
+		divider_spaces = theme.get_spaces()
+		segments_num = len(segments)
+		prev_indexes = [-1] * segments_num
+		next_indexes = [-1] * segments_num
+		first = last = -1
+		for index, segment in enumerate(segments):
+			if not segment['literal_contents'][1]:
+				if last == -1:
+					first = index
+				else:
+					next_indexes[last] = index
+				prev_indexes[index] = last
+				last = index
+
+		indexes = dict(((id(segment), index) for index, segment in enumerate(segments)))
+		removed = set()
+		current_width = sum((segment['_len'] for segment in segments))
+		for segment in segments_priority:
+			if current_width <= width:
+				break
+			index = indexes[id(segment)]
+			removed.add(index)
+			current_width -= segment['_len']
+			if segment['literal_contents'][1]:
+				continue
+			prev_index = prev_indexes[index]
+			next_index = next_indexes[index]
+			if prev_index != -1:
+				next_indexes[prev_index] = next_index
+			if next_index != -1:
+				prev_indexes[next_index] = prev_index
+			if first == index:
+				first = next_index
+			if last == index:
+				last = prev_index
+			for neighbour_index in (prev_index, next_index):
+				if neighbour_index == -1:
+					continue
+				neighbour = segments[neighbour_index]
+				if neighbour['side'] == 'left':
+					compare_index = next_indexes[neighbour_index]
+					is_outer = neighbour_index == first
+				else:
+					compare_index = prev_indexes[neighbour_index]
+					is_outer = neighbour_index == last
+				current_width -= neighbour['_len']
+				neighbour['_len'] = self._segment_length(
+					theme, neighbour,
+					theme.EMPTY_SEGMENT if compare_index == -1 else segments[compare_index],
+					is_outer, divider_widths, divider_spaces)
+				current_width += neighbour['_len']
+		return [
+			segment
+			for index, segment in enumerate(segments)
+			if index not in removed
+		], current_width
 
 	def _render_segments(self, theme, segments, render_highlighted=True):
 		'''Internal segment rendering method.
@@ -481,40 +627,12 @@ class Renderer(object):
 		highlighting strings added), and only renders the highlighted
 		statusline if render_highlighted is True.
 		'''
-		segments_len = len(segments)
 		divider_spaces = theme.get_spaces()
-		prev_segment = theme.EMPTY_SEGMENT
-		try:
-			first_segment = next(iter((
-				segment
-				for segment in segments
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			first_segment = None
-		try:
-			last_segment = next(iter((
-				segment
-				for segment in reversed(segments)
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			last_segment = None
+		compare_segments, first_segment, last_segment = self._get_neighbours(theme, segments)
 
-		for index, segment in enumerate(segments):
+		for segment, compare_segment in zip(segments, compare_segments):
 			side = segment['side']
 			if not segment['literal_contents'][1]:
-				if side == 'left':
-					if segment is not last_segment:
-						compare_segment = next(iter((
-							segment
-							for segment in segments[index + 1:]
-							if not segment['literal_contents'][1]
-						)))
-					else:
-						compare_segment = theme.EMPTY_SEGMENT
-				else:
-					compare_segment = prev_segment
 				outer_padding = int(bool(
 					segment is first_segment
 					if side == 'left' else
@@ -530,7 +648,7 @@ class Renderer(object):
 				# XXX Make sure self.hl() calls are called in the same order 
 				# segments are displayed. This is needed for Vim renderer to work.
 				if draw_divider:
-					divider_raw = self.escape(theme.get_divider(side, divider_type))
+					divider_raw = self.get_escaped_divider(theme, side, divider_type)
 					if side == 'left':
 						contents_raw = outer_padding + contents_raw + (divider_spaces * ' ')
 					else:
@@ -565,7 +683,6 @@ class Renderer(object):
 					contents_highlighted = self.hl(self.escape(contents_raw), **segment['highlight'])
 					segment['_rendered_raw'] = contents_raw
 					segment['_rendered_hl'] = contents_highlighted
-				prev_segment = segment
 			else:
 				segment['_rendered_raw'] = ' ' * segment['literal_contents'][0]
 				segment['_rendered_hl'] = segment['literal_contents'][1]
@@ -585,10 +702,28 @@ class Renderer(object):
 		'''
 		raise NotImplementedError
 
+	def get_hlstyle(self, fg=None, bg=None, attrs=None):
+		'''Like :py:meth:`hlstyle`, but cache results if :py:attr:`cache_hlstyle` is set
+
+		Cache key includes values of :py:attr:`render_cache_attrs` attributes.
+		'''
+		if not self.cache_hlstyle:
+			return self.hlstyle(fg, bg, attrs)
+		# False and 0 attributes are equal, but produce different highlighting
+		key = (fg, bg, attrs, attrs is False, tuple((
+			getattr(self, attr, None) for attr in self.render_cache_attrs
+		)))
+		try:
+			return self.hlstyle_cache[key]
+		except KeyError:
+			pass
+		ret = self.hlstyle_cache[key] = self.hlstyle(fg, bg, attrs)
+		return ret
+
 	def hl(self, contents, fg=None, bg=None, attrs=None):
 		'''Output highlighted chunk.
 
-		This implementation just outputs :py:meth:`hlstyle` joined with 
+		This implementation just outputs :py:meth:`get_hlstyle` joined with 
 		``contents``.
 		'''
-		return self.hlstyle(fg, bg, attrs) + (contents or '')
+		return self.get_hlstyle(fg, bg, attrs) + (contents or '')
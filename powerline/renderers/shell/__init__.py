@@ -85,6 +85,9 @@ class ShellRenderer(PromptRenderer):
 	tmux_escape = False
 	screen_escape = False
 
+	render_cache_attrs = ('used_term_escape_style',)
+	cache_hlstyle = True
+
 	character_translations = Renderer.character_translations.copy()
 
 	def render(self, segment_info, **kwargs):
@@ -31,6 +31,8 @@ class TmuxRenderer(Renderer):
 	character_translations = Renderer.character_translations.copy()
 	character_translations[ord('#')] = '##[]'
 
+	cache_hlstyle = True
+
 	def render(self, width=None, segment_info={}, **kwargs):
 		if width and segment_info:
 			width -= segment_info.get('width_adjust', 0)
@@ -5,10 +5,13 @@ import sys
 
 import vim
 
-from powerline.bindings.vim import vim_get_func, vim_getoption, environ, current_tabpage, get_vim_encoding
+from powerline.bindings.vim import (vim_get_func, vim_getoption, environ, current_tabpage,
+                                    get_vim_encoding, BufferOptions, getbufvar,
+                                    vim_getbufoption, buffer_name)
 from powerline.renderer import Renderer
 from powerline.colorscheme import ATTR_BOLD, ATTR_ITALIC, ATTR_UNDERLINE
 from powerline.theme import Theme
+from powerline.lib.memoize import LRUCache
 from powerline.lib.unicode import unichr, register_strwidth_error
 
 
@@ -32,6 +35,19 @@ class VimRenderer(Renderer):
 	segment_info = Renderer.segment_info.copy()
 	segment_info.update(environ=environ)
 
+	window_cache_options = ('modified', 'readonly', 'buftype', 'filetype', 'fileformat', 'fileencoding')
+	'''Buffer options whose values are part of non-current window cache key
+
+	See :py:meth:`get_window_cache_key`.
+	'''
+
+	window_cache_size = 0
+	'''Maximum number of non-current window statuslines kept in the cache
+
+	Zero disables the cache. Is normally set from :ref:`window_cache_size 
+	<config-common-window_cache_size>` option.
+	'''
+
 	def __init__(self, *args, **kwargs):
 		if not hasattr(vim, 'strwidth'):
 			# Hope nobody want to change this at runtime
@@ -43,6 +59,7 @@ class VimRenderer(Renderer):
 		self.prev_highlight = None
 		self.strwidth_error_name = register_strwidth_error(self.strwidth)
 		self.encoding = get_vim_encoding()
+		self.window_cache = LRUCache(self.window_cache_size) if self.window_cache_size else None
 
 	def shutdown(self):
 		self.theme.shutdown()
@@ -54,6 +71,8 @@ class VimRenderer(Renderer):
 		if matcher in self.local_themes:
 			raise KeyError('There is already a local theme with given matcher')
 		self.local_themes[matcher] = theme
+		if self.window_cache is not None:
+			self.window_cache.clear()
 
 	def get_matched_theme(self, match):
 		try:
@@ -106,11 +125,28 @@ class VimRenderer(Renderer):
 		)
 		segment_info['tabnr'] = segment_info['tabpage'].number
 		segment_info['bufnr'] = segment_info['buffer'].number
+		segment_info['buffer_options'] = BufferOptions(segment_info['bufnr'])
 		if is_tabline:
 			winwidth = int(vim_getoption('columns'))
 		else:
 			winwidth = segment_info['window'].width
 
+		cache_key = None
+		if self.window_cache is not None and not is_tabline:
+			if mode == 'nc':
+				cache_key = self.get_window_cache_key(segment_info, winwidth)
+				try:
+					cached_key, statusline = self.window_cache[window_id]
+				except KeyError:
+					pass
+				else:
+					if cached_key == cache_key:
+						return statusline
+			else:
+				# Segments decorated with window_cached compute values for 
+				# non-current windows while window is current.
+				self.window_cache.pop(window_id, None)
+
 		statusline = super(VimRenderer, self).render(
 			mode=mode,
 			width=winwidth,
@@ -118,10 +154,38 @@ class VimRenderer(Renderer):
 			matcher_info=(None if is_tabline else segment_info),
 		)
 		statusline = statusline.encode(self.encoding, self.strwidth_error_name)
+		if cache_key is not None:
+			self.window_cache[window_id] = (cache_key, statusline)
 		return statusline
 
+	def get_window_cache_key(self, segment_info, width):
+		'''Compute value identifying statusline of non-current window
+
+		Statuslines of non-current windows are cached while buffer contents 
+		(``b:changedtick``), buffer name, cursor position, window width and 
+		buffer options listed in :py:attr:`window_cache_options` stay the same.
+		'''
+		bufnr = segment_info['bufnr']
+		return (
+			width,
+			bufnr,
+			getbufvar(bufnr, 'changedtick'),
+			segment_info['window'].cursor,
+			buffer_name(segment_info),
+			tuple((
+				vim_getbufoption(segment_info, option)
+				for option in self.window_cache_options
+			)),
+		)
+
 	def reset_highlight(self):
 		self.hl_groups.clear()
+		if self.window_cache is not None:
+			self.window_cache.clear()
+		if self.render_cache is not None:
+			# Cached lines refer to highlight groups that are going to be 
+			# redefined
+			self.render_cache.clear()
 
 	def hlstyle(self, fg=None, bg=None, attrs=None):
 		'''Highlight a segment.
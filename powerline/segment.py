@@ -1,9 +1,6 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-from powerline.lib.watcher import create_file_watcher
-
-
 def list_segment_key_values(segment, theme_configs, segment_data, key, function_name=None, name=None, module=None, default=None):
 	try:
 		yield segment[key]
@@ -100,6 +97,55 @@ def get_attr_func(contents_func, key, args, is_space_func=False):
 			return lambda pl, shutdown_event: func(pl=pl, shutdown_event=shutdown_event, **args)
 
 
+def get_dependency_value(segment_info, key):
+	if key == 'getcwd':
+		return segment_info['getcwd']()
+	value = segment_info
+	for attr in key.split('.'):
+		if value is None:
+			break
+		elif hasattr(value, 'get'):
+			value = value.get(attr)
+		else:
+			value = getattr(value, attr, None)
+	if isinstance(value, list):
+		value = tuple(value)
+	return value
+
+
+def gen_fingerprint(contents_func, dependencies):
+	'''Create function that computes segment fingerprint
+
+	:param contents_func:
+		Segment function. If it has ``get_version`` method (like 
+		:py:class:`powerline.lib.threaded.ThreadedSegment` does) its result is 
+		added to the fingerprint.
+	:param tuple dependencies:
+		Keys declared with :py:func:`powerline.theme.depends_on`.
+
+	:return:
+		Function which takes segment info and returns a hashable value or 
+		``None`` if segment output cannot be cached at the moment.
+	'''
+	get_version = getattr(contents_func, 'get_version', None)
+	if get_version is None:
+		return lambda segment_info: tuple((
+			get_dependency_value(segment_info, key) for key in dependencies
+		))
+
+	def fingerprint(segment_info):
+		version = get_version()
+		if version is None:
+			return None
+		return (version,) + tuple((
+			get_dependency_value(segment_info, key) for key in dependencies
+		))
+	return fingerprint
+
+
+empty_fingerprint = lambda segment_info: ()
+
+
 def process_segment_lister(pl, segment_info, parsed_segments, side, mode, colorscheme,
 	                       lister, subsegments, patcher_args):
 	subsegments = [
@@ -353,6 +399,7 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 			))
 
 		display_condition = gen_display_condition(segment)
+		has_display_functions = 'include_function' in segment or 'exclude_function' in segment
 
 		if segment_type == 'segment_list':
 			# Handle startup and shutdown of _contents_func?
@@ -386,6 +433,8 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 				'draw_inner_divider': None,
 				'side': side,
 				'display_condition': display_condition,
+				'static_display_condition': not has_display_functions,
+				'fingerprint': None,
 				'width': None,
 				'align': None,
 				'expand': None,
@@ -405,19 +454,30 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 			truncate_func = get_attr_func(_contents_func, 'truncate', args, True)
 
 			if hasattr(_contents_func, 'powerline_requires_filesystem_watcher'):
-				create_watcher = lambda: create_file_watcher(pl, common_config['watcher'])
+				def create_watcher():
+					# Watchers are imported lazily: their implementations pull 
+					# in ctypes which is slow to import
+					from powerline.lib.watcher import create_file_watcher
+					return create_file_watcher(pl, common_config['watcher'])
 				args[str('create_watcher')] = create_watcher
 
 			if hasattr(_contents_func, 'powerline_requires_segment_info'):
 				contents_func = lambda pl, segment_info: _contents_func(pl=pl, segment_info=segment_info, **args)
 			else:
 				contents_func = lambda pl, segment_info: _contents_func(pl=pl, **args)
+
+			dependencies = getattr(_contents_func, 'powerline_dependencies', None)
+			if dependencies is None or has_display_functions:
+				fingerprint = None
+			else:
+				fingerprint = gen_fingerprint(_contents_func, dependencies)
 		else:
 			startup_func = None
 			shutdown_func = None
 			contents_func = None
 			expand_func = None
 			truncate_func = None
+			fingerprint = None if has_display_functions else empty_fingerprint
 
 		return {
 			'name': name or function_name,
@@ -435,6 +495,8 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 			'draw_inner_divider': segment.get('draw_inner_divider', False),
 			'side': side,
 			'display_condition': display_condition,
+			'static_display_condition': not has_display_functions,
+			'fingerprint': fingerprint,
 			'width': segment.get('width'),
 			'align': segment.get('align', 'l'),
 			'expand': expand_func,
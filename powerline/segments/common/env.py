@@ -5,7 +5,8 @@ import os
 import os, glob, subprocess, shlex, re
 
 from powerline.lib.unicode import out_u
-from powerline.theme import requires_segment_info
+from powerline.lib.lazy import lazy_import, available
+from powerline.theme import requires_segment_info, depends_on
 from powerline.segments import Segment, with_docstring
 
 
@@ -24,6 +25,7 @@ def environment(pl, segment_info, variable=None, command=None):
 
 
 
+@depends_on('environ.VIRTUAL_ENV', 'environ.CONDA_DEFAULT_ENV')
 @requires_segment_info
 def virtualenv(pl, segment_info, ignore_venv=False, ignore_conda=False):
 	'''Return the name of the current Python or conda virtualenv.
@@ -41,6 +43,7 @@ def virtualenv(pl, segment_info, ignore_venv=False, ignore_conda=False):
 		None)
 
 
+@depends_on('getcwd', 'home')
 @requires_segment_info
 class CwdSegment(Segment):
 	def argspecobjs(self):
@@ -135,29 +138,31 @@ Highlight groups used: ``cwd:current_folder`` or ``cwd``. It is recommended to d
 
 
 try:
-	import psutil
-
-	# psutil-2.0.0: psutil.Process.username is unbound method
-	if callable(psutil.Process.username):
-		def _get_user():
-			return psutil.Process(os.getpid()).username()
-	# pre psutil-2.0.0: psutil.Process.username has type property
-	else:
-		def _get_user():
-			return psutil.Process(os.getpid()).username
+	import pwd
 except ImportError:
+	from getpass import getuser as _get_system_user
+else:
 	try:
-		import pwd
+		from os import geteuid as getuid
 	except ImportError:
-		from getpass import getuser as _get_user
-	else:
-		try:
-			from os import geteuid as getuid
-		except ImportError:
-			from os import getuid
+		from os import getuid
+
+	def _get_system_user():
+		return pwd.getpwuid(getuid()).pw_name
+
+
+psutil = lazy_import('psutil')
+
 
-		def _get_user():
-			return pwd.getpwuid(getuid()).pw_name
+def _get_user():
+	if not available(psutil):
+		return _get_system_user()
+	username = psutil.Process(os.getpid()).username
+	# psutil.Process.username is a method since psutil-2.0.0 and a property
+	# in older versions
+	if callable(username):
+		username = username()
+	return username
 
 
 username = False
@@ -165,6 +170,7 @@ username = False
 _geteuid = getattr(os, 'geteuid', lambda: 1)
 
 
+@depends_on()
 def user(pl, hide_user=None, hide_domain=False):
 	'''Return the current user.
 
@@ -2,17 +2,19 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 import re
-import os
 import socket
 
 from powerline.lib.url import urllib_read
 from powerline.lib.threaded import ThreadedSegment, KwThreadedSegment
 from powerline.lib.monotonic import monotonic
 from powerline.lib.humanize_bytes import humanize_bytes
+from powerline.lib.proc import proc_reader
+from powerline.lib.lazy import lazy_import, available
 from powerline.segments import with_docstring
-from powerline.theme import requires_segment_info
+from powerline.theme import requires_segment_info, depends_on
 
 
+@depends_on('environ.SSH_CLIENT')
 @requires_segment_info
 def hostname(pl, segment_info, only_if_ssh=False, exclude_domain=False):
 	'''Return the current hostname.
@@ -65,62 +67,63 @@ Divider highlight group used: ``background:divider``.
 ''')
 
 
-try:
-	import netifaces
-except ImportError:
-	def internal_ip(pl, interface='auto', ipv=4):
-		return None
-else:
-	_interface_starts = {
-		'eth':      10,  # Regular ethernet adapters         : eth1
-		'enp':      10,  # Regular ethernet adapters, Gentoo : enp2s0
-		'en':       10,  # OS X                              : en0 
-		'ath':       9,  # Atheros WiFi adapters             : ath0
-		'wlan':      9,  # Other WiFi adapters               : wlan1
-		'wlp':       9,  # Other WiFi adapters, Gentoo       : wlp5s0
-		'teredo':    1,  # miredo interface                  : teredo
-		'lo':      -10,  # Loopback interface                : lo
-		'docker':   -5,  # Docker bridge interface           : docker0
-		'vmnet':    -5,  # VMWare bridge interface           : vmnet1
-		'vboxnet':  -5,  # VirtualBox bridge interface       : vboxnet0
-	}
-
-	_interface_start_re = re.compile(r'^([a-z]+?)(\d|$)')
-
-	def _interface_key(interface):
-		match = _interface_start_re.match(interface)
-		if match:
-			try:
-				base = _interface_starts[match.group(1)] * 100
-			except KeyError:
-				base = 500
-			if match.group(2):
-				return base - int(match.group(2))
-			else:
-				return base
+netifaces = lazy_import('netifaces')
+
+
+_interface_starts = {
+	'eth':      10,  # Regular ethernet adapters         : eth1
+	'enp':      10,  # Regular ethernet adapters, Gentoo : enp2s0
+	'en':       10,  # OS X                              : en0 
+	'ath':       9,  # Atheros WiFi adapters             : ath0
+	'wlan':      9,  # Other WiFi adapters               : wlan1
+	'wlp':       9,  # Other WiFi adapters, Gentoo       : wlp5s0
+	'teredo':    1,  # miredo interface                  : teredo
+	'lo':      -10,  # Loopback interface                : lo
+	'docker':   -5,  # Docker bridge interface           : docker0
+	'vmnet':    -5,  # VMWare bridge interface           : vmnet1
+	'vboxnet':  -5,  # VirtualBox bridge interface       : vboxnet0
+}
+
+_interface_start_re = re.compile(r'^([a-z]+?)(\d|$)')
+
+
+def _interface_key(interface):
+	match = _interface_start_re.match(interface)
+	if match:
+		try:
+			base = _interface_starts[match.group(1)] * 100
+		except KeyError:
+			base = 500
+		if match.group(2):
+			return base - int(match.group(2))
 		else:
-			return 0
+			return base
+	else:
+		return 0
 
-	def internal_ip(pl, interface='auto', ipv=4):
-		family = netifaces.AF_INET6 if ipv == 6 else netifaces.AF_INET
-		if interface == 'auto':
-			try:
-				interface = next(iter(sorted(netifaces.interfaces(), key=_interface_key, reverse=True)))
-			except StopIteration:
-				pl.info('No network interfaces found')
-				return None
-		elif interface == 'default_gateway':
-			try:
-				interface = netifaces.gateways()['default'][family][1]
-			except KeyError:
-				pl.info('No default gateway found for IPv{0}', ipv)
-				return None
-		addrs = netifaces.ifaddresses(interface)
+
+def internal_ip(pl, interface='auto', ipv=4):
+	if not available(netifaces):
+		return None
+	family = netifaces.AF_INET6 if ipv == 6 else netifaces.AF_INET
+	if interface == 'auto':
+		try:
+			interface = next(iter(sorted(netifaces.interfaces(), key=_interface_key, reverse=True)))
+		except StopIteration:
+			pl.info('No network interfaces found')
+			return None
+	elif interface == 'default_gateway':
 		try:
-			return addrs[family][0]['addr']
-		except (KeyError, IndexError):
-			pl.info("No IPv{0} address found for interface {1}", ipv, interface)
+			interface = netifaces.gateways()['default'][family][1]
+		except KeyError:
+			pl.info('No default gateway found for IPv{0}', ipv)
 			return None
+	addrs = netifaces.ifaddresses(interface)
+	try:
+		return addrs[family][0]['addr']
+	except (KeyError, IndexError):
+		pl.info("No IPv{0} address found for interface {1}", ipv, interface)
+		return None
 
 
 internal_ip = with_docstring(internal_ip,
@@ -150,40 +153,33 @@ Requires ``netifaces`` module to work properly.
 ''')
 
 
-try:
-	import psutil
+psutil = lazy_import('psutil')
 
-	def _get_bytes(interface):
-		try:
-			io_counters = psutil.net_io_counters(pernic=True)
-		except AttributeError:
-			io_counters = psutil.network_io_counters(pernic=True)
-		if_io = io_counters.get(interface)
-		if not if_io:
-			return None
-		return if_io.bytes_recv, if_io.bytes_sent
 
-	def _get_interfaces():
+if proc_reader.exists('net/dev'):
+	def _get_counters():
+		return proc_reader.sample('net/dev')
+else:
+	def _get_counters():
+		if not available(psutil):
+			return monotonic(), {}
 		try:
 			io_counters = psutil.net_io_counters(pernic=True)
 		except AttributeError:
 			io_counters = psutil.network_io_counters(pernic=True)
-		for interface, data in io_counters.items():
-			if data:
-				yield interface, data.bytes_recv, data.bytes_sent
-except ImportError:
-	def _get_bytes(interface):
-		with open('/sys/class/net/{interface}/statistics/rx_bytes'.format(interface=interface), 'rb') as file_obj:
-			rx = int(file_obj.read())
-		with open('/sys/class/net/{interface}/statistics/tx_bytes'.format(interface=interface), 'rb') as file_obj:
-			tx = int(file_obj.read())
-		return (rx, tx)
-
-	def _get_interfaces():
-		for interface in os.listdir('/sys/class/net'):
-			x = _get_bytes(interface)
-			if x is not None:
-				yield interface, x[0], x[1]
+		return monotonic(), dict((
+			(interface, (data.bytes_recv, data.bytes_sent))
+			for interface, data in io_counters.items()
+			if data
+		))
+
+
+if proc_reader.exists('net/route'):
+	def _get_default_interface():
+		return proc_reader.sample('net/route')[1]
+else:
+	def _get_default_interface():
+		return None
 
 
 class NetworkLoadSegment(KwThreadedSegment):
@@ -195,27 +191,17 @@ class NetworkLoadSegment(KwThreadedSegment):
 		return interface
 
 	def compute_state(self, interface):
+		sample_time, counters = _get_counters()
 		if interface == 'auto':
-			proc_exists = getattr(self, 'proc_exists', None)
-			if proc_exists is None:
-				proc_exists = self.proc_exists = os.path.exists('/proc/net/route')
-			if proc_exists:
-				# Look for default interface in routing table
-				with open('/proc/net/route', 'rb') as f:
-					for line in f.readlines():
-						parts = line.split()
-						if len(parts) > 1:
-							iface, destination = parts[:2]
-							if not destination.replace(b'0', b''):
-								interface = iface.decode('utf-8')
-								break
-			if interface == 'auto':
+			# Look for default interface in routing table
+			interface = _get_default_interface()
+			if interface is None:
 				# Choose interface with most total activity, excluding some
 				# well known interface names
 				interface, total = 'eth0', -1
-				for name, rx, tx in _get_interfaces():
+				for name, (rx, tx) in counters.items():
 					base = self.replace_num_pat.match(name)
-					if None in (base, rx, tx) or base.group() in ('lo', 'vmnet', 'sit'):
+					if base is None or base.group() in ('lo', 'vmnet', 'sit'):
 						continue
 					activity = rx + tx
 					if activity > total:
@@ -231,11 +217,12 @@ class NetworkLoadSegment(KwThreadedSegment):
 		except KeyError:
 			idata = {}
 			if self.run_once:
-				idata['prev'] = (monotonic(), _get_bytes(interface))
+				idata['prev'] = (sample_time, counters.get(interface))
 				self.shutdown_event.wait(self.interval)
+				sample_time, counters = _get_counters()
 			self.interfaces[interface] = idata
 
-		idata['last'] = (monotonic(), _get_bytes(interface))
+		idata['last'] = (sample_time, counters.get(interface))
 		return idata.copy()
 
 	def render_one(self, idata, recv_format='DL {value:>8}', sent_format='UL {value:>8}', suffix='B/s', si_prefix=False, **kwargs):
@@ -280,9 +267,9 @@ class NetworkLoadSegment(KwThreadedSegment):
 network_load = with_docstring(NetworkLoadSegment(),
 '''Return the network load.
 
-Uses the ``psutil`` module if available for multi-platform compatibility,
-falls back to reading
-:file:`/sys/class/net/{interface}/statistics/{rx,tx}_bytes`.
+Reads :file:`/proc/net/dev` on Linux, uses the ``psutil`` module on other
+platforms. Counters of all interfaces are read at once and shared with other
+``network_load`` segments updated at the same time.
 
 :param str interface:
 	Network interface to measure (use the special value "auto" to have powerline 
@@ -5,6 +5,7 @@ import sys
 
 from powerline.lib.shell import asrun, run_cmd
 from powerline.lib.unicode import out_u
+from powerline.lib.lazy import lazy_import, available
 from powerline.segments import Segment, with_docstring
 
 
@@ -235,51 +236,50 @@ package) or alternatively the ``mpc`` command to be acessible from $PATH.
 ''').format(_common_args.format('mpd')))
 
 
-try:
-	import dbus
-except ImportError:
-	def _get_dbus_player_status(pl, player_name, **kwargs):
+dbus = lazy_import('dbus')
+
+
+def _get_dbus_player_status(pl, bus_name, player_path, iface_prop,
+                            iface_player, player_name='player'):
+	if not available(dbus):
 		pl.error('Could not add {0} segment: requires dbus module', player_name)
 		return
-else:
-	def _get_dbus_player_status(pl, bus_name, player_path, iface_prop,
-	                            iface_player, player_name='player'):
-		bus = dbus.SessionBus()
-		try:
-			player = bus.get_object(bus_name, player_path)
-			iface = dbus.Interface(player, iface_prop)
-			info = iface.Get(iface_player, 'Metadata')
-			status = iface.Get(iface_player, 'PlaybackStatus')
-		except dbus.exceptions.DBusException:
-			return
-		if not info:
-			return
+	bus = dbus.SessionBus()
+	try:
+		player = bus.get_object(bus_name, player_path)
+		iface = dbus.Interface(player, iface_prop)
+		info = iface.Get(iface_player, 'Metadata')
+		status = iface.Get(iface_player, 'PlaybackStatus')
+	except dbus.exceptions.DBusException:
+		return
+	if not info:
+		return
 
-		try:
-			elapsed = iface.Get(iface_player, 'Position')
-		except dbus.exceptions.DBusException:
-			pl.warning('Missing player elapsed time')
-			elapsed = None
-		else:
-			elapsed = _convert_seconds(elapsed / 1e6)
-		album = info.get('xesam:album')
-		title = info.get('xesam:title')
-		artist = info.get('xesam:artist')
-		state = _convert_state(status)
-		if album:
-			album = out_u(album)
-		if title:
-			title = out_u(title)
-		if artist:
-			artist = out_u(artist[0])
-		return {
-			'state': state,
-			'album': album,
-			'artist': artist,
-			'title': title,
-			'elapsed': elapsed,
-			'total': _convert_seconds(info.get('mpris:length') / 1e6),
-		}
+	try:
+		elapsed = iface.Get(iface_player, 'Position')
+	except dbus.exceptions.DBusException:
+		pl.warning('Missing player elapsed time')
+		elapsed = None
+	else:
+		elapsed = _convert_seconds(elapsed / 1e6)
+	album = info.get('xesam:album')
+	title = info.get('xesam:title')
+	artist = info.get('xesam:artist')
+	state = _convert_state(status)
+	if album:
+		album = out_u(album)
+	if title:
+		title = out_u(title)
+	if artist:
+		artist = out_u(artist[0])
+	return {
+		'state': state,
+		'album': album,
+		'artist': artist,
+		'title': title,
+		'elapsed': elapsed,
+		'total': _convert_seconds(info.get('mpris:length') / 1e6),
+	}
 
 
 class DbusPlayerSegment(PlayerSegment):
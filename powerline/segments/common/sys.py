@@ -3,15 +3,30 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 import os
 
-from multiprocessing import cpu_count as _cpu_count
-
 from powerline.lib.threaded import ThreadedSegment
 from powerline.lib import add_divider_highlight_group
+from powerline.lib.proc import proc_reader, cpu_percent
+from powerline.lib.lazy import lazy_import, available
 from powerline.segments import with_docstring
 
 
 cpu_count = None
 
+multiprocessing = lazy_import('multiprocessing')
+psutil = lazy_import('psutil')
+
+
+def _cpu_count():
+	return multiprocessing.cpu_count()
+
+
+if proc_reader.exists('loadavg'):
+	def _get_loadavg():
+		return proc_reader.sample('loadavg')[1]
+else:
+	def _get_loadavg():
+		return os.getloadavg()
+
 
 def system_load(pl, format='{avg:.1f}', threshold_good=1, threshold_bad=2,
                 track_cpu_count=False, short=False):
@@ -50,7 +65,7 @@ def system_load(pl, format='{avg:.1f}', threshold_good=1, threshold_bad=2,
 		pl.warn('Unable to get CPU count: method is not implemented')
 		return None
 	ret = []
-	for avg in os.getloadavg():
+	for avg in _get_loadavg():
 		normalized = avg / cpu_num
 		if normalized < threshold_good:
 			gradient_level = 0
@@ -73,80 +88,112 @@ def system_load(pl, format='{avg:.1f}', threshold_good=1, threshold_bad=2,
 	return ret
 
 
-try:
-	import psutil
-
-	class CPULoadPercentSegment(ThreadedSegment):
-		interval = 1
+class BaseCPULoadPercentSegment(ThreadedSegment):
+	interval = 1
 
-		def update(self, old_cpu):
-			return psutil.cpu_percent(interval=None)
-
-		def run(self):
-			while not self.shutdown_event.is_set():
-				try:
-					self.update_value = psutil.cpu_percent(interval=self.interval)
-				except Exception as e:
-					self.exception('Exception while calculating cpu_percent: {0}', str(e))
-
-		def render(self, cpu_percent, format='{0:.0f}%', **kwargs):
-			if not cpu_percent:
+	def render(self, cpu_percent, format='{0:.0f}%', per_core=False, **kwargs):
+		if not cpu_percent:
+			return None
+		total, cores = cpu_percent
+		if not per_core:
+			if not total:
 				return None
 			return [{
-				'contents': format.format(cpu_percent),
-				'gradient_level': cpu_percent,
+				'contents': format.format(total),
+				'gradient_level': total,
 				'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
 			}]
-except ImportError:
-	class CPULoadPercentSegment(ThreadedSegment):
-		interval = 1
+		if not cores:
+			return None
+		ret = [{
+			'contents': format.format(core) + ' ',
+			'gradient_level': core,
+			'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
+			'divider_highlight_group': 'background:divider',
+		} for core in cores]
+		ret[-1]['contents'] = ret[-1]['contents'][:-1]
+		return ret
 
-		@staticmethod
-		def startup(**kwargs):
-			pass
 
-		@staticmethod
-		def start():
-			pass
+if proc_reader.exists('stat'):
+	class CPULoadPercentSegment(BaseCPULoadPercentSegment):
+		def __init__(self):
+			super(CPULoadPercentSegment, self).__init__()
+			self.last_sample = None
 
-		@staticmethod
-		def shutdown():
-			pass
+		def update(self, old_cpu):
+			sample = proc_reader.sample('stat')
+			last_sample = self.last_sample
+			if last_sample is None:
+				self.last_sample = sample
+				return None
+			(old_total, old_cores), (total, cores) = last_sample[1], sample[1]
+			total_percent = cpu_percent(old_total, total)
+			if total_percent is None:
+				# Counters did not change since the previous sample, happens 
+				# when interval is less than /proc reader tick or clock tick.
+				return old_cpu
+			self.last_sample = sample
+			return (
+				total_percent,
+				[cpu_percent(old, new) or 0 for old, new in zip(old_cores, cores)],
+			)
+else:
+	class CPULoadPercentSegment(BaseCPULoadPercentSegment):
+		def startup(self, **kwargs):
+			# Without psutil segment is updated from __call__, there is no 
+			# point in running update thread.
+			if available(psutil):
+				super(CPULoadPercentSegment, self).startup(**kwargs)
 
-		@staticmethod
-		def render(cpu_percent, pl, format='{0:.0f}%', **kwargs):
-			pl.warn('Module “psutil” is not installed, thus CPU load is not available')
-			return None
+		def shutdown(self):
+			if self.thread:
+				super(CPULoadPercentSegment, self).shutdown()
+
+		def update(self, old_cpu):
+			if not available(psutil):
+				return None
+			return psutil.cpu_percent(interval=None), psutil.cpu_percent(interval=None, percpu=True)
+
+		def render(self, cpu_percent, pl, **kwargs):
+			if not available(psutil):
+				pl.warn('Module “psutil” is not installed, thus CPU load is not available')
+				return None
+			return super(CPULoadPercentSegment, self).render(cpu_percent, pl=pl, **kwargs)
 
 
 cpu_load_percent = with_docstring(CPULoadPercentSegment(),
 '''Return the average CPU load as a percentage.
 
-Requires the ``psutil`` module.
+On Linux load is computed from the difference between the current sample of 
+:file:`/proc/stat` and the sample taken on the previous update, so it is cheap 
+enough to use sub-second ``interval``. On other platforms requires the 
+``psutil`` module.
 
 :param str format:
 	Output format. Accepts measured CPU load as the first argument.
+:param bool per_core:
+	If True, return one segment for each CPU core instead of the average load.
+
+Divider highlight group used: ``background:divider``.
 
 Highlight groups used: ``cpu_load_percent_gradient`` (gradient) or ``cpu_load_percent``.
 ''')
 
 
-if os.path.exists('/proc/uptime'):
+if proc_reader.exists('uptime'):
 	def _get_uptime():
-		with open('/proc/uptime', 'r') as f:
-			return int(float(f.readline().split()[0]))
-elif 'psutil' in globals():
+		return int(proc_reader.sample('uptime')[1])
+else:
 	from time import time
 
-	if hasattr(psutil, 'boot_time'):
-		def _get_uptime():
+	def _get_uptime():
+		if not available(psutil):
+			raise NotImplementedError
+		if hasattr(psutil, 'boot_time'):
 			return int(time() - psutil.boot_time())
-	else:
-		def _get_uptime():
+		else:
 			return int(time() - psutil.BOOT_TIME)
-else:
-	def _get_uptime():
-		raise NotImplementedError
 
 
 @add_divider_highlight_group('background:divider')
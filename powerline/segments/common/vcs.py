@@ -45,7 +45,8 @@ branch = with_docstring(BranchSegment(),
 
 :param bool status_colors:
 	Determines whether repository status will be used to determine highlighting. 
-	Default: False.
+	Default: False. After changes in the working tree status is recomputed in 
+	background, until then the last known status is used.
 :param list ignore_statuses:
 	List of statuses which will not result in repo being marked as dirty. Most 
 	useful is setting this option to ``["U"]``: this will ignore repository 
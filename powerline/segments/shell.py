@@ -1,12 +1,13 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-from powerline.theme import requires_segment_info
+from powerline.theme import requires_segment_info, depends_on
 from powerline.segments import with_docstring
 from powerline.segments.common.env import CwdSegment
 from powerline.lib.unicode import out_u
 
 
+@depends_on('args.jobnum')
 @requires_segment_info
 def jobnum(pl, segment_info, show_zero=False):
 	'''Return the number of jobs.
@@ -22,6 +23,7 @@ def jobnum(pl, segment_info, show_zero=False):
 		return str(jobnum)
 
 
+@depends_on('args.last_exit_code')
 @requires_segment_info
 def last_status(pl, segment_info):
 	'''Return last exit code.
@@ -33,6 +35,7 @@ def last_status(pl, segment_info):
 	return [{'contents': str(segment_info['args'].last_exit_code), 'highlight_groups': ['exit_fail']}]
 
 
+@depends_on('args.last_pipe_status', 'args.last_exit_code')
 @requires_segment_info
 def last_pipe_status(pl, segment_info):
 	'''Return last pipe status.
@@ -56,6 +59,7 @@ def last_pipe_status(pl, segment_info):
 		return None
 
 
+@depends_on('mode', 'default_mode')
 @requires_segment_info
 def mode(pl, segment_info, override={'vicmd': 'COMMND', 'viins': 'INSERT'}, default=None):
 	'''Return the current mode.
@@ -87,6 +91,7 @@ def mode(pl, segment_info, override={'vicmd': 'COMMND', 'viins': 'INSERT'}, defa
 		return mode.upper()
 
 
+@depends_on('parser_state')
 @requires_segment_info
 def continuation(pl, segment_info, omit_cmdsubst=True, right_align=False, renames={}):
 	'''Display parser state.
@@ -135,6 +140,7 @@ def continuation(pl, segment_info, omit_cmdsubst=True, right_align=False, rename
 	return ret
 
 
+@depends_on('getcwd', 'home', 'shortened_path')
 @requires_segment_info
 class ShellCwdSegment(CwdSegment):
 	def get_shortened_path(self, pl, segment_info, use_shortened_path=True, **kwargs):
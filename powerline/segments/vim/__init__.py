@@ -6,7 +6,7 @@ import re
 import csv
 import sys
 
-from collections import defaultdict
+from bisect import bisect_left
 
 try:
 	import vim
@@ -16,7 +16,8 @@ except ImportError:
 from powerline.bindings.vim import (vim_get_func, getbufvar, vim_getbufoption,
                                     buffer_name, vim_getwinvar,
                                     register_buffer_cache, current_tabpage,
-                                    list_tabpage_buffers_segment_info)
+                                    list_tabpage_buffers_segment_info,
+                                    list_modified_buffers, get_buffer_change_tracker)
 from powerline.theme import requires_segment_info, requires_filesystem_watcher
 from powerline.lib import add_divider_highlight_group
 from powerline.lib.vcs import guess
@@ -482,9 +483,7 @@ def modified_buffers(pl, text='+ ', join_str=','):
 		string to use for joining the modified buffer list
 	'''
 	buffer_mod_text = join_str.join((
-		str(buffer.number)
-		for buffer in vim.buffers
-		if int(vim_getbufoption({'buffer': buffer, 'bufnr': buffer.number}, 'modified'))
+		str(bufnr) for bufnr in list_modified_buffers()
 	))
 	if buffer_mod_text:
 		return text + buffer_mod_text
@@ -567,6 +566,127 @@ def file_vcs_status(pl, segment_info, create_watcher):
 			return ret
 
 
+class TrailingWhitespaceIndex(object):
+	'''Numbers of buffer lines which have trailing whitespace
+
+	Lines that need to be (re)checked are kept as a sorted list of ``[start, 
+	end)`` ranges of 0-based line numbers (``end`` may be ``None`` meaning “up 
+	to the end of the buffer”). When Vim reports changes (see 
+	:py:meth:`apply_change`) only changed lines are marked, otherwise whole 
+	buffer is marked using :py:meth:`reset`.
+
+	Marked lines are checked lazily, from the top, up to :py:attr:`chunk_size` 
+	lines per :py:meth:`update` call: checking stops as soon as the first line 
+	with trailing whitespace is known.
+	'''
+	chunk_size = 20000
+
+	def __init__(self):
+		self.result = None
+		self.reset()
+
+	def reset(self):
+		self.lines = []
+		self.dirty = [[0, None]]
+
+	def apply_change(self, start, end, added):
+		'''Account for one change reported by Vim listener
+
+		:param int start:
+			First changed line (1-based).
+		:param int end:
+			Line below the last changed line, before the change.
+		:param int added:
+			Number of added lines, negative if lines were deleted.
+		'''
+		start -= 1
+		end -= 1
+		lines = self.lines
+		lines[bisect_left(lines, start):] = [
+			lnum + added for lnum in lines[bisect_left(lines, end):]
+		]
+		dirty = [[start, end + added]]
+		for rstart, rend in self.dirty:
+			if rstart >= end:
+				rstart += added
+			elif rstart > start:
+				rstart = start
+			if rend is not None:
+				if rend > end:
+					rend += added
+				elif rend > start:
+					rend = end + added
+			dirty.append([rstart, rend])
+		dirty.sort(key=lambda rng: rng[0])
+		self.dirty = []
+		for rstart, rend in dirty:
+			if rend is not None and rend <= rstart:
+				continue
+			if self.dirty and (self.dirty[-1][1] is None or self.dirty[-1][1] >= rstart):
+				last = self.dirty[-1]
+				if last[1] is not None:
+					last[1] = None if rend is None else max(last[1], rend)
+			else:
+				self.dirty.append([rstart, rend])
+
+	def update(self, line_count, has_trailing_whitespace):
+		'''Check marked lines until the first line with trailing whitespace is known
+
+		:param int line_count:
+			Number of lines in the buffer.
+		:param func has_trailing_whitespace:
+			Function which accepts 0-based line number and checks whether this 
+			line has trailing whitespace.
+
+		:return:
+			1-based number of the first line with trailing whitespace or 
+			``None``. If not enough lines were checked to determine it, result 
+			of the previous call is returned.
+		'''
+		lines = self.lines
+		dirty = self.dirty
+		budget = self.chunk_size
+		while dirty:
+			start, end = dirty[0]
+			if end is None or end > line_count:
+				end = line_count
+			if start >= end:
+				dirty.pop(0)
+				continue
+			if (lines and lines[0] < start) or not budget:
+				break
+			stop = min(end, start + budget)
+			for lnum in range(start, stop):
+				if has_trailing_whitespace(lnum):
+					stop = lnum + 1
+					i = bisect_left(lines, lnum)
+					if i == len(lines) or lines[i] != lnum:
+						lines.insert(i, lnum)
+					break
+			budget -= stop - start
+			dirty[0][0] = stop
+		if not dirty or (lines and lines[0] < dirty[0][0]):
+			self.result = lines[0] + 1 if lines else None
+		return self.result
+
+
+def line_has_trailing_whitespace(buf, bufnr, lnum):
+	try:
+		line = buf[lnum]
+	except UnicodeDecodeError:  # May happen in Python 3
+		if hasattr(vim, 'bindeval'):
+			line = vim.bindeval('getbufline({0}, {1})'.format(
+				bufnr, lnum + 1))
+			return line[-1] in b' \t'
+		else:
+			line = vim.eval('strtrans(getbufline({0}, {1}))'.format(
+				bufnr, lnum + 1))
+			return line[-1] in b' \t'
+	else:
+		# Ignore unicode_literals and use native str.
+		return bool(line and line[-1] in str(' \t'))
+
+
 trailing_whitespace_cache = None
 
 
@@ -574,49 +694,35 @@ trailing_whitespace_cache = None
 def trailing_whitespace(pl, segment_info):
 	'''Return the line number for trailing whitespaces
 
-	It is advised not to use this segment in insert mode: in Insert mode it will 
-	iterate over all lines in buffer each time you happen to type a character 
-	which may cause lags. It will also show you whitespace warning each time you 
-	happen to type space.
+	In Vim versions which support |listener_add()| only lines changed since 
+	the last check are examined. In other versions (and in Neovim) the whole 
+	buffer is rescanned each time it changes. In both cases at most 
+	:py:attr:`TrailingWhitespaceIndex.chunk_size` lines are examined at once: 
+	on large files segment may show outdated result until a few redraws 
+	happen. It will also show you whitespace warning each time you happen to 
+	type space.
 
 	Highlight groups used: ``trailing_whitespace`` or ``warning``.
 	'''
 	global trailing_whitespace_cache
 	if trailing_whitespace_cache is None:
-		trailing_whitespace_cache = register_buffer_cache(defaultdict(lambda: (0, None)))
+		trailing_whitespace_cache = register_buffer_cache({})
 	bufnr = segment_info['bufnr']
-	changedtick = getbufvar(bufnr, 'changedtick')
-	if trailing_whitespace_cache[bufnr][0] == changedtick:
-		return trailing_whitespace_cache[bufnr][1]
-	else:
-		buf = segment_info['buffer']
-		bws = b' \t'
-		sws = str(' \t')  # Ignore unicode_literals and use native str.
-		for i in range(len(buf)):
-			try:
-				line = buf[i]
-			except UnicodeDecodeError:  # May happen in Python 3
-				if hasattr(vim, 'bindeval'):
-					line = vim.bindeval('getbufline({0}, {1})'.format(
-						bufnr, i + 1))
-					has_trailing_ws = (line[-1] in bws)
-				else:
-					line = vim.eval('strtrans(getbufline({0}, {1}))'.format(
-						bufnr, i + 1))
-					has_trailing_ws = (line[-1] in bws)
-			else:
-				has_trailing_ws = (line and line[-1] in sws)
-			if has_trailing_ws:
-				break
-		if has_trailing_ws:
-			ret = [{
-				'contents': str(i + 1),
-				'highlight_groups': ['trailing_whitespace', 'warning'],
-			}]
-		else:
-			ret = None
-		trailing_whitespace_cache[bufnr] = (changedtick, ret)
-		return ret
+	tracker = get_buffer_change_tracker(bufnr)
+	try:
+		index = trailing_whitespace_cache[bufnr]
+	except KeyError:
+		index = trailing_whitespace_cache[bufnr] = TrailingWhitespaceIndex()
+		tracker.add_index(index)
+	tracker.update(getbufvar(bufnr, 'changedtick'))
+	buf = segment_info['buffer']
+	lnum = index.update(len(buf), lambda lnum: line_has_trailing_whitespace(buf, bufnr, lnum))
+	if lnum is None:
+		return None
+	return [{
+		'contents': str(lnum),
+		'highlight_groups': ['trailing_whitespace', 'warning'],
+	}]
 
 
 @requires_segment_info
@@ -690,16 +796,176 @@ else:
 		return fin(csv.reader(l, dialect))
 
 
+CSV_INDEX_LINES = 10000
+
+
+def parse_csv_line(text, dialect, in_quotes):
+	'''Find field delimiters in one line of CSV file
+
+	:param str text:
+		Line contents.
+	:param dialect:
+		CSV dialect, see :py:mod:`csv`.
+	:param bool in_quotes:
+		True if line starts inside a quoted field.
+
+	:return:
+		``(delimiters, in_quotes)`` pair: list of positions of delimiters 
+		which separate fields and a boolean which is true if line ends inside 
+		a quoted field.
+	'''
+	delimiter = dialect.delimiter
+	quotechar = dialect.quotechar
+	escapechar = dialect.escapechar
+	if not in_quotes and (not quotechar or quotechar not in text) and (not escapechar or escapechar not in text):
+		return [i for i, c in enumerate(text) if c == delimiter], False
+	doublequote = dialect.doublequote
+	skipinitialspace = dialect.skipinitialspace
+	delimiters = []
+	field_start = not in_quotes
+	i = 0
+	length = len(text)
+	while i < length:
+		c = text[i]
+		if c == escapechar:
+			field_start = False
+			i += 2
+			continue
+		if in_quotes:
+			if c == quotechar:
+				if doublequote and text[i + 1:i + 2] == quotechar:
+					i += 1
+				else:
+					in_quotes = False
+		elif c == delimiter:
+			delimiters.append(i)
+			field_start = True
+		elif field_start and c == quotechar:
+			in_quotes = True
+			field_start = False
+		elif not (field_start and skipinitialspace and c == ' '):
+			field_start = False
+		i += 1
+	return delimiters, in_quotes
+
+
+def get_buffer_lines(buffer, start, end):
+	try:
+		return buffer[start:end]
+	except UnicodeDecodeError:  # May happen in Python 3
+		return vim.eval('map(getbufline({0}, {1}, {2}), "strtrans(v:val)")'.format(
+			buffer.number, start + 1, end))
+
+
+class CSVIndex(object):
+	'''Record boundaries of a CSV buffer
+
+	``states[i]`` describes the state of the parser at the start of line 
+	``i``: it is a ``(column, in_quotes)`` pair where ``column`` is the number 
+	of fields of the current record that started on the previous lines and 
+	``in_quotes`` is true if line starts inside a multi-line quoted field. 
+	States are known for a prefix of the buffer, it is extended lazily by 
+	:py:meth:`get_state` and truncated when buffer changes (see 
+	:py:class:`powerline.bindings.vim.BufferChangeTracker`).
+
+	Also holds dialect detected for the buffer and ``b:changedtick`` value 
+	seen by the last :py:func:`process_csv_buffer` call.
+	'''
+	def __init__(self):
+		self.changedtick = None
+		self.dialect = None
+		self.has_header = None
+		self.first_line = None
+		self.reset()
+
+	def reset(self):
+		self.states = [(0, False)]
+		self.delimiters = {}
+
+	def apply_change(self, start, end, added):
+		# State at the start of the first changed line does not depend on 
+		# changed lines.
+		del self.states[start:]
+		self.delimiters.clear()
+
+	def get_delimiters(self, lnum, text, in_quotes):
+		try:
+			return self.delimiters[lnum]
+		except KeyError:
+			pass
+		ret = self.delimiters[lnum] = parse_csv_line(text, self.dialect, in_quotes)[0]
+		return ret
+
+	def get_state(self, buffer, lnum, max_lines):
+		'''Get parser state at the start of the given line
+
+		:param int lnum:
+			Line number, zero-based.
+		:param int max_lines:
+			Maximum number of lines to parse in order to extend index. If line 
+			is further away state is computed assuming that a record starts 
+			:py:data:`CSV_PARSE_LINES` lines above, like csv_col_current did 
+			before this index was introduced, and is not remembered.
+
+		:return: ``(column, in_quotes)`` pair.
+		'''
+		states = self.states
+		if lnum < len(states):
+			return states[lnum]
+		dialect = self.dialect
+		if lnum - len(states) < max_lines:
+			start = len(states) - 1
+			column, in_quotes = states[start]
+			for text in get_buffer_lines(buffer, start, lnum):
+				delimiters, in_quotes = parse_csv_line(text, dialect, in_quotes)
+				column = column + len(delimiters) if in_quotes else 0
+				states.append((column, in_quotes))
+			return states[lnum]
+		column, in_quotes = 0, False
+		for text in get_buffer_lines(buffer, max(0, lnum - CSV_PARSE_LINES), lnum):
+			delimiters, in_quotes = parse_csv_line(text, dialect, in_quotes)
+			column = column + len(delimiters) if in_quotes else 0
+		return column, in_quotes
+
+	def get_column(self, buffer, line, col, max_lines):
+		'''Get number of the CSV column cursor is in
+
+		:param int line:
+			Cursor line, one-based.
+		:param int col:
+			Cursor column, zero-based.
+
+		:return: Column number, one-based.
+		'''
+		column, in_quotes = self.get_state(buffer, line - 1, max_lines)
+		text = get_buffer_lines(buffer, line - 1, line)[0]
+		if line - 1 < len(self.states):
+			delimiters = self.get_delimiters(line - 1, text, in_quotes)
+		else:
+			delimiters = parse_csv_line(text, self.dialect, in_quotes)[0]
+		return column + bisect_left(delimiters, col) + 1
+
+
 def process_csv_buffer(pl, buffer, line, col, display_name):
 	global csv_cache
 	if csv_cache is None:
-		csv_cache = register_buffer_cache(defaultdict(lambda: (None, None, None)))
+		csv_cache = register_buffer_cache({})
+	tracker = get_buffer_change_tracker(buffer.number)
+	try:
+		index = csv_cache[buffer.number]
+	except KeyError:
+		index = csv_cache[buffer.number] = CSVIndex()
+		tracker.add_index(index)
+	changedtick = getbufvar(buffer.number, 'changedtick')
+	tracker.update(changedtick)
+	changed = changedtick != index.changedtick
+	index.changedtick = changedtick
 	try:
 		cur_first_line = buffer[0]
 	except UnicodeDecodeError:
 		cur_first_line = vim.eval('strtrans(getline(1))')
-	dialect, has_header, first_line = csv_cache[buffer.number]
-	if dialect is None or (cur_first_line != first_line and display_name == 'auto'):
+	dialect, has_header = index.dialect, index.has_header
+	if dialect is None or (cur_first_line != index.first_line and display_name == 'auto'):
 		try:
 			text = '\n'.join(buffer[:CSV_SNIFF_LINES])
 		except UnicodeDecodeError:  # May happen in Python 3
@@ -724,13 +990,14 @@ def process_csv_buffer(pl, buffer, line, col, display_name):
 			except csv.Error as e:
 				pl.error('Failed to detect csv format: {0}', str(e))
 				return None, None
-	if len(buffer) > 2:
-		csv_cache[buffer.number] = dialect, has_header, cur_first_line
-	column_number = len(read_csv(
-		buffer[max(0, line - CSV_PARSE_LINES):line - 1] + [buffer[line - 1][:col]],
-		dialect=dialect,
-		fin=list,
-	)[-1]) or 1
+		index.reset()
+		if len(buffer) > 2:
+			index.first_line = cur_first_line
+		else:
+			index.first_line = None
+	index.dialect, index.has_header = dialect, has_header
+	# Parsing a lot of lines right after the change would make typing slow.
+	column_number = index.get_column(buffer, line, col, CSV_PARSE_LINES if changed else CSV_INDEX_LINES)
 	if has_header:
 		try:
 			header = read_csv(buffer[0:1], dialect=dialect)
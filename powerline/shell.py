@@ -2,7 +2,7 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 from powerline import Powerline
-from powerline.lib.dict import mergedicts
+from powerline.lib.dict import mergedicts_copy
 
 
 class ShellPowerline(Powerline):
@@ -13,13 +13,13 @@ class ShellPowerline(Powerline):
 	def load_main_config(self):
 		r = super(ShellPowerline, self).load_main_config()
 		if self.args.config_override:
-			mergedicts(r, self.args.config_override)
+			r = mergedicts_copy(r, self.args.config_override, remove=True)
 		return r
 
 	def load_theme_config(self, name):
 		r = super(ShellPowerline, self).load_theme_config(name)
 		if self.args.theme_override and name in self.args.theme_override:
-			mergedicts(r, self.args.theme_override[name])
+			r = mergedicts_copy(r, self.args.theme_override[name], remove=True)
 		return r
 
 	def get_config_paths(self):
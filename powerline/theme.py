@@ -17,6 +17,25 @@ def requires_filesystem_watcher(func):
 	return func
 
 
+def depends_on(*keys):
+	'''Declare which segment information segment output depends on
+
+	Used by the render cache: when all values listed here did not change 
+	segment function is assumed to return the same result. Each key is 
+	a dotted path into segment info dictionary: ``mode`` refers to 
+	``segment_info['mode']``, ``environ.VIRTUAL_ENV`` refers to 
+	``segment_info['environ'].get('VIRTUAL_ENV')``, ``args.jobnum`` refers to 
+	``segment_info['args'].jobnum``. Key ``getcwd`` is special: it refers to 
+	the result of calling ``segment_info['getcwd']``.
+
+	Segments without this declaration are never cached.
+	'''
+	def decorator(func):
+		func.powerline_dependencies = keys
+		return func
+	return decorator
+
+
 def new_empty_segment_line():
 	return {
 		'left': [],
@@ -76,6 +95,7 @@ class Theme(object):
 			'highlight': {'fg': False, 'bg': False, 'attrs': 0}
 		}
 		self.pl = pl
+		self.render_plans = {}
 		theme_configs = [theme_config]
 		if main_theme_config:
 			theme_configs.append(main_theme_config)
@@ -123,6 +143,115 @@ class Theme(object):
 	def get_line_number(self):
 		return len(self.segments)
 
+	def get_fingerprint(self, side=None, line=0, segment_info=None, mode=None):
+		'''Return value identifying the output of :py:meth:`get_segments`
+
+		Arguments are the same as for :py:meth:`get_segments`.
+
+		:return:
+			Tuple with segment fingerprints or ``None`` if some of the segments 
+			cannot be cached.
+		'''
+		ret = []
+		for side in [side] if side else ['left', 'right']:
+			for segment in self.segments[line][side]:
+				if segment['fingerprint'] is None:
+					return None
+				try:
+					fingerprint = segment['fingerprint'](segment_info)
+				except OSError:
+					# Current directory was most likely removed: let segment 
+					# function report this.
+					return None
+				except Exception as e:
+					self.pl.exception('Failed to compute segment fingerprint: {0}', str(e), prefix=segment['name'])
+					return None
+				if fingerprint is None:
+					return None
+				ret.append(fingerprint)
+		return tuple(ret)
+
+	def get_render_plan(self, side, line, mode):
+		'''Get segments of one side of one line prepared for the given mode
+
+		Plan is computed once for each combination of arguments. Segments 
+		which are hidden in the given mode are omitted. String segments whose 
+		visibility depends only on mode are processed in advance: their 
+		contents and highlighting do not change between renders.
+
+		:return:
+			List of ``(segment, processed)`` pairs. ``processed`` is either 
+			``None`` or a processed segment dictionary ready to be copied and 
+			rendered.
+		'''
+		key = (line, side, mode)
+		try:
+			return self.render_plans[key]
+		except KeyError:
+			pass
+		plan = []
+		for segment in self.segments[line][side]:
+			if not segment['static_display_condition']:
+				plan.append((segment, None))
+				continue
+			if not segment['display_condition'](self.pl, None, mode):
+				continue
+			if segment['type'] != 'string':
+				plan.append((segment, None))
+				continue
+			if not (segment['width'] == 'auto' or segment['contents'] is not None):
+				continue
+			parsed_segments = []
+			process_segment(self.pl, side, None, parsed_segments, segment, mode, self.colorscheme)
+			if parsed_segments:
+				plan.append((segment, self.finish_segment(side, parsed_segments[0])))
+			else:
+				# Failed to get highlighting, let error be reported on each 
+				# render.
+				plan.append((segment, None))
+		self.render_plans[key] = plan
+		return plan
+
+	def finish_segment(self, side, segment):
+		'''Add before/after strings and apply width and align options
+
+		:param dict segment:
+			Segment dictionary, result of :py:func:`process_segment`. Is 
+			modified in-place.
+
+		:return: Finished segment or fallback segment if it failed.
+		'''
+		self.pl.prefix = segment['name']
+		try:
+			width = segment['width']
+			align = segment['align']
+			if width == 'auto' and segment['expand'] is None:
+				segment['expand'] = expand_functions.get(align)
+				if segment['expand'] is None:
+					self.pl.error('Align argument must be “r”, “l” or “c”, not “{0}”', align)
+
+			try:
+				segment['contents'] = segment['before'] + u(
+					segment['contents'] if segment['contents'] is not None else ''
+				) + segment['after']
+			except Exception as e:
+				self.pl.exception('Failed to compute segment contents: {0}', str(e))
+				segment['contents'] = safe_unicode(segment.get('contents'))
+			# Align segment contents
+			if segment['width'] and segment['width'] != 'auto':
+				if segment['align'] == 'l':
+					segment['contents'] = segment['contents'].ljust(segment['width'])
+				elif segment['align'] == 'r':
+					segment['contents'] = segment['contents'].rjust(segment['width'])
+				elif segment['align'] == 'c':
+					segment['contents'] = segment['contents'].center(segment['width'])
+			return segment
+		except Exception as e:
+			self.pl.exception('Failed to compute segment: {0}', str(e))
+			fallback = get_fallback_segment()
+			fallback.update(side=side)
+			return fallback
+
 	def get_segments(self, side=None, line=0, segment_info=None, mode=None):
 		'''Return all segments.
 
@@ -135,8 +264,17 @@ class Theme(object):
 		'''
 		for side in [side] if side else ['left', 'right']:
 			parsed_segments = []
-			for segment in self.segments[line][side]:
-				if segment['display_condition'](self.pl, segment_info, mode):
+			for segment, processed in self.get_render_plan(side, line, mode):
+				if processed is not None:
+					# Each render must receive a copy of the segment, or else 
+					# mode-dependent segment contents can’t be cached correctly 
+					# e.g. when caching non-current window contents for vim 
+					# statuslines
+					parsed_segments.append(processed.copy())
+				elif segment['static_display_condition'] or segment['display_condition'](self.pl, segment_info, mode):
+					# Segments produced by process_segment are always added to 
+					# the end of the list and are fresh copies.
+					start = len(parsed_segments)
 					process_segment(
 						self.pl,
 						side,
@@ -146,37 +284,7 @@ class Theme(object):
 						mode,
 						self.colorscheme,
 					)
+					for i in range(start, len(parsed_segments)):
+						parsed_segments[i] = self.finish_segment(side, parsed_segments[i])
 			for segment in parsed_segments:
-				self.pl.prefix = segment['name']
-				try:
-					width = segment['width']
-					align = segment['align']
-					if width == 'auto' and segment['expand'] is None:
-						segment['expand'] = expand_functions.get(align)
-						if segment['expand'] is None:
-							self.pl.error('Align argument must be “r”, “l” or “c”, not “{0}”', align)
-
-					try:
-						segment['contents'] = segment['before'] + u(
-							segment['contents'] if segment['contents'] is not None else ''
-						) + segment['after']
-					except Exception as e:
-						self.pl.exception('Failed to compute segment contents: {0}', str(e))
-						segment['contents'] = safe_unicode(segment.get('contents'))
-					# Align segment contents
-					if segment['width'] and segment['width'] != 'auto':
-						if segment['align'] == 'l':
-							segment['contents'] = segment['contents'].ljust(segment['width'])
-						elif segment['align'] == 'r':
-							segment['contents'] = segment['contents'].rjust(segment['width'])
-						elif segment['align'] == 'c':
-							segment['contents'] = segment['contents'].center(segment['width'])
-					# We need to yield a copy of the segment, or else mode-dependent
-					# segment contents can’t be cached correctly e.g. when caching
-					# non-current window contents for vim statuslines
-					yield segment.copy()
-				except Exception as e:
-					self.pl.exception('Failed to compute segment: {0}', str(e))
-					fallback = get_fallback_segment()
-					fallback.update(side=side)
-					yield fallback
+				yield segment
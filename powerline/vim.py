@@ -14,7 +14,7 @@ except ImportError:
 
 from powerline.bindings.vim import vim_get_func, vim_getvar, get_vim_encoding, python_to_vim
 from powerline import Powerline, FailedUnicode, finish_common_config
-from powerline.lib.dict import mergedicts
+from powerline.lib.dict import mergedicts_copy
 from powerline.lib.unicode import u
 
 
@@ -28,8 +28,7 @@ def _override_from(config, override_varname, key=None):
 			overrides = overrides[key]
 		except KeyError:
 			return config
-	mergedicts(config, overrides)
-	return config
+	return mergedicts_copy(config, overrides, remove=True)
 
 
 class VimVarHandler(logging.Handler, object):
@@ -56,6 +55,8 @@ class VimPowerline(Powerline):
 	def init(self, pyeval='PowerlinePyeval', **kwargs):
 		super(VimPowerline, self).init('vim', **kwargs)
 		self.last_window_id = 1
+		self.windows_by_id = None
+		self.track_windows = False
 		self.pyeval = pyeval
 		self.construct_window_statusline = self.create_window_statusline_constructor()
 		if all((hasattr(vim.current.window, attr) for attr in ('options', 'vars', 'number'))):
@@ -119,8 +120,8 @@ class VimPowerline(Powerline):
 			except IOError:
 				pass
 			else:
-				mergedicts(theme_config, lvl_config)
-		mergedicts(theme_config, config)
+				theme_config = mergedicts_copy(theme_config, lvl_config)
+		theme_config = mergedicts_copy(theme_config, config, remove=True)
 		try:
 			self.renderer.add_local_theme(matcher, {'config': theme_config})
 		except KeyError:
@@ -142,9 +143,12 @@ class VimPowerline(Powerline):
 		except KeyError:
 			use_var_handler = False
 		if use_var_handler:
-			main_config.setdefault('common', {})
-			main_config['common'] = finish_common_config(self.get_encoding(), main_config['common'])
-			main_config['common']['log_file'].append(['powerline.vim.VimVarHandler', [['powerline_log_messages']]])
+			main_config = main_config.copy()
+			common_config = finish_common_config(self.get_encoding(), main_config.get('common', {}))
+			common_config['log_file'] = common_config['log_file'] + [
+				['powerline.vim.VimVarHandler', [['powerline_log_messages']]]
+			]
+			main_config['common'] = common_config
 		return main_config
 
 	def load_theme_config(self, name):
@@ -243,6 +247,15 @@ class VimPowerline(Powerline):
 		vim.command('augroup Powerline')
 		vim.command('	autocmd! ColorScheme * :{pycmd} powerline.reset_highlight()'.format(pycmd=pycmd))
 		vim.command('	autocmd! VimLeavePre * :{pycmd} powerline.shutdown()'.format(pycmd=pycmd))
+		if self.win_idx == self.new_win_idx and int(vim.eval('exists("##WinNew")')):
+			# Window index computed by new_win_idx is valid until windows are 
+			# created, closed or current tab page changes.
+			events = 'WinNew,TabEnter'
+			if int(vim.eval('exists("##WinClosed")')):
+				events += ',WinClosed'
+			vim.command('	autocmd! {events} * :{pycmd} powerline.reset_windows()'.format(
+				events=events, pycmd=pycmd))
+			self.track_windows = True
 		vim.command('augroup END')
 
 		# Hack for local themes support after reloading.
@@ -260,8 +273,42 @@ class VimPowerline(Powerline):
 			# do anything.
 			pass
 
+	def reset_windows(self):
+		'''Forget window index computed by the last :py:meth:`new_win_idx` call'''
+		self.windows_by_id = None
+
+	def get_window(self, window_id):
+		'''Find window with the given identifier
+
+		Uses window index saved by the last :py:meth:`new_win_idx` call if 
+		windows did not change since then, otherwise calls :py:meth:`win_idx`.
+
+		:param int window_id:
+			Powerline window identifier or ``None`` for current window.
+
+		:return:
+			``(window, window_id, winnr)`` tuple or ``None`` if window was not 
+			found.
+		'''
+		windows = self.windows_by_id
+		if windows is not None:
+			try:
+				if window_id is None:
+					window = vim.current.window
+					window_id = window.vars['powerline_window_id']
+					if windows.get(window_id) is not window:
+						raise KeyError
+				else:
+					window = windows[window_id]
+				if window.valid:
+					return (window, window_id, window.number)
+			except KeyError:
+				pass
+		return self.win_idx(window_id)
+
 	def new_win_idx(self, window_id):
 		r = None
+		windows = {}
 		for window in vim.windows:
 			try:
 				curwindow_id = window.vars['powerline_window_id']
@@ -276,6 +323,9 @@ class VimPowerline(Powerline):
 				window.options['statusline'] = statusline
 			if curwindow_id == window_id if window_id else window is vim.current.window:
 				r = (window, curwindow_id, window.number)
+			windows[curwindow_id] = window
+		if self.track_windows:
+			self.windows_by_id = windows
 		return r
 
 	def old_win_idx(self, window_id):
@@ -296,13 +346,13 @@ class VimPowerline(Powerline):
 		return r
 
 	def statusline(self, window_id):
-		window, window_id, winnr = self.win_idx(window_id) or (None, None, None)
+		window, window_id, winnr = self.get_window(window_id) or (None, None, None)
 		if not window:
 			return FailedUnicode('No window {0}'.format(window_id))
 		return self.render(window, window_id, winnr)
 
 	def tabline(self):
-		return self.render(*self.win_idx(None), is_tabline=True)
+		return self.render(*self.get_window(None), is_tabline=True)
 
 	def new_window(self):
 		return self.render(*self.win_idx(None))
@@ -314,8 +314,10 @@ def bindeval(expr):
 	match = re.compile(r'^function\("([^"\\]+)"\)$').match(expr)
 	if match:
 		return globals()['_emul_' + match.group(1)]
-	else:
-		raise NotImplementedError
+	match = re.compile(r'^getbufvar\((\d+), "&"\)$').match(expr)
+	if match:
+		return buffers[int(match.group(1))].options.copy()
+	raise NotImplementedError
 
 
 @_vim
@@ -478,6 +480,7 @@ class _Window(object):
 			self.buffer = _Buffer()
 		_window_id += 1
 		self._window_id = _window_id
+		self.valid = True
 		self.options = {}
 		self.vars = {
 			'powerline_window_id': self._window_id,
@@ -499,6 +502,7 @@ class _Tabpage(object):
 	def _close_window(self, winnr, open_window=True):
 		curwinnr = self.window.number
 		win = self.windows._pop(winnr)
+		win.valid = False
 		if self.windows and winnr == curwinnr:
 			self.window = self.windows[-1]
 		elif open_window:
@@ -12,7 +12,9 @@ import tests.modules.vim as vim_module
 from tests.modules import TestCase
 from tests.modules.lib.config_mock import (get_powerline, get_powerline_raw,
                                            swap_attributes, UT)
-from tests.modules.lib import Args, replace_item
+from tests.modules.lib import Args, replace_item, replace_attr
+
+from powerline.theme import depends_on, requires_segment_info
 
 
 def highlighted_string(s, group, **kwargs):
@@ -573,6 +575,24 @@ class TestOuterPadding(TestRender):
 		self.assertRenderEqual(p, '{121}s            {24}>>{344}g{34}>{34}|{344}           f{--}', width=30)
 
 
+class TestWidth(TestRender):
+	@with_new_config
+	def test_many_segments(self, config):
+		config['themes/test/default']['segments'] = {
+			'left': (
+				[highlighted_string('a', 'str1') for i in range(60)]
+				+ [highlighted_string('b', 'str2', priority=i) for i in range(60)]
+			),
+			'right': [],
+		}
+		with get_powerline(config, run_once=True, simpler_renderer=True) as p:
+			self.assertRenderEqual(
+				p,
+				'{121} a' + '{12}>{121}a' * 58 + '{12}>{121}a{24}>>' + '{344}b{34}>' * 2 + '{344}b{4-}>>{--}',
+				width=130,
+			)
+
+
 class TestSegmentAttributes(TestRender):
 	@add_args
 	def test_no_attributes(self, p, config):
@@ -698,6 +718,75 @@ class TestSegmentData(TestRender):
 		self.assertRenderEqual(p, '{56} 1S{56}>{56}3S{610}>>{910}3S{910}>{910}2S{10-}>>{--}')
 
 
+class TestRenderCache(TestRender):
+	@with_new_config
+	def test_render_cache(self, config):
+		calls = []
+
+		@depends_on('environ.TEST')
+		@requires_segment_info
+		def m1(pl, segment_info):
+			calls.append('m1')
+			return segment_info['environ'].get('TEST')
+
+		def m2(pl):
+			calls.append('m2')
+			return 'm2'
+
+		config['config']['common']['render_cache_size'] = 2
+		config['themes/test/default']['segments'] = {
+			'left': [
+				{
+					'function': 'bar.m1'
+				},
+				highlighted_string('s', 'str1'),
+			]
+		}
+		with replace_item(sys.modules, 'bar', Args(m1=m1, m2=m2)):
+			with get_powerline(config, run_once=True, simpler_renderer=True) as p:
+				self.assertRenderEqual(p, '{56} 1{62}>>{121}s{2-}>>{--}', segment_info={'environ': {'TEST': '1'}})
+				self.assertRenderEqual(p, '{56} 1{62}>>{121}s{2-}>>{--}', segment_info={'environ': {'TEST': '1'}})
+				self.assertEqual(calls, ['m1'])
+				self.assertRenderEqual(p, '{56} 2{62}>>{121}s{2-}>>{--}', segment_info={'environ': {'TEST': '2'}})
+				self.assertEqual(calls, ['m1', 'm1'])
+
+			config['themes/test/default']['segments']['left'].append({'function': 'bar.m2'})
+			with get_powerline(config, run_once=True, simpler_renderer=True) as p:
+				p.render(segment_info={'environ': {'TEST': '1'}})
+				p.render(segment_info={'environ': {'TEST': '1'}})
+				self.assertEqual(calls, ['m1', 'm1', 'm1', 'm2', 'm1', 'm2'])
+
+
+class TestVCSCache(TestRender):
+	@with_new_config
+	def test_vcs_cache(self, config):
+		from powerline.lib import vcs
+		config['config']['common']['vcs_cache'] = {'file_status_size': 10, 'ttl': None}
+		try:
+			with get_powerline(config, run_once=True, simpler_renderer=True) as p:
+				p.render()
+				stats = vcs.cache_stats()
+				self.assertEqual((stats['file_status']['maxsize'], stats['file_status']['ttl']), (10, None))
+				self.assertEqual((stats['branch_name']['maxsize'], stats['branch_name']['ttl']), (vcs.BRANCH_NAME_CACHE_SIZE, None))
+				vcs.branch_name_cache['/repo'] = 'master'
+				self.assertEqual(vcs.branch_name_cache['/repo'], 'master')
+				stats = vcs.cache_stats()
+				self.assertEqual((stats['branch_name']['size'], stats['branch_name']['hits']), (1, 1))
+				vcs.branch_name_cache.clear()
+
+			# Removed option restores defaults
+			config['config']['common'].pop('vcs_cache')
+			with get_powerline(config, run_once=True, simpler_renderer=True) as p:
+				p.render()
+				p.set_vcs_cache_limits({'branch_name_size': 5})
+				p.set_vcs_cache_limits(None)
+				stats = vcs.cache_stats()
+				self.assertEqual((stats['file_status']['maxsize'], stats['file_status']['ttl']), (vcs.FILE_STATUS_CACHE_SIZE, vcs.CACHE_TTL))
+				self.assertEqual((stats['branch_name']['maxsize'], stats['branch_name']['ttl']), (vcs.BRANCH_NAME_CACHE_SIZE, vcs.CACHE_TTL))
+		finally:
+			vcs.set_cache_limits(vcs.FILE_STATUS_CACHE_SIZE, vcs.BRANCH_NAME_CACHE_SIZE, vcs.CACHE_TTL)
+
+
 class TestShellEscapes(TestCase):
 	@with_new_config
 	def test_escapes(self, config):
@@ -734,6 +823,16 @@ class TestShellEscapes(TestCase):
 			with get_powerline_raw(config, ShellPowerline, args=Args(config_path=[''])) as powerline:
 				self.assertEqual(powerline.render(segment_info={}, side='left'), '\x1b[0m\x1b[1;5}\x1b[2;6}\xa0s\x1b[0m\x1b[1;6}\x1b[49m\x1b[22m>>\x1b[0m')
 
+	@with_new_config
+	def test_auto_escapes(self, config):
+		from powerline.shell import ShellPowerline
+		import powerline as powerline_module
+		with swap_attributes(config, powerline_module):
+			with get_powerline_raw(config, ShellPowerline, args=Args(config_path=[''])) as powerline:
+				for i in range(2):
+					self.assertEqual(powerline.render(segment_info={'environ': {'TERM': 'fbterm'}}, side='left'), '\x1b[0m\x1b[1;5}\x1b[2;6}\xa0s\x1b[0m\x1b[1;6}\x1b[49m\x1b[22m>>\x1b[0m')
+					self.assertEqual(powerline.render(segment_info={'environ': {'TERM': 'xterm'}}, side='left'), '\x1b[0;38;5;5;48;5;6m\xa0s\x1b[0;38;5;6;49;22m>>\x1b[0m')
+
 	@with_new_config
 	def test_fbterm_tmux_escapes(self, config):
 		from powerline.shell import ShellPowerline
@@ -838,6 +937,72 @@ class TestVim(TestCase):
 				winnr = window.number
 				self.assertEqual(powerline.render(window, window_id, winnr), b'%#Pl_5_12583104_6_32896_NONE#\xc2\xa0\xe2\x80\x9cbar\xe2\x80\x9d%#Pl_6_32896_NONE_None_NONE#>>')
 
+	def test_window_cache(self):
+		from powerline.vim import VimPowerline
+		import powerline as powerline_module
+		cache_config = deepcopy(config)
+		cache_config['config']['common']['render_cache_size'] = 8
+		with swap_attributes(cache_config, powerline_module):
+			with get_powerline_raw(cache_config, VimPowerline, replace_gcp=True) as powerline:
+				window = vim_module.current.window
+				powerline.render(window, 1, window.number)
+				self.assertIsNotNone(powerline.renderer.render_cache)
+				self.assertIsNone(powerline.renderer.window_cache)
+		cache_config['config']['common']['window_cache_size'] = 8
+		with swap_attributes(cache_config, powerline_module):
+			with vim_module._with('split'):
+				with get_powerline_raw(cache_config, VimPowerline, replace_gcp=True) as powerline:
+					window = vim_module.current.tabpage.windows[0]
+					self.assertIsNot(window, vim_module.current.window)
+					output = powerline.render(window, 2, window.number)
+					calls = []
+					do_render = powerline.renderer.do_render
+					powerline.renderer.do_render = lambda **kwargs: calls.append(kwargs) or do_render(**kwargs)
+					self.assertEqual(powerline.render(window, 2, window.number), output)
+					self.assertEqual(calls, [])
+					with vim_module._with('bufoptions', modified=1):
+						powerline.render(window, 2, window.number)
+						self.assertEqual(len(calls), 1)
+					current_window = vim_module.current.window
+					powerline.render(current_window, 1, current_window.number)
+					powerline.render(current_window, 1, current_window.number)
+					self.assertEqual(len(calls), 3)
+					powerline.render(window, 2, window.number)
+					self.assertEqual(len(calls), 4)
+					powerline.reset_highlight()
+					powerline.render(window, 2, window.number)
+					self.assertEqual(len(calls), 5)
+
+	def test_window_index(self):
+		from powerline.vim import VimPowerline
+		import powerline as powerline_module
+		import powerline.vim as powerline_vim
+		with swap_attributes(config, powerline_module):
+			with vim_module._with('split'):
+				with replace_attr(powerline_vim.vim, 'windows', vim_module.current.tabpage.windows):
+					with get_powerline_raw(config, VimPowerline, replace_gcp=True) as powerline:
+						powerline.track_windows = True
+						calls = []
+						win_idx = powerline.win_idx
+						powerline.win_idx = lambda window_id: calls.append(window_id) or win_idx(window_id)
+						windows = list(vim_module.current.tabpage.windows)
+						window_ids = [window.vars['powerline_window_id'] for window in windows]
+						for window in windows:
+							window.options['statusline'] = b''
+						outputs = [powerline.statusline(window_id) for window_id in window_ids]
+						self.assertEqual(calls, [window_ids[0]])
+						self.assertEqual(powerline.windows_by_id, dict(zip(window_ids, windows)))
+						self.assertEqual([powerline.statusline(window_id) for window_id in window_ids], outputs)
+						powerline.tabline()
+						self.assertEqual(calls, [window_ids[0]])
+						powerline.reset_windows()
+						self.assertEqual(powerline.statusline(window_ids[1]), outputs[1])
+						self.assertEqual(calls, [window_ids[0], window_ids[1]])
+						windows[1].valid = False
+						self.assertEqual(powerline.statusline(window_ids[1]), outputs[1])
+						self.assertEqual(calls, [window_ids[0], window_ids[1], window_ids[1]])
+						windows[1].valid = True
+
 	@classmethod
 	def setUpClass(cls):
 		sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vim_sys_path')))
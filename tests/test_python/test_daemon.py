@@ -0,0 +1,418 @@
+# vim:fileencoding=utf-8:noet
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import socket
+import shutil
+import logging
+import tempfile
+
+from time import sleep
+from threading import Event, Lock, Thread
+
+from tests.modules.lib import replace_attr
+from tests.modules import TestCase, SkipTest
+
+
+DAEMON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts', 'powerline-daemon')
+
+
+def load_daemon():
+	try:
+		from importlib.machinery import SourceFileLoader
+	except ImportError:
+		import imp
+		return imp.load_source(str('powerline_daemon'), DAEMON_PATH)
+	else:
+		return SourceFileLoader(str('powerline_daemon'), DAEMON_PATH).load_module()
+
+
+daemon = load_daemon()
+
+
+class ListHandler(logging.Handler):
+	def __init__(self):
+		super(ListHandler, self).__init__()
+		self.records = []
+
+	def emit(self, record):
+		self.records.append(record)
+
+
+def fake_render(args, environ, cwd, is_daemon, state):
+	return '{0}:{1}:{2}'.format(args.side, environ.get('TEST_VAR', '-'), cwd)
+
+
+def gen_request(args, cwd, environ_items):
+	fields = [('%x' % len(args)).encode('ascii')] + [arg.encode('utf-8') for arg in args]
+	fields.append(cwd.encode('utf-8'))
+	fields.extend((item.encode('utf-8') for item in environ_items))
+	return b''.join((field + b'\0' for field in fields)) + b'\0'
+
+
+def gen_frame(args, cwd, environ_items):
+	body = gen_request(args, cwd, environ_items)
+	return daemon.PERSISTENT_MAGIC + ('%x' % len(body)).encode('ascii') + b'\0' + body
+
+
+def recv_frame(sock, data=b''):
+	'''Receive one persistent protocol answer
+
+	:return: ``(answer, rest)`` pair.
+	'''
+	while True:
+		header_end = data.find(b'\0')
+		if header_end != -1:
+			end = header_end + 1 + int(data[:header_end], 16)
+			if len(data) >= end:
+				return data[header_end + 1:end], data[end:]
+		received = sock.recv(4096)
+		if not received:
+			raise EOFError
+		data += received
+
+
+def recv_all(sock):
+	received = []
+	while True:
+		data = sock.recv(4096)
+		if not data:
+			break
+		received.append(data)
+	return b''.join(received)
+
+
+class DaemonTestCase(TestCase):
+	'''Base class for tests running daemon main loop in a separate thread
+	'''
+	def setUp(self):
+		self.tmpdir = tempfile.mkdtemp()
+		self.address = os.path.join(self.tmpdir, 'socket')
+		self.sock = socket.socket(family=socket.AF_UNIX)
+		self.sock.bind(self.address)
+		self.sock.listen(128)
+		self.sock.setblocking(0)
+		self.state = daemon.State()
+		self.parser = daemon.get_main_argparser(daemon.NonInteractiveArgParser)
+		self.render_replace = replace_attr(daemon, 'render', fake_render)
+		self.render_replace.__enter__()
+		self.pool = None
+		self.thread = None
+
+	def tearDown(self):
+		if self.thread is not None:
+			self.request(daemon.EOF, read=False)
+			self.thread.join(10)
+			self.assertFalse(self.thread.is_alive())
+		if self.pool is not None:
+			self.pool.shutdown(10)
+		self.render_replace.__exit__()
+		self.sock.close()
+		shutil.rmtree(self.tmpdir)
+
+	def start(self, run):
+		def target():
+			try:
+				run()
+			except SystemExit:
+				pass
+		self.thread = Thread(target=target)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def start_selectors_loop(self, workers=0):
+		if daemon.selectors is None:
+			raise SkipTest('selectors module is not available')
+		if workers:
+			self.pool = daemon.WorkerPool(workers, self.state)
+		self.loop = daemon.SelectorsLoop(self.sock, False, self.parser, self.state, self.pool, timeout=10)
+		self.start(self.loop.run)
+
+	def start_select_loop(self):
+		read_sockets, write_sockets = set(), set()
+		result_map = {}
+
+		def run():
+			while True:
+				daemon.do_one(
+					self.sock, read_sockets, write_sockets, result_map,
+					is_daemon=False,
+					argparser=self.parser,
+					state=self.state,
+				)
+
+		self.start(run)
+
+	def connect(self):
+		client = socket.socket(family=socket.AF_UNIX)
+		client.settimeout(10)
+		client.connect(self.address)
+		return client
+
+	def request(self, data, read=True):
+		client = self.connect()
+		try:
+			client.sendall(data)
+			if read:
+				return recv_all(client)
+		finally:
+			client.close()
+
+
+class TestSelectorsLoop(DaemonTestCase):
+	def check_requests(self):
+		self.assertEqual(
+			self.request(gen_request(['shell', 'left'], '/cwd', ['TEST_VAR=1'])),
+			b'left:1:/cwd'
+		)
+		self.assertEqual(
+			self.request(gen_request(['shell', 'right'], '/other', [])),
+			b'right:-:/other'
+		)
+		# Invalid requests are answered with an error message
+		self.assertIn(b'usage', self.request(gen_request(['shell'], '/cwd', [])))
+		# Request sent in multiple parts and concurrent clients
+		first = self.connect()
+		second = self.connect()
+		try:
+			request = gen_request(['shell', 'left'], '/first', [])
+			first.sendall(request[:5])
+			second.sendall(gen_request(['shell', 'left'], '/second', []))
+			self.assertEqual(recv_all(second), b'left:-:/second')
+			first.sendall(request[5:])
+			self.assertEqual(recv_all(first), b'left:-:/first')
+		finally:
+			first.close()
+			second.close()
+
+	def test_without_workers(self):
+		self.start_selectors_loop()
+		self.check_requests()
+
+	def test_with_workers(self):
+		self.start_selectors_loop(workers=2)
+		self.check_requests()
+
+
+class TestPersistentProtocol(DaemonTestCase):
+	def check_frames(self):
+		client = self.connect()
+		try:
+			client.sendall(gen_frame(['shell', 'left'], '/cwd', ['TEST_VAR=1', 'OTHER=2']))
+			ans, rest = recv_frame(client)
+			self.assertEqual(ans, b'left:1:/cwd')
+			# Environment is kept between frames
+			client.sendall(gen_frame(['shell', 'right'], '/cwd', []))
+			ans, rest = recv_frame(client, rest)
+			self.assertEqual(ans, b'right:1:/cwd')
+			# Variable without value is removed, pipelined frames are answered 
+			# in order
+			client.sendall(
+				gen_frame(['shell', 'left'], '/cwd', ['TEST_VAR'])
+				+ gen_frame(['shell', 'left'], '/other', ['TEST_VAR=3'])
+			)
+			ans, rest = recv_frame(client, rest)
+			self.assertEqual(ans, b'left:-:/cwd')
+			ans, rest = recv_frame(client, rest)
+			self.assertEqual(ans, b'left:3:/other')
+			# Errors do not break the connection
+			client.sendall(gen_frame(['shell'], '/cwd', []))
+			ans, rest = recv_frame(client, rest)
+			self.assertIn(b'usage', ans)
+			client.sendall(gen_frame(['shell', 'left'], '/cwd', []))
+			ans, rest = recv_frame(client, rest)
+			self.assertEqual(ans, b'left:3:/cwd')
+			self.assertEqual(rest, b'')
+		finally:
+			client.close()
+		# Environment is per connection
+		client = self.connect()
+		try:
+			client.sendall(gen_frame(['shell', 'left'], '/cwd', []))
+			self.assertEqual(recv_frame(client)[0], b'left:-:/cwd')
+		finally:
+			client.close()
+
+	def test_selectors_loop(self):
+		self.start_selectors_loop()
+		self.check_frames()
+
+	def test_selectors_loop_with_workers(self):
+		self.start_selectors_loop(workers=2)
+		self.check_frames()
+
+	def test_select_loop(self):
+		# select loop answers one frame and closes connection
+		self.start_select_loop()
+		client = self.connect()
+		try:
+			client.sendall(gen_frame(['shell', 'left'], '/cwd', ['TEST_VAR=1']))
+			ans, rest = recv_frame(client)
+			self.assertEqual(ans, b'left:1:/cwd')
+			self.assertEqual(recv_all(client), b'')
+		finally:
+			client.close()
+		self.assertEqual(self.request(gen_request(['shell', 'right'], '/cwd', [])), b'right:-:/cwd')
+
+
+class TestParseRequest(TestCase):
+	def test_args_cache(self):
+		parser = daemon.get_main_argparser(daemon.NonInteractiveArgParser)
+		parsed = []
+		parse_args = parser.parse_args
+
+		def counting_parse_args(argv):
+			parsed.append(argv)
+			return parse_args(argv)
+
+		parser.parse_args = counting_parse_args
+		args_cache = {}
+		parse = lambda req, environ=None: daemon.parse_request(req, parser, args_cache, environ=environ)
+
+		req = gen_request(['shell', 'left', '-c', 'common.interval=1'], '/cwd', ['TEST_VAR=1'])
+		args, environ, cwd = parse(req)
+		self.assertEqual(len(parsed), 1)
+		self.assertEqual((args.side, cwd, environ), ('left', '/cwd', {'TEST_VAR': '1'}))
+		self.assertEqual(args.config_override, {'common': {'interval': 1}})
+
+		# Cache hit: environment not used by finish_args may differ
+		args2, environ, cwd = parse(gen_request(['shell', 'left', '-c', 'common.interval=1'], '/other', ['TEST_VAR=2']))
+		self.assertEqual(len(parsed), 1)
+		self.assertEqual((args2.side, cwd, environ), ('left', '/other', {'TEST_VAR': '2'}))
+		# Returned objects, including nested overrides, are not shared
+		self.assertIsNot(args2, args)
+		args2.config_override['common']['interval'] = 2
+		args2.ext.append('test')
+		args3 = parse(req)[0]
+		self.assertEqual(len(parsed), 1)
+		self.assertEqual(args3.config_override, {'common': {'interval': 1}})
+		self.assertEqual(args3.ext, ['shell'])
+
+		# Cache misses: different arguments or environment variables used by 
+		# finish_args
+		args = parse(gen_request(['shell', 'right', '-c', 'common.interval=1'], '/cwd', []))[0]
+		self.assertEqual(len(parsed), 2)
+		self.assertEqual(args.side, 'right')
+		args = parse(req, environ={'POWERLINE_CONFIG_OVERRIDES': 'common.watcher=stat'})[0]
+		self.assertEqual(len(parsed), 3)
+		self.assertEqual(args.config_override, {'common': {'interval': 1, 'watcher': 'stat'}})
+		self.assertEqual(len(args_cache), 3)
+
+		# Cache size is limited
+		with replace_attr(daemon, 'ARGS_CACHE_SIZE', 3):
+			parse(gen_request(['shell', 'above'], '/cwd', []))
+			self.assertEqual(len(parsed), 4)
+			self.assertEqual(len(args_cache), 1)
+
+
+class TestWorkerPool(TestCase):
+	def test_failed_call_is_logged(self):
+		state = daemon.State()
+		state.logger = logging.Logger('powerline')
+		handler = ListHandler()
+		state.logger.addHandler(handler)
+		pool = daemon.WorkerPool(1, state)
+		done = Event()
+
+		def fail():
+			raise ValueError('test failure')
+
+		try:
+			pool.submit(fail)
+			pool.submit(done.set)
+			self.assertTrue(done.wait(10))
+		finally:
+			pool.shutdown(10)
+		self.assertEqual(len(handler.records), 1)
+		self.assertEqual(handler.records[0].getMessage(), 'Worker failed to run fail: test failure')
+		self.assertEqual(handler.records[0].exc_info[0], ValueError)
+
+
+class TestPowerlineLocks(TestCase):
+	def setUp(self):
+		self.parser = daemon.get_main_argparser(daemon.NonInteractiveArgParser)
+		self.state = daemon.State()
+		self.lock = Lock()
+		self.active = {}
+		self.max_active = {}
+		self.max_total = 0
+		self.entered = []
+		self.release = Event()
+		test = self
+
+		class Powerline(object):
+			logger = None
+			config_loader = None
+
+			def __init__(self, args, **kwargs):
+				self.ext = args.ext[0]
+
+			def render(self, side, **kwargs):
+				with test.lock:
+					test.active[self.ext] = test.active.get(self.ext, 0) + 1
+					test.max_active[self.ext] = max(test.max_active.get(self.ext, 0), test.active[self.ext])
+					test.max_total = max(test.max_total, sum(test.active.values()))
+					test.entered.append(self.ext)
+				test.release.wait(10)
+				with test.lock:
+					test.active[self.ext] -= 1
+				return '{0}:{1}'.format(self.ext, side)
+
+		self.powerline_replace = replace_attr(daemon, 'NonDaemonShellPowerline', Powerline)
+		self.powerline_replace.__enter__()
+		self.results = []
+		self.pool = None
+
+	def tearDown(self):
+		self.release.set()
+		if self.pool is not None:
+			self.pool.shutdown(10)
+		self.powerline_replace.__exit__()
+
+	def render(self, argv):
+		args = daemon.parse_request(gen_request(argv, '/cwd', []), self.parser, self.state.args_cache)[0]
+		self.results.append(daemon.render(args, {}, '/cwd', False, self.state))
+
+	def submit(self, *argvs):
+		self.pool = daemon.WorkerPool(len(argvs), self.state)
+		for argv in argvs:
+			self.pool.submit(self.render, argv)
+
+	def finish(self):
+		self.release.set()
+		self.pool.shutdown(10)
+		self.pool = None
+		return sorted(self.results)
+
+	def wait_entered(self, count):
+		for i in range(1000):
+			with self.lock:
+				if len(self.entered) >= count:
+					return True
+			sleep(0.01)
+		return False
+
+	def test_different_keys(self):
+		self.submit(['shell', 'left'], ['tmux', 'left'])
+		# Both requests are inside renderer at the same time
+		self.assertTrue(self.wait_entered(2))
+		self.assertEqual(self.finish(), [b'shell:left', b'tmux:left'])
+		self.assertEqual(self.max_active, {'shell': 1, 'tmux': 1})
+		self.assertEqual(self.max_total, 2)
+
+	def test_same_key(self):
+		self.submit(['shell', 'left'], ['shell', 'right'])
+		self.assertTrue(self.wait_entered(1))
+		self.assertTrue(self.state.get_powerline_lock(next(iter(self.state.powerlines))).locked())
+		# Give the second worker a chance to enter renderer
+		sleep(0.1)
+		self.assertEqual(len(self.entered), 1)
+		self.assertEqual(self.finish(), [b'shell:left', b'shell:right'])
+		self.assertEqual(self.entered, ['shell', 'shell'])
+		self.assertEqual(self.max_active, {'shell': 1})
+		self.assertEqual(self.max_total, 1)
+
+
+if __name__ == '__main__':
+	from tests.modules import main
+	main()
@@ -10,16 +10,23 @@ import shutil
 from time import sleep
 from subprocess import call, PIPE
 
+from powerline import gen_module_attr_getter
 from powerline.lib import add_divider_highlight_group
-from powerline.lib.dict import mergedicts, REMOVE_THIS_KEY
+from powerline.lib.dict import mergedicts, mergedicts_copy, freeze, FrozenDict, REMOVE_THIS_KEY
 from powerline.lib.humanize_bytes import humanize_bytes
-from powerline.lib.vcs import guess, get_fallback_create_watcher
+from powerline.lib.memoize import ExpiringLRUCache
+from powerline.lib.lazy import lazy_import, available
+from powerline.lib.debug import StartupProfile
+from powerline.lib.proc import ProcReader, cpu_percent
+from powerline.lib.vcs import guess, get_fallback_create_watcher, TreeStatusCache, FileStatusCache
 from powerline.lib.threaded import ThreadedSegment, KwThreadedSegment
 from powerline.lib.monotonic import monotonic
 from powerline.lib.vcs.git import git_directory
+from powerline.lib.vcs import git_index
 from powerline.lib.shell import run_cmd
 
 import powerline.lib.unicode as plu
+import powerline.lib.threaded as threaded
 
 from tests.modules.lib import Pl, replace_attr
 from tests.modules import TestCase, SkipTest
@@ -265,6 +272,46 @@ class TestThreaded(TestCase):
 		self.assertEqual(num_runs - 1, len(pl.exceptions))
 		log[:] = ()
 
+	def test_shared_scheduler(self):
+		pl = Pl()
+		updates = []
+		updated = threading.Event()
+
+		class TestSegment(ThreadedSegment):
+			interval = 0.05
+			min_sleep_time = 0.01
+
+			def update(self, update_value):
+				updates.append(update_value)
+				updated.set()
+				return len(updates)
+
+			def render(self, update, **kwargs):
+				return str(update)
+
+		# Blocked jobs left by other tests must not occupy workers
+		with replace_attr(threaded, 'schedulers', {}):
+			segments = [TestSegment(), TestSegment()]
+			events = [threading.Event(), threading.Event()]
+			for segment in segments:
+				for event in events:
+					segment.startup(pl=pl, shutdown_event=event)
+			self.assertIs(segments[0].thread, segments[0].thread.scheduler.jobs[segments[0]])
+			self.assertIsNot(segments[0].thread, segments[1].thread)
+			self.assertIs(segments[0].thread.scheduler, segments[1].thread.scheduler)
+			self.assertEqual(len(segments[0].thread.scheduler.jobs), 2)
+			self.assertTrue(updated.wait(10))
+			self.assertTrue(updates)
+			events[0].set()
+			for segment in segments:
+				segment.thread.join(0.2)
+				self.assertTrue(segment.is_alive())
+			events[1].set()
+			for segment in segments:
+				segment.thread.join(10)
+				self.assertFalse(segment.is_alive())
+			self.assertFalse(segments[0].thread.scheduler.jobs)
+
 	def test_kw_threaded_segment(self):
 		log = []
 		pl = Pl()
@@ -403,6 +450,29 @@ class TestLib(TestCase):
 		mergedicts(d, {'abc': {'def': REMOVE_THIS_KEY}})
 		self.assertEqual(d, {'abc': {'mno': 'pqr'}})
 
+	def test_mergedicts_copy(self):
+		d = freeze({'abc': {'def': 'ghi'}, 'jkl': {'mno': 'pqr'}})
+		r = mergedicts_copy(d, {'abc': {'def': REMOVE_THIS_KEY, 'stu': {'vwx': REMOVE_THIS_KEY}}}, remove=True)
+		self.assertEqual(r, {'abc': {'stu': {}}, 'jkl': {'mno': 'pqr'}})
+		self.assertEqual(d, {'abc': {'def': 'ghi'}, 'jkl': {'mno': 'pqr'}})
+		# Subtrees not affected by merging are shared
+		self.assertIs(r['jkl'], d['jkl'])
+
+	def test_freeze(self):
+		d = freeze({'abc': {'def': ['ghi']}, 'jkl': {'mno': 'pqr'}})
+		self.assertTrue(isinstance(d, FrozenDict))
+		self.assertRaises(TypeError, d.__setitem__, 'abc', 1)
+		self.assertRaises(TypeError, d['abc'].pop, 'def')
+		self.assertRaises(TypeError, d['abc']['def'].append, 'stu')
+		c = d.copy()
+		c['abc'] = 1
+		self.assertEqual(c, {'abc': 1, 'jkl': {'mno': 'pqr'}})
+		# Unchanged parts of the new version are shared with the old one
+		n = freeze({'abc': {'def': ['ghi']}, 'jkl': {'mno': 'stu'}}, d)
+		self.assertIs(n['abc'], d['abc'])
+		self.assertIsNot(n['jkl'], d['jkl'])
+		self.assertIs(freeze({'abc': {'def': ['ghi']}, 'jkl': {'mno': 'pqr'}}, d), d)
+
 	def test_add_divider_highlight_group(self):
 		def decorated_function_name(**kwargs):
 			return str(kwargs)
@@ -419,6 +489,148 @@ class TestLib(TestCase):
 		self.assertEqual(humanize_bytes(1000000000, si_prefix=True), '1.00 GB')
 		self.assertEqual(humanize_bytes(1000000000, si_prefix=False), '953.7 MiB')
 
+	def test_lazy_import(self):
+		module = lazy_import('powerline.lib.humanize_bytes')
+		self.assertIs(module.humanize_bytes, humanize_bytes)
+		self.assertTrue(available(module))
+		module = lazy_import('powerline_nonexistent_module')
+		self.assertFalse(available(module))
+		self.assertRaises(ImportError, lambda: module.attr)
+		self.assertTrue(available(sys))
+
+	def test_startup_profile(self):
+		profile = StartupProfile()
+		with profile.phase('config'):
+			pass
+		get_module_attr = profile.wrap_module_attr_getter(lambda module, attr, prefix='powerline': attr)
+		self.assertEqual(get_module_attr('sys', 'path'), 'path')
+		self.assertEqual(get_module_attr('powerline_nonexistent_module', 'attr'), 'attr')
+		self.assertEqual([phase[0] for phase in profile.phases], ['config'])
+		self.assertEqual([module[0] for module in profile.imports], ['powerline_nonexistent_module'])
+
+	def test_module_attr_getter(self):
+		import_dir = os.path.join(os.path.dirname(__file__), 'imports')
+		os.mkdir(import_dir)
+		try:
+			with open(os.path.join(import_dir, 'powerline_test_imported.py'), 'w') as f:
+				f.write('import sys\nfrom powerline_test_dependency import value\npath = list(sys.path)\n')
+			with open(os.path.join(import_dir, 'powerline_test_dependency.py'), 'w') as f:
+				f.write('value = 1\n')
+			pl = Pl()
+			imported_modules = set()
+			get_module_attr = gen_module_attr_getter(pl, [import_dir], imported_modules)
+			old_path = list(sys.path)
+			try:
+				# Dependencies are found in import paths as well
+				self.assertEqual(get_module_attr('powerline_test_imported', 'value'), 1)
+				module = sys.modules['powerline_test_imported']
+				self.assertEqual(module.path, old_path)
+				self.assertEqual(sys.path, old_path)
+				self.assertEqual(imported_modules, set(('powerline_test_imported',)))
+				# Lookups are cached
+				module.value = 2
+				self.assertEqual(get_module_attr('powerline_test_imported', 'value'), 1)
+				# … until module is purged
+				sys.modules.pop('powerline_test_imported')
+				self.assertEqual(get_module_attr('powerline_test_imported', 'value'), 1)
+				self.assertIsNot(sys.modules['powerline_test_imported'], module)
+				self.assertIsNone(get_module_attr('powerline_test_imported', 'missing'))
+				self.assertEqual(len(pl.exceptions), 1)
+			finally:
+				sys.modules.pop('powerline_test_imported', None)
+				sys.modules.pop('powerline_test_dependency', None)
+			# Import paths are not used by other imports
+			self.assertRaises(ImportError, __import__, 'powerline_test_dependency')
+		finally:
+			shutil.rmtree(import_dir)
+
+	def test_expiring_lru_cache(self):
+		evicted = []
+
+		class Cache(ExpiringLRUCache):
+			def evict(self, key, value):
+				evicted.append(key)
+
+		cache = Cache(2, ttl=1000)
+		cache['a'] = 1
+		cache['b'] = 2
+		self.assertEqual(cache['a'], 1)
+		cache['c'] = 3
+		# 'b' is the least recently used item
+		self.assertEqual(evicted, ['b'])
+		self.assertNotIn('b', cache)
+		self.assertRaises(KeyError, lambda: cache['b'])
+		self.assertEqual(cache.pop('a'), 1)
+		self.assertEqual(cache.pop('a', None), None)
+		self.assertEqual(evicted, ['b'])
+		cache.ttl = 0
+		self.assertNotIn('c', cache)
+		self.assertRaises(KeyError, lambda: cache['c'])
+		self.assertEqual(evicted, ['b', 'c'])
+		self.assertEqual(cache.stats(), {
+			'size': 0,
+			'maxsize': 2,
+			'ttl': 0,
+			'hits': 1,
+			'misses': 2,
+			'evictions': 1,
+			'expirations': 1,
+		})
+
+	def test_proc_reader(self):
+		root = os.path.join(os.path.dirname(__file__), 'proc')
+		os.mkdir(root)
+		try:
+			os.mkdir(os.path.join(root, 'net'))
+			with open(os.path.join(root, 'net', 'dev'), 'w') as f:
+				f.write(
+					'Inter-|   Receive                                                |  Transmit\n'
+					' face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n'
+					'    lo:     100       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0\n'
+					'  eth0:    2000      20    0    0    0     0          0         0     3000      30    0    0    0     0       0          0\n'
+				)
+			with open(os.path.join(root, 'net', 'route'), 'w') as f:
+				f.write(
+					'Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\n'
+					'eth0\t0000A8C0\t00000000\t0001\t0\t0\t0\t00FFFFFF\n'
+					'wlan0\t00000000\t0100A8C0\t0003\t0\t0\t0\t00000000\n'
+				)
+			with open(os.path.join(root, 'stat'), 'w') as f:
+				f.write(
+					'cpu  30 0 10 50 10 0 0 0 0 0\n'
+					'cpu0 20 0 5 20 5 0 0 0 0 0\n'
+					'cpu1 10 0 5 30 5 0 0 0 0 0\n'
+					'intr 100 0 0\n'
+				)
+			with open(os.path.join(root, 'loadavg'), 'w') as f:
+				f.write('0.50 1.00 1.50 1/100 1000\n')
+			with open(os.path.join(root, 'uptime'), 'w') as f:
+				f.write('1000.50 500.25\n')
+
+			reader = ProcReader(root=root, tick=1000)
+			self.assertTrue(reader.exists('stat'))
+			self.assertFalse(reader.exists('vmstat'))
+			self.assertEqual(reader.sample('net/dev')[1], {'lo': (100, 100), 'eth0': (2000, 3000)})
+			self.assertEqual(reader.sample('net/route')[1], 'wlan0')
+			total, cores = reader.sample('stat')[1]
+			self.assertEqual(total, (30, 0, 10, 50, 10, 0, 0, 0, 0, 0))
+			self.assertEqual(len(cores), 2)
+			self.assertEqual(reader.sample('loadavg')[1], (0.5, 1.0, 1.5))
+			self.assertEqual(reader.sample('uptime')[1], 1000.5)
+
+			# Samples are reused during tick
+			sample = reader.sample('uptime')
+			with open(os.path.join(root, 'uptime'), 'w') as f:
+				f.write('1001.50 500.25\n')
+			self.assertIs(reader.sample('uptime'), sample)
+			reader.tick = 0
+			self.assertEqual(reader.sample('uptime')[1], 1001.5)
+
+			self.assertEqual(cpu_percent(total, (40, 0, 20, 70, 10, 0, 0, 0, 0, 0)), 50.0)
+			self.assertEqual(cpu_percent(total, total), None)
+		finally:
+			shutil.rmtree(root)
+
 
 width_data = {
 	'N': 1,          # Neutral
@@ -507,6 +719,18 @@ class TestUnicode(TestCase):
 			# thinks this character is 5 symbols wide.
 			self.assertEqual(2, plu.strwidth_ucs_4(width_data, '\U0001F48E'))
 
+	def test_gen_strwidth(self):
+		strwidth = plu.gen_strwidth(width_data)
+		self.assertEqual(4, strwidth('abcd'))
+		self.assertEqual(0, strwidth(''))
+		self.assertEqual(4, strwidth('ＡＢ'))
+		self.assertEqual(4, strwidth('ＡＢ'))
+		self.assertEqual(2, strwidth('e\u0301x'))
+		self.assertEqual(1, strwidth('…'))
+		self.assertEqual(2, plu.gen_strwidth(dict(width_data, A=2))('…'))
+		for string in ('~/foo/bar', 'feature/ÿ-branch', '日本語/ファイル.txt'):
+			self.assertEqual(plu.strwidth_ucs_2(width_data, string), strwidth(string))
+
 	def test_strwidth_ucs_2(self):
 		self.assertEqual(4, plu.strwidth_ucs_2(width_data, 'abcd'))
 		self.assertEqual(4, plu.strwidth_ucs_2(width_data, 'ＡＢ'))
@@ -533,6 +757,76 @@ class TestVCS(TestCase):
 		else:
 			self.assertEqual(ans, q)
 
+	def test_file_status_cache(self):
+		cache = FileStatusCache(maxsize=2)
+		for name in ('a', 'b'):
+			cache.add('/repo/dir/' + name, name, '/repo', '/repo/.git/index', '.gitignore', ())
+		self.assertEqual(cache.dirstate_map, {'/repo/.git/index': set(('/repo/dir/a', '/repo/dir/b'))})
+		self.assertEqual(cache.ignore_map['/repo/dir/.gitignore'], set(('/repo/dir/a', '/repo/dir/b')))
+		self.assertEqual(list(cache.ignore_files('/repo/dir/a')), ['/repo/dir/.gitignore'])
+		cache.add('/repo/c', 'c', '/repo', '/repo/.git/index', '.gitignore', ())
+		# Evicted entry is removed from all maps
+		self.assertNotIn('/repo/dir/a', cache)
+		self.assertEqual(cache.dirstate_map, {'/repo/.git/index': set(('/repo/dir/b', '/repo/c'))})
+		self.assertEqual(cache.ignore_map, {
+			'/repo/dir/.gitignore': set(('/repo/dir/b',)),
+			'/repo/.gitignore': set(('/repo/c',)),
+		})
+		self.assertNotIn('/repo/dir/a', cache.keypath_ignore_map)
+		cache.invalidate(ignore_file='/repo/dir/.gitignore')
+		self.assertEqual(len(cache), 1)
+		self.assertEqual(cache.ignore_map, {'/repo/.gitignore': set(('/repo/c',))})
+		cache.invalidate(dirstate_file='/repo/.git/index')
+		self.assertEqual(len(cache), 0)
+		self.assertEqual(cache.dirstate_map, {})
+		self.assertEqual(cache.ignore_map, {})
+		self.assertEqual(cache.keypath_ignore_map, {})
+		self.assertEqual(cache.stats()['evictions'], 1)
+
+	def test_tree_status_cache(self):
+		changing = [False]
+		statuses = ['D  ']
+		calls = []
+
+		class Repo(object):
+			directory = '/repo'
+
+			@staticmethod
+			def status():
+				calls.append(statuses[0])
+				return statuses[0]
+
+		def tree_watcher(path, ignore_event=None):
+			return changing[0]
+
+		repo = Repo()
+		cache = TreeStatusCache(Pl())
+		cache.tw = tree_watcher
+		cache.debounce = 0.01
+		# Only the end of the changes burst triggers recomputation
+		cache.max_delay = 1000
+		self.assertEqual(cache(repo), 'D  ')
+		self.assertFalse(cache.is_stale(repo))
+		statuses[0] = ' I '
+		changing[0] = True
+		# Last known value is returned while status is computed in background
+		self.assertEqual(cache(repo), 'D  ')
+		self.assertTrue(cache.is_stale(repo))
+		# Changes coming in bursts are debounced
+		sleep(0.05)
+		self.assertEqual(calls, ['D  '])
+		self.assertTrue(cache.is_stale(repo))
+		changing[0] = False
+		deadline = monotonic() + 10
+		while cache.is_stale(repo) and monotonic() < deadline:
+			sleep(0.01)
+		thread = cache.thread
+		if thread is not None:
+			thread.join(10)
+		self.assertEqual(calls, ['D  ', ' I '])
+		self.assertFalse(cache.is_stale(repo))
+		self.assertEqual(cache(repo), ' I ')
+
 	def test_git(self):
 		create_watcher = get_fallback_create_watcher()
 		repo = guess(path=GIT_REPO, create_watcher=create_watcher)
@@ -593,6 +887,44 @@ class TestVCS(TestCase):
 			while stash_list():
 			    stash_drop()
 
+	def test_git_index(self):
+		directory = os.path.abspath(GIT_REPO)
+		gitdir = git_directory(directory)
+
+		def status(path):
+			try:
+				return git_index.file_status(directory, gitdir, path)
+			except git_index.UnknownStatus:
+				return 'unknown'
+
+		head = git_index.resolve_head(gitdir, gitdir).decode('ascii')
+		for name, contents in (('file1', 'abc'), ('file2', 'def')):
+			with open(os.path.join(GIT_REPO, name), 'w') as f:
+				f.write(contents)
+		try:
+			self.assertEqual(status('file1'), 'unknown')
+			call(['git', 'add', 'file1', 'file2'], cwd=GIT_REPO)
+			# Index differs from HEAD
+			self.assertEqual(status('file1'), 'unknown')
+			call(['git', 'commit', '-q', '-m', 'files'], cwd=GIT_REPO)
+			for version in ('2', '4'):
+				call(['git', 'update-index', '--index-version', version], cwd=GIT_REPO)
+				index = git_index.get_index(os.path.join(gitdir, 'index'))
+				self.assertEqual(sorted(index.entries), [b'file1', b'file2'])
+				self.assertEqual(status('file1'), None)
+				self.assertEqual(status(os.path.join(directory, 'file2')), None)
+			with open(os.path.join(GIT_REPO, 'file1'), 'w') as f:
+				f.write('abcdef')
+			os.remove(os.path.join(GIT_REPO, 'file2'))
+			self.assertEqual(status('file1'), ' M')
+			self.assertEqual(status('file2'), ' D')
+		finally:
+			call(['git', 'reset', '-q', '--hard', head], cwd=GIT_REPO)
+			call(['git', 'update-index', '--index-version', '2'], cwd=GIT_REPO)
+			for name in ('file1', 'file2'):
+				if os.path.exists(os.path.join(GIT_REPO, name)):
+					os.remove(os.path.join(GIT_REPO, name))
+
 	def test_git_sym(self):
 		create_watcher = get_fallback_create_watcher()
 		dotgit = os.path.join(GIT_REPO, '.git')
@@ -3,9 +3,11 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 import os
 
-from powerline.lib.config import ConfigLoader
+from threading import Event
 
-from tests.modules import TestCase
+from powerline.lib.config import ConfigLoader, ConfigSnapshot, load_json_config
+
+from tests.modules import TestCase, SkipTest
 from tests.modules.lib.fsconfig import FSTree
 
 
@@ -47,6 +49,105 @@ class TestLoaderCondition(TestCase):
 			self.assertEqual(loaded.pop_all(), [fpath])
 
 
+class TestEventsReload(TestCase):
+	def test_waiter(self):
+		loader = ConfigLoader(run_once=True)
+		waiter = loader.create_waiter()
+		if waiter is None:
+			raise SkipTest('inotify is not available')
+		fpath = os.path.join(FILE_ROOT, 'file.json')
+		other_path = os.path.join(FILE_ROOT, 'other.json')
+		nested_path = os.path.join(FILE_ROOT, 'dir', 'file.json')
+		try:
+			with FSTree({'file': {'test': 1}}, root=FILE_ROOT):
+				waiter.set_paths((fpath, nested_path))
+				self.assertFalse(waiter.wait(0))
+				# Unrelated files are ignored
+				with open(other_path, 'w') as f:
+					f.write('{}')
+				self.assertFalse(waiter.wait(0.1))
+				with open(fpath, 'w') as f:
+					f.write('{"test": 2}')
+				self.assertTrue(waiter.wait(1))
+				self.assertFalse(waiter.wait(0))
+				# Missing file in missing directory
+				os.mkdir(os.path.join(FILE_ROOT, 'dir'))
+				self.assertTrue(waiter.wait(1))
+				waiter.set_paths((fpath, nested_path))
+				with open(nested_path, 'w') as f:
+					f.write('{}')
+				self.assertTrue(waiter.wait(1))
+				waiter.wakeup()
+				self.assertFalse(waiter.wait(1))
+				os.unlink(nested_path)
+				os.rmdir(os.path.join(FILE_ROOT, 'dir'))
+		finally:
+			waiter.close()
+
+	def test_events_loader(self):
+		loader = ConfigLoader(shutdown_event=Event())
+		if loader.create_waiter() is None:
+			raise SkipTest('inotify is not available')
+		fpath = os.path.join(FILE_ROOT, 'file.json')
+		updated = Event()
+
+		def on_missing(path):
+			loaded.append(path)
+			updated.set()
+
+		with FSTree({}, root=FILE_ROOT):
+			loader.set_interval('events')
+			loader.register_missing(check_file, on_missing, fpath)
+			loader.start()
+			try:
+				with open(fpath, 'w') as f:
+					f.write('{"test": 1}')
+				updated.wait(5)
+				self.assertEqual(loaded.pop_all(), [fpath])
+				self.assertEqual(loader.load(fpath), {'test': 1})
+			finally:
+				loader.shutdown_event.set()
+				loader.wakeup()
+				loader.join(5)
+			self.assertFalse(loader.is_alive())
+
+
+class TestConfigSnapshot(TestCase):
+	def test_snapshot(self):
+		fpath = os.path.join(FILE_ROOT, 'file.json')
+		missing_path = os.path.join(FILE_ROOT, 'missing.json')
+		snapshot_path = os.path.join(FILE_ROOT, 'cache', 'snapshot.pickle')
+
+		def compute():
+			snapshot.add_sources((fpath, missing_path))
+			loaded.append(fpath)
+			return load_json_config(fpath)
+
+		with FSTree({'file': {'test': 1}}, root=FILE_ROOT):
+			snapshot = ConfigSnapshot(snapshot_path)
+			snapshot.load()
+			self.assertEqual(snapshot.get(('file',), compute), {'test': 1})
+			self.assertEqual(loaded.pop_all(), [fpath])
+			snapshot.save()
+
+			snapshot = ConfigSnapshot(snapshot_path)
+			snapshot.load()
+			value = snapshot.get(('file',), compute)
+			self.assertEqual(value, {'test': 1})
+			self.assertEqual(loaded.pop_all(), [])
+			# Returned values are not shared
+			value['test'] = 2
+			self.assertEqual(snapshot.get(('file',), compute), {'test': 1})
+
+			# Snapshot is discarded when a file appears
+			with open(missing_path, 'w') as f:
+				f.write('{}')
+			snapshot = ConfigSnapshot(snapshot_path)
+			snapshot.load()
+			self.assertEqual(snapshot.get(('file',), compute), {'test': 1})
+			self.assertEqual(loaded.pop_all(), [fpath])
+
+
 if __name__ == '__main__':
 	from tests.modules import main
 	main()
@@ -1,11 +1,16 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
+import os
+import sys
+
 import powerline.listers.i3wm as i3wm
 
 from tests.modules.lib import Args, replace_attr, Pl
 from tests.modules import TestCase
 
+import tests.modules.vim as vim_module
+
 
 class TestI3WM(TestCase):
 	@staticmethod
@@ -222,6 +227,40 @@ class TestI3WM(TestCase):
 			)
 
 
+class TestVim(TestCase):
+	def test_buffer_options(self):
+		pl = Pl()
+		from powerline.bindings.vim import BufferOptions, vim_getbufoption
+		with vim_module._with('buffer', '/tmp/first'):
+			first_bufnr = vim_module.current.buffer.number
+			with vim_module._with('bufoptions', modified=1):
+				with vim_module._with('buffer', '/tmp/second'):
+					second_bufnr = vim_module.current.buffer.number
+					segment_info = vim_module._get_segment_info()
+					segment_info['buffer_options'] = BufferOptions(segment_info['bufnr'])
+					self.assertEqual(vim_getbufoption(segment_info, 'modified'), 0)
+					modified = dict((
+						(info['bufnr'], vim_getbufoption(info, 'modified'))
+						for info, data in self.vim.bufferlister(pl=pl, segment_info=segment_info, show_unlisted=True)
+					))
+					self.assertEqual(modified[first_bufnr], 1)
+					self.assertEqual(modified[second_bufnr], 0)
+					# Stale snapshot is not used
+					info = segment_info.copy()
+					info.update(buffer=vim_module.buffers[first_bufnr], bufnr=first_bufnr)
+					self.assertEqual(vim_getbufoption(info, 'modified'), 1)
+
+	@classmethod
+	def setUpClass(cls):
+		sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vim_sys_path')))
+		from powerline.listers import vim
+		cls.vim = vim
+
+	@classmethod
+	def tearDownClass(cls):
+		sys.path.pop(0)
+
+
 if __name__ == '__main__':
 	from tests.modules import main
 	main()
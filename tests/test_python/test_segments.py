@@ -12,6 +12,8 @@ from platform import python_implementation
 from powerline.segments import shell, tmux, pdb, i3wm
 from powerline.lib.vcs import get_fallback_create_watcher
 from powerline.lib.unicode import out_u
+from powerline.lib.monotonic import monotonic
+from powerline.lib.lazy import available
 
 import tests.modules.vim as vim_module
 
@@ -448,17 +450,17 @@ class TestNet(TestCommon):
 			self.assertEqual(self.module.internal_ip(pl=pl, interface='default_gateway', ipv=6), None)
 
 	def test_network_load(self):
-		def gb(interface):
-			return None
+		def gb():
+			return {}
 
 		f = [gb]
 
-		def _get_bytes(interface):
-			return f[0](interface)
+		def _get_counters():
+			return monotonic(), f[0]()
 
 		pl = Pl()
 
-		with replace_attr(self.module, '_get_bytes', _get_bytes):
+		with replace_attr(self.module, '_get_counters', _get_counters):
 			self.module.network_load.startup(pl=pl)
 			try:
 				self.assertEqual(self.module.network_load(pl=pl, interface='eth0'), None)
@@ -470,10 +472,10 @@ class TestNet(TestCommon):
 
 				l = [0, 0]
 
-				def gb2(interface):
+				def gb2():
 					l[0] += 1200
 					l[1] += 2400
-					return tuple(l)
+					return {'eth0': tuple(l)}
 				f[0] = gb2
 
 				while not self.module.network_load.interfaces.get('eth0', {}).get('prev', (None, None))[1]:
@@ -524,7 +526,7 @@ class TestEnv(TestCommon):
 			def username(self):
 				return 'def@DOMAIN.COM'
 
-			if hasattr(self.module, 'psutil') and not callable(self.module.psutil.Process.username):
+			if available(self.module.psutil) and not callable(self.module.psutil.Process.username):
 				username = property(username)
 
 		struct_passwd = namedtuple('struct_passwd', ('pw_name',))
@@ -532,28 +534,31 @@ class TestEnv(TestCommon):
 		new_pwd = new_module('pwd', getpwuid=lambda uid: struct_passwd(pw_name='def@DOMAIN.COM'))
 		new_getpass = new_module('getpass', getuser=lambda: 'def@DOMAIN.COM')
 		pl = Pl()
-		with replace_attr(self.module, 'pwd', new_pwd):
-			with replace_attr(self.module, 'getpass', new_getpass):
-				with replace_attr(self.module, 'os', new_os):
-					with replace_attr(self.module, 'psutil', new_psutil):
-						with replace_attr(self.module, '_geteuid', lambda: 5):
-							self.assertEqual(self.module.user(pl=pl), [
-								{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
-							])
-							self.assertEqual(self.module.user(pl=pl, hide_user='abc'), [
-								{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
-							])
-							self.assertEqual(self.module.user(pl=pl, hide_domain=False), [
-								{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
-							])
-							self.assertEqual(self.module.user(pl=pl, hide_user='def@DOMAIN.COM'), None)
-							self.assertEqual(self.module.user(pl=pl, hide_domain=True), [
-								{'contents': 'def', 'highlight_groups': ['user']}
-							])
-						with replace_attr(self.module, '_geteuid', lambda: 0):
-							self.assertEqual(self.module.user(pl=pl), [
-								{'contents': 'def', 'highlight_groups': ['superuser', 'user']}
-							])
+		# Username is cached after the first call, other tests may have called 
+		# the segment already
+		with replace_attr(self.module, 'username', False):
+			with replace_attr(self.module, 'pwd', new_pwd):
+				with replace_attr(self.module, 'getpass', new_getpass):
+					with replace_attr(self.module, 'os', new_os):
+						with replace_attr(self.module, 'psutil', new_psutil):
+							with replace_attr(self.module, '_geteuid', lambda: 5):
+								self.assertEqual(self.module.user(pl=pl), [
+									{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
+								])
+								self.assertEqual(self.module.user(pl=pl, hide_user='abc'), [
+									{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
+								])
+								self.assertEqual(self.module.user(pl=pl, hide_domain=False), [
+									{'contents': 'def@DOMAIN.COM', 'highlight_groups': ['user']}
+								])
+								self.assertEqual(self.module.user(pl=pl, hide_user='def@DOMAIN.COM'), None)
+								self.assertEqual(self.module.user(pl=pl, hide_domain=True), [
+									{'contents': 'def', 'highlight_groups': ['user']}
+								])
+							with replace_attr(self.module, '_geteuid', lambda: 0):
+								self.assertEqual(self.module.user(pl=pl), [
+									{'contents': 'def', 'highlight_groups': ['superuser', 'user']}
+								])
 
 	def test_cwd(self):
 		new_os = new_module('os', path=os.path, sep='/')
@@ -848,7 +853,7 @@ class TestSys(TestCommon):
 
 	def test_system_load(self):
 		pl = Pl()
-		with replace_module_module(self.module, 'os', getloadavg=lambda: (7.5, 3.5, 1.5)):
+		with replace_attr(self.module, '_get_loadavg', lambda: (7.5, 3.5, 1.5)):
 			with replace_attr(self.module, '_cpu_count', lambda: 2):
 				self.assertEqual(self.module.system_load(pl=pl), [
 					{'contents': '7.5 ', 'highlight_groups': ['system_load_gradient', 'system_load'], 'divider_highlight_group': 'background:divider', 'gradient_level': 100},
@@ -868,22 +873,51 @@ class TestSys(TestCommon):
 				])
 
 	def test_cpu_load_percent(self):
-		try:
-			__import__('psutil')
-		except ImportError as e:
-			raise SkipTest('Failed to import psutil: {0}'.format(e))
 		pl = Pl()
-		with replace_module_module(self.module, 'psutil', cpu_percent=lambda **kwargs: 52.3):
-			self.assertEqual(self.module.cpu_load_percent(pl=pl), [{
-				'contents': '52%',
-				'gradient_level': 52.3,
-				'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
-			}])
-			self.assertEqual(self.module.cpu_load_percent(pl=pl, format='{0:.1f}%'), [{
-				'contents': '52.3%',
-				'gradient_level': 52.3,
-				'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
-			}])
+		if self.module.proc_reader.exists('stat'):
+			samples = [
+				(1, ((10, 0, 10, 80, 0, 0, 0, 0, 0, 0), [(5, 0, 5, 40, 0, 0, 0, 0, 0, 0), (5, 0, 5, 40, 0, 0, 0, 0, 0, 0)])),
+				(2, ((40, 0, 20, 140, 0, 0, 0, 0, 0, 0), [(30, 0, 10, 60, 0, 0, 0, 0, 0, 0), (10, 0, 10, 80, 0, 0, 0, 0, 0, 0)])),
+				(2, ((40, 0, 20, 140, 0, 0, 0, 0, 0, 0), [(30, 0, 10, 60, 0, 0, 0, 0, 0, 0), (10, 0, 10, 80, 0, 0, 0, 0, 0, 0)])),
+			]
+			reader = Args(sample=lambda name: samples.pop(0))
+			with replace_attr(self.module, 'proc_reader', reader):
+				segment = self.module.CPULoadPercentSegment()
+				self.assertEqual(segment.update(None), None)
+				cpu = segment.update(None)
+				self.assertEqual(cpu, (40.0, [60.0, 20.0]))
+				# Same sample: keep the previous value
+				self.assertEqual(segment.update(cpu), cpu)
+		else:
+			try:
+				__import__('psutil')
+			except ImportError as e:
+				raise SkipTest('Failed to import psutil: {0}'.format(e))
+			with replace_module_module(self.module, 'psutil', cpu_percent=lambda percpu=False, **kwargs: [60.0, 20.0] if percpu else 40.0):
+				segment = self.module.CPULoadPercentSegment()
+				self.assertEqual(segment.update(None), (40.0, [60.0, 20.0]))
+		self.assertEqual(segment.render((52.3, [60.0, 20.0]), pl=pl), [{
+			'contents': '52%',
+			'gradient_level': 52.3,
+			'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
+		}])
+		self.assertEqual(segment.render((52.3, [60.0, 20.0]), pl=pl, format='{0:.1f}%'), [{
+			'contents': '52.3%',
+			'gradient_level': 52.3,
+			'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
+		}])
+		self.assertEqual(segment.render((52.3, [60.0, 20.0]), pl=pl, per_core=True), [{
+			'contents': '60% ',
+			'gradient_level': 60.0,
+			'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
+			'divider_highlight_group': 'background:divider',
+		}, {
+			'contents': '20%',
+			'gradient_level': 20.0,
+			'highlight_groups': ['cpu_load_percent_gradient', 'cpu_load_percent'],
+			'divider_highlight_group': 'background:divider',
+		}])
+		self.assertEqual(segment.render(None, pl=pl), None)
 
 
 class TestWthr(TestCommon):
@@ -1408,6 +1442,23 @@ class TestVim(TestCase):
 	def test_modified_buffers(self):
 		pl = Pl()
 		self.assertEqual(self.vim.modified_buffers(pl=pl), None)
+		with vim_module._with('bufoptions', modified=1):
+			self.assertEqual(self.vim.modified_buffers(pl=pl), '+ ' + str(vim_module.current.buffer.number))
+
+	def test_buffer_options_snapshot(self):
+		pl = Pl()
+		from powerline.bindings.vim import BufferOptions
+		segment_info = vim_module._get_segment_info()
+		segment_info['buffer_options'] = BufferOptions(segment_info['bufnr'])
+		self.assertEqual(segment_info['buffer_options'].options, None)
+		self.assertEqual(self.vim.file_type(pl=pl, segment_info=segment_info), None)
+		self.assertNotEqual(segment_info['buffer_options'].options, None)
+		with vim_module._with('bufoptions', filetype='python'):
+			self.assertEqual(self.vim.file_type(pl=pl, segment_info=segment_info), None)
+			segment_info['buffer_options'] = BufferOptions(segment_info['bufnr'])
+			self.assertEqual(self.vim.file_type(pl=pl, segment_info=segment_info), [
+				{'divider_highlight_group': 'background:divider', 'contents': 'python'}
+			])
 
 	def test_branch(self):
 		pl = Pl()
@@ -1504,6 +1555,42 @@ class TestVim(TestCase):
 			self.assertEqual(trailing_whitespace(), None)
 			self.assertEqual(trailing_whitespace(), None)
 
+	def test_trailing_whitespace_index(self):
+		buf = ['a', 'b', 'c ', 'd', 'e ']
+		checked = []
+
+		def has_trailing_whitespace(lnum):
+			checked.append(lnum)
+			return buf[lnum].endswith(' ')
+
+		index = self.vim.TrailingWhitespaceIndex()
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), 3)
+		self.assertEqual(checked, [0, 1, 2])
+		checked[:] = ()
+		buf[0:1] = ['a ', 'A']
+		index.apply_change(1, 2, 1)
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), 1)
+		self.assertEqual(checked, [0])
+		checked[:] = ()
+		buf[0:3] = []
+		index.apply_change(1, 4, -3)
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), 1)
+		self.assertEqual(checked, [])
+		buf[0] = 'c'
+		index.apply_change(1, 2, 0)
+		buf[2] = 'e'
+		index.apply_change(3, 4, 0)
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), None)
+		self.assertEqual(checked, [0, 1, 2])
+
+		index = self.vim.TrailingWhitespaceIndex()
+		index.chunk_size = 2
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), None)
+		buf.append(' ')
+		index.reset()
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), None)
+		self.assertEqual(index.update(len(buf), has_trailing_whitespace), 4)
+
 	def test_tabnr(self):
 		pl = Pl()
 		segment_info = vim_module._get_segment_info()
@@ -1626,6 +1713,62 @@ class TestVim(TestCase):
 		finally:
 			vim_module._bw(segment_info['bufnr'])
 
+	def test_csv_col_current_after_trailing_whitespace(self):
+		pl = Pl()
+		with vim_module._with('buffer', 'csv_tws') as segment_info:
+			buffer = segment_info['buffer']
+			buffer.options['filetype'] = 'csv'
+			buffer[:] = ['Foo;Bar;Baz'] + ['1;2;3'] * 29
+			vim_module._set_cursor(25, 3)
+
+			def render():
+				self.vim.trailing_whitespace(pl=pl, segment_info=segment_info)
+				self.assertEqual(self.vim.csv_col_current(pl=pl, segment_info=segment_info), [{
+					'contents': '2', 'highlight_groups': ['csv:column_number', 'csv']
+				}, {
+					'contents': ' (Bar)', 'highlight_groups': ['csv:column_name', 'csv']
+				}])
+				return self.vim.csv_cache[segment_info['bufnr']]
+
+			# Index is not extended right after the change
+			self.assertEqual(len(render().states), 1)
+			self.assertEqual(len(render().states), 25)
+			buffer[1] = '1;2;3 '
+			# Buffer change is also seen when trailing_whitespace already 
+			# updated the tracker
+			self.assertEqual(len(render().states), 1)
+			self.assertEqual(len(render().states), 25)
+
+	def test_csv_index(self):
+		import csv
+
+		class dialect(csv.excel):
+			delimiter = ';'
+
+		self.assertEqual(self.vim.parse_csv_line('1;2;3', dialect, False), ([1, 3], False))
+		self.assertEqual(self.vim.parse_csv_line('1;"a;""b";3', dialect, False), ([1, 9], False))
+		self.assertEqual(self.vim.parse_csv_line('1;"a;b', dialect, False), ([1], True))
+		self.assertEqual(self.vim.parse_csv_line('c;d";3', dialect, True), ([4], False))
+		self.assertEqual(self.vim.parse_csv_line('a"b;c', dialect, False), ([3], False))
+
+		buf = ['a;b;c', '1;"x', 'y;z', 'w";2', '3;4;5']
+		index = self.vim.CSVIndex()
+		index.dialect = dialect
+		self.assertEqual(index.get_column(buf, 4, 0, 100), 2)
+		self.assertEqual(index.get_column(buf, 4, 3, 100), 3)
+		self.assertEqual(index.get_column(buf, 3, 2, 100), 2)
+		self.assertEqual(len(index.states), 4)
+		buf[1:2] = ['1;x']
+		index.apply_change(2, 3, 0)
+		self.assertEqual(len(index.states), 2)
+		self.assertEqual(index.get_column(buf, 3, 2, 100), 2)
+		self.assertEqual(index.get_column(buf, 4, 4, 100), 2)
+		# Too far from the indexed part of the buffer: only a few lines above
+		# are parsed and state is not remembered
+		index.reset()
+		self.assertEqual(index.get_column(buf, 5, 2, 1), 2)
+		self.assertEqual(len(index.states), 1)
+
 	@classmethod
 	def setUpClass(cls):
 		sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vim_sys_path')))
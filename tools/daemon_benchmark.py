@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# vim:fileencoding=utf-8:noet
+
+'''Load benchmark for powerline-daemon
+
+Starts daemon using each requested event loop, opens a number of concurrent
+clients that repeatedly request a shell prompt and reports latency
+percentiles.
+'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import sys
+import socket
+import argparse
+import subprocess
+
+from threading import Thread
+from time import sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from powerline.lib.monotonic import monotonic  # NOQA
+
+
+USE_FILESYSTEM = not sys.platform.lower().startswith('linux')
+
+
+def get_address(name):
+	return name if USE_FILESYSTEM else '\0' + name
+
+
+def gen_request(args):
+	'''Encode request in the same way client/powerline.py does
+	'''
+	parts = [('%x' % len(args)).encode('ascii')]
+	parts.extend((arg.encode('utf-8') for arg in args))
+	parts.append(os.getcwd().encode('utf-8'))
+	parts.extend((
+		(k + '=' + v).encode('utf-8')
+		for k, v in os.environ.items()
+	))
+	return b''.join((part + b'\0' for part in parts)) + b'\0\0'
+
+
+def do_request(address, request):
+	sock = socket.socket(family=socket.AF_UNIX)
+	try:
+		sock.connect(address)
+		sock.sendall(request)
+		received = []
+		while True:
+			r = sock.recv(4096)
+			if not r:
+				break
+			received.append(r)
+	finally:
+		sock.close()
+	return b''.join(received)
+
+
+def client(address, request, num_requests, latencies):
+	for i in range(num_requests):
+		start_time = monotonic()
+		do_request(address, request)
+		latencies.append(monotonic() - start_time)
+
+
+def percentile(values, p):
+	return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_benchmark(event_loop, args):
+	name = 'powerline-ipc-benchmark-{0}-{1}'.format(os.getpid(), event_loop)
+	address = get_address(name)
+	daemon_args = [
+		sys.executable, os.path.join(ROOT, 'scripts', 'powerline-daemon'),
+		'--foreground', '--socket', name, '--event-loop', event_loop,
+		'--workers', str(args.workers),
+	]
+	env = os.environ.copy()
+	env['PYTHONPATH'] = os.pathsep.join((ROOT, env.get('PYTHONPATH', ''))).rstrip(os.pathsep)
+	daemon = subprocess.Popen(daemon_args, env=env)
+	try:
+		request = gen_request([
+			'shell', 'left', '-p', os.path.join(ROOT, 'powerline', 'config_files'),
+		])
+		for i in range(100):
+			try:
+				do_request(address, request)
+			except socket.error:
+				sleep(0.1)
+			else:
+				break
+		else:
+			raise SystemExit('Failed to connect to daemon')
+		latencies = []
+		threads = [
+			Thread(target=client, args=(address, request, args.requests, latencies))
+			for i in range(args.clients)
+		]
+		start_time = monotonic()
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		total_time = monotonic() - start_time
+	finally:
+		try:
+			do_request(address, b'EOF\0\0')
+		except socket.error:
+			pass
+		daemon.wait()
+	latencies.sort()
+	print('{0:10} {1:6d} requests in {2:7.3f}s: p50 {3:7.2f}ms, p99 {4:7.2f}ms'.format(
+		event_loop,
+		len(latencies),
+		total_time,
+		percentile(latencies, 50) * 1000,
+		percentile(latencies, 99) * 1000,
+	))
+
+
+def get_argparser():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument(
+		'-c', '--clients', type=int, default=32, metavar='N',
+		help='Number of concurrent clients.'
+	)
+	parser.add_argument(
+		'-n', '--requests', type=int, default=50, metavar='N',
+		help='Number of requests each client makes.'
+	)
+	parser.add_argument(
+		'-w', '--workers', type=int, default=0, metavar='N',
+		help='Value of daemon --workers argument.'
+	)
+	parser.add_argument(
+		'event_loops', nargs='*', default=['select', 'selectors'],
+		help='Event loops to benchmark.'
+	)
+	return parser
+
+
+if __name__ == '__main__':
+	args = get_argparser().parse_args()
+	for event_loop in args.event_loops:
+		run_benchmark(event_loop, args)
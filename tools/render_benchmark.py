@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# vim:fileencoding=utf-8:noet
+
+'''Microbenchmark for Renderer.render
+
+Renders shell prompt using the default theme and a synthetic theme with many
+string segments, reports time spent per render. With ``--compare`` the same
+benchmark is additionally run using powerline from another directory (e.g.
+a ``git worktree`` with an older revision) so that results can be compared.
+'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def gen_segments(num):
+	return [
+		{
+			'type': 'string',
+			'contents': 'segment{0}'.format(i),
+			'highlight_groups': ['hostname' if i % 3 else 'background'],
+			'priority': i % 7 or None,
+		}
+		for i in range(num)
+	]
+
+
+def get_powerline(segments):
+	from powerline.shell import ShellPowerline
+	from powerline.commands.main import get_argparser, finish_args
+
+	parser = get_argparser()
+	args = parser.parse_args([
+		'shell', 'left', '-p', os.path.join(ROOT, 'powerline', 'config_files'),
+	])
+	finish_args(parser, {}, args)
+	if segments:
+		args.theme_override = {
+			'default': {
+				'segments': {
+					'left': gen_segments(segments),
+					'right': [],
+				},
+			},
+		}
+	return args, ShellPowerline(args, run_once=False)
+
+
+def run(args):
+	from powerline.lib.monotonic import monotonic
+
+	for segments, width in ((0, None), (args.segments, None), (args.segments, args.width)):
+		pl_args, powerline = get_powerline(segments)
+		segment_info = {'args': pl_args, 'environ': os.environ}
+		try:
+			powerline.render(side='left', width=width, segment_info=segment_info)
+			start_time = monotonic()
+			for i in range(args.number):
+				powerline.render(side='left', width=width, segment_info=segment_info)
+			total_time = monotonic() - start_time
+		finally:
+			powerline.shutdown()
+		print('{0:40} {1:8.3f}ms per render'.format(
+			'{0} segments, width {1}:'.format(segments or 'default', width),
+			total_time * 1000 / args.number,
+		))
+
+
+def get_argparser():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument(
+		'-n', '--number', type=int, default=200, metavar='N',
+		help='Number of renders.'
+	)
+	parser.add_argument(
+		'-s', '--segments', type=int, default=200, metavar='N',
+		help='Number of segments in synthetic theme.'
+	)
+	parser.add_argument(
+		'-w', '--width', type=int, default=400, metavar='N',
+		help='Width used to benchmark segment truncation.'
+	)
+	parser.add_argument(
+		'--compare', metavar='PATH',
+		help='Also run benchmark using powerline from the given directory.'
+	)
+	parser.add_argument('--path', help=argparse.SUPPRESS)
+	return parser
+
+
+if __name__ == '__main__':
+	args = get_argparser().parse_args()
+	if args.path:
+		sys.path.insert(0, args.path)
+		run(args)
+	else:
+		print('Using', ROOT)
+		sys.stdout.flush()
+		sys.path.insert(0, ROOT)
+		run(args)
+		if args.compare:
+			print('Using', args.compare)
+			sys.stdout.flush()
+			subprocess.check_call([
+				sys.executable, os.path.abspath(__file__),
+				'--number', str(args.number),
+				'--segments', str(args.segments),
+				'--width', str(args.width),
+				'--path', os.path.abspath(args.compare),
+			])
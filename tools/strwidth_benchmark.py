@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# vim:fileencoding=utf-8:noet
+
+'''Microbenchmark for string width computation
+
+Compares :py:func:`powerline.lib.unicode.strwidth_ucs_4` (or
+``strwidth_ucs_2``) with the function created by
+:py:func:`powerline.lib.unicode.gen_strwidth` on strings typically found in
+segment contents: paths, branch names, host names and CJK file names.
+'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from powerline.lib.unicode import strwidth_ucs_2, strwidth_ucs_4, gen_strwidth
+from powerline.lib.monotonic import monotonic
+
+
+WIDTH_DATA = {
+	'N': 1,
+	'Na': 1,
+	'A': 1,
+	'H': 1,
+	'W': 2,
+	'F': 2,
+}
+
+SAMPLES = (
+	('paths', (
+		'~', 'home', 'user', 'src', 'powerline', 'powerline/lib/unicode.py',
+		'/usr/share/doc', '…', '⋯',
+	)),
+	('branches', (
+		'master', 'develop', 'feature/strwidth', 'fix/issue-1234',
+		'release-2.8', 'wip/ünïcödé',
+	)),
+	('hosts', (
+		'localhost', 'build-01.example.org', 'user@host',
+	)),
+	('cjk', (
+		'日本語', 'ファイル.txt', '文档/报告.pdf', '한국어', 'ＡＢＣ',
+	)),
+)
+
+
+def run(args):
+	old = strwidth_ucs_2 if sys.maxunicode < 0x10FFFF else strwidth_ucs_4
+	new = gen_strwidth(WIDTH_DATA)
+	for name, strings in SAMPLES:
+		for string in strings:
+			assert old(WIDTH_DATA, string) == new(string), string
+		results = []
+		for func in (lambda s: old(WIDTH_DATA, s), new):
+			start_time = monotonic()
+			for i in range(args.number):
+				for string in strings:
+					func(string)
+			results.append((monotonic() - start_time) * 1e6 / (args.number * len(strings)))
+		print('{0:10} {1:8.3f}us -> {2:8.3f}us per string ({3:.1f}x)'.format(
+			name + ':', results[0], results[1], results[0] / results[1]))
+
+
+def get_argparser():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument(
+		'-n', '--number', type=int, default=10000, metavar='N',
+		help='Number of iterations over each sample set.'
+	)
+	return parser
+
+
+if __name__ == '__main__':
+	run(get_argparser().parse_args())